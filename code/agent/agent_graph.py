@@ -0,0 +1,49 @@
+from langchain_core.messages import SystemMessage
+from langgraph.prebuilt import create_react_agent
+
+
+def _single_system_prompt(system_prompt: str):
+    """Prompt that folds leading system messages from the `pre_model_hook` into `system_prompt`.
+
+    Several chat templates (vLLM-served Llama / Mistral style) reject or drop a
+    system message that isn't the first message, so context a hook adds this
+    way (e.g. the history summary) is appended to the one leading prompt. The
+    bound prompt stays a fixed prefix of it.
+    """
+
+    def prompt(state) -> list:
+        messages = list(state["messages"])
+        content = system_prompt
+        while messages and isinstance(messages[0], SystemMessage):
+            content = f"{content}\n\n{messages.pop(0).content}"
+        return [SystemMessage(content=content)] + messages
+
+    return prompt
+
+
+# ============================================================================
+# Agent Graph (Simplified with create_react_agent)
+# ============================================================================
+def build_agent_graph(llm, tools, checkpointer, system_prompt: str, pre_model_hook=None):
+    """Compile the ReAct agent graph.
+
+    The system prompt is bound here, once: `create_react_agent` prepends it to the
+    model input on every call, but it is never written to the thread's
+    checkpointed message history, so it is not duplicated turn after turn.
+    `pre_model_hook` (e.g. a `HistoryCompactor`) shapes the history sent to the
+    model on every step without changing the stored state; system messages it
+    puts first are merged into the system prompt, so the model always gets a
+    single system message, first.
+
+    With `version="v2"` every tool call the model emits in one step becomes its own
+    task, so independent calls run concurrently (bounded by the run config's
+    `max_concurrency`) and their results are appended in the original call order.
+    """
+    return create_react_agent(
+        llm,
+        tools,
+        prompt=_single_system_prompt(system_prompt),
+        pre_model_hook=pre_model_hook,
+        checkpointer=checkpointer,
+        version="v2",
+    )
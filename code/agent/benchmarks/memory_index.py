@@ -0,0 +1,150 @@
+"""
+Memory index benchmark
+
+Loads synthetic users' memories into the Mem0 memory collection layout
+(PartitionedMilvusDB) and reports recall@k against exact per-user nearest
+neighbours, next to search latency, for each combination of:
+
+  layout - none (one flat collection, filtered by user_id) or partition_key
+           (user_id partition key); add "partition" for one partition per user
+  index  - FLAT (exact), HNSW swept over ef, IVF_FLAT swept over nprobe
+
+Searches go through the same `search(..., filters={"user_id": ...})` call Mem0
+makes. Each user's memories sit around a few topics, and queries are noisy
+copies of the user's own memories, as recalls are.
+
+Run from code/agent:  python benchmarks/memory_index.py [--users 100 --memories-per-user 100]
+Needs a Milvus server (default http://localhost:19530, e.g. `docker compose up -d milvus`).
+A Milvus Lite file (--uri ./bench.db) builds every index as FLAT, so only the
+FLAT rows are run there: it compares layouts, not index tuning.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from pymilvus import MilvusClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_store import IndexConfig, PartitionedMilvusDB  # noqa: E402
+
+
+def synthetic_users(users: int, per_user: int, dim: int, topics: int, rng) -> dict[str, np.ndarray]:
+    """Unit vectors per user, clustered around `topics` user-specific centres."""
+    data = {}
+    for u in range(users):
+        centres = rng.standard_normal((topics, dim))
+        vectors = centres[rng.integers(0, topics, per_user)] + 0.6 * rng.standard_normal((per_user, dim))
+        data[f"user-{u}"] = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    return data
+
+
+def synthetic_queries(data: dict[str, np.ndarray], count: int, k: int, rng) -> list[tuple[str, np.ndarray, set[int]]]:
+    """(user, query, exact top-k memory indexes) triples."""
+    user_ids = list(data)
+    queries = []
+    for _ in range(count):
+        user_id = user_ids[rng.integers(len(user_ids))]
+        vectors = data[user_id]
+        query = vectors[rng.integers(len(vectors))] + 0.3 * rng.standard_normal(vectors.shape[1]) / np.sqrt(vectors.shape[1])
+        query = (query / np.linalg.norm(query)).astype(np.float32)
+        distances = np.linalg.norm(vectors - query, axis=1)
+        queries.append((user_id, query, set(np.argsort(distances)[:k].tolist())))
+    return queries
+
+
+def load(client: MilvusClient, uri: str, layout: str, index: IndexConfig, data: dict[str, np.ndarray], num_partitions: int) -> tuple[PartitionedMilvusDB, float]:
+    name = f"memory_bench_{layout}_{index.index_type.lower()}"
+    client.drop_collection(name)
+    dim = next(iter(data.values())).shape[1]
+    store = PartitionedMilvusDB(
+        url=uri,
+        token="",
+        collection_name=name,
+        embedding_model_dims=dim,
+        partitioning=layout,
+        num_partitions=num_partitions,
+        index=index,
+    )
+    started = time.perf_counter()
+    for user_id, vectors in data.items():
+        store.insert(
+            ids=[f"{user_id}:{i}" for i in range(len(vectors))],
+            vectors=vectors.tolist(),
+            payloads=[{"user_id": user_id, "data": f"memory {i}"} for i in range(len(vectors))],
+        )
+    store.client.flush(name)
+    return store, time.perf_counter() - started
+
+
+def run_queries(store: PartitionedMilvusDB, queries, k: int) -> dict:
+    latencies, recalls = [], []
+    for user_id, query, truth in queries:
+        started = time.perf_counter()
+        hits = store.search(query="", vectors=query.tolist(), limit=k, filters={"user_id": user_id})
+        latencies.append((time.perf_counter() - started) * 1000)
+        found = {int(hit.id.rsplit(":", 1)[1]) for hit in hits if hit.id.startswith(user_id + ":")}
+        recalls.append(len(found & truth) / k)
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="http://localhost:19530", help="Milvus URL, or a Milvus Lite *.db file")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--memories-per-user", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=8, help="Topic clusters per user")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--layouts", default="none,partition_key")
+    parser.add_argument("--num-partitions", type=int, default=64)
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-ef", default="16,64,128")
+    parser.add_argument("--ivf-nlist", type=int, default=128)
+    parser.add_argument("--ivf-nprobe", default="4,16,64")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections afterwards")
+    args = parser.parse_args()
+
+    client = MilvusClient(uri=args.uri, db_name="default")
+    rng = np.random.default_rng(0)
+    data = synthetic_users(args.users, args.memories_per_user, args.dim, args.topics, rng)
+    queries = synthetic_queries(data, args.queries, args.k, rng)
+    sweeps = [
+        (IndexConfig(index_type="FLAT"), "-", [None]),
+        (IndexConfig(index_type="HNSW", hnsw_m=args.hnsw_m), "ef", [int(v) for v in args.hnsw_ef.split(",")]),
+        (IndexConfig(index_type="IVF_FLAT", ivf_nlist=args.ivf_nlist), "nprobe", [int(v) for v in args.ivf_nprobe.split(",")]),
+    ]
+    if args.uri.endswith(".db"):
+        # Milvus Lite accepts HNSW / IVF_FLAT but searches them as FLAT: the sweep would time the same exact search
+        print("Milvus Lite builds only FLAT indexes: skipping the HNSW and IVF_FLAT sweeps (use a Milvus server for those)\n")
+        sweeps = sweeps[:1]
+    print(f"{args.users} users x {args.memories_per_user} memories, dim {args.dim}, {args.queries} queries, k={args.k}, uri={args.uri}\n")
+    print(f"{'layout':>13} | {'index':>8} | {'param':>12} | {'load s':>7} | {f'recall@{args.k}':>9} | {'p50 ms':>7} | {'p95 ms':>7}")
+    print("-" * 82)
+    for layout in args.layouts.split(","):
+        for index, param, values in sweeps:
+            store, load_s = load(client, args.uri, layout, index, data, args.num_partitions)
+            run_queries(store, queries[:20], args.k)  # warm up: load segments and indexes
+            for value in values:
+                if param == "ef":
+                    index.hnsw_ef = value
+                elif param == "nprobe":
+                    index.ivf_nprobe = value
+                result = run_queries(store, queries, args.k)
+                label = f"{param}={value}" if value is not None else "exact"
+                print(
+                    f"{layout:>13} | {index.index_type:>8} | {label:>12} | {load_s:>7.1f} | "
+                    f"{result['recall']:>9.3f} | {result['p50_ms']:>7.2f} | {result['p95_ms']:>7.2f}"
+                )
+            if not args.keep:
+                store.delete_col()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Prompt growth benchmark
+
+Drives a 50-turn thread through the agent graph with a recording stand-in model and
+reports the prompt tokens the model receives on every turn, comparing:
+
+  legacy    - SystemMessage sent with every ainvoke (old /chat behaviour)
+  bound     - system prompt bound once in build_agent_graph()
+  compacted - bound prompt plus the HistoryCompactor pre-model stage
+
+Run from code/agent:  python benchmarks/prompt_growth.py [--turns 50]
+Exits non-zero if the bound graph's system-prompt tokens change across turns.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+from pydantic import Field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_graph import build_agent_graph  # noqa: E402
+from history import HistoryCompactor  # noqa: E402
+
+# Roughly the size of the real SYSTEM_PROMPT in main.py (a few kilobytes)
+SYSTEM_PROMPT = "You are a helpful assistant with long-term memory. Follow the tool rules carefully. " * 40
+
+
+class RecordingChatModel(BaseChatModel):
+    """Answers every call with a fixed reply and records what it was sent."""
+
+    calls: list[dict] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        system = [m for m in messages if isinstance(m, SystemMessage)]
+        self.calls.append({
+            "total_tokens": count_tokens_approximately(messages),
+            "system_tokens": count_tokens_approximately(system) if system else 0,
+            "system_messages": len(system),
+        })
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Got it, thanks for telling me."))])
+
+
+async def run_thread(mode: str, turns: int) -> list[dict]:
+    model = RecordingChatModel()
+    if mode == "legacy":
+        graph = create_react_agent(model, [], checkpointer=MemorySaver())
+    elif mode == "bound":
+        graph = build_agent_graph(model, [], MemorySaver(), SYSTEM_PROMPT)
+    else:
+        compactor = HistoryCompactor(RecordingChatModel(), max_tokens=600, summarize_after=40, keep_recent=20)
+        graph = build_agent_graph(model, [], MemorySaver(), SYSTEM_PROMPT, pre_model_hook=compactor)
+
+    config = {"configurable": {"thread_id": f"bench-{mode}"}}
+    for turn in range(turns):
+        messages = [HumanMessage(content=f"Turn {turn}: here is another fact about me.")]
+        if mode == "legacy":
+            messages.insert(0, SystemMessage(content=SYSTEM_PROMPT))
+        await graph.ainvoke({"messages": messages}, config=config)
+    return model.calls
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    modes = ("legacy", "bound", "compacted")
+    results = {mode: await run_thread(mode, args.turns) for mode in modes}
+
+    print(f"{'turn':>5} | " + " | ".join(f"{mode + ' total':>15} {mode + ' system':>16}" for mode in modes))
+    print("-" * 112)
+    for turn in range(args.turns):
+        if turn in (0, args.turns - 1) or (turn + 1) % 10 == 0:
+            row = " | ".join(
+                f"{results[mode][turn]['total_tokens']:>15} {results[mode][turn]['system_tokens']:>16}" for mode in modes
+            )
+            print(f"{turn + 1:>5} | {row}")
+
+    bound_system = {call["system_tokens"] for call in results["bound"]}
+    legacy_growth = results["legacy"][-1]["system_tokens"] - results["legacy"][0]["system_tokens"]
+    print(f"\nlegacy: system-prompt tokens grew by {legacy_growth} over {args.turns} turns")
+    print(f"bound:  system-prompt tokens per turn = {sorted(bound_system)}")
+    print(f"compacted: max total prompt tokens per turn = {max(c['total_tokens'] for c in results['compacted'])}")
+    if len(bound_system) != 1:
+        print("FAIL: bound system prompt is not constant per turn")
+        sys.exit(1)
+    print("OK: bound system prompt stays flat")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Tool routing benchmark
+
+Routes labelled chat messages through ToolRouter with the agent's embedding
+model and reports, for each min_similarity / top_k setting:
+
+  recall   - share of messages whose needed tools were all bound
+  tools    - average tools bound per message
+  tokens   - average prompt tokens of the bound tool schemas, against the
+             full catalog's
+  subsets  - distinct tool subsets, i.e. graphs the router would compile
+
+The catalog is the shipped one (memory tools plus the MCP server's
+get_fruit_price and web_search). --extra-tools adds that many realistic
+distractor tools, to show what routing saves on a larger MCP catalog.
+
+Run from code/agent:  python benchmarks/tool_routing.py [--extra-tools 12]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from langchain_core.tools import StructuredTool, tool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embeddings import EmbeddingService, ModelRegistry  # noqa: E402
+from tool import get_all_memories, recall_memory, save_memory  # noqa: E402
+from tool_router import ToolRouter  # noqa: E402
+
+PINNED = {"save_memory", "recall_memory", "get_all_memories"}
+
+
+@tool
+async def get_fruit_price(fruit_name: str) -> str:
+    """Get price with the fruit_name passed in as parameter."""
+
+
+@tool
+async def web_search(query: str) -> str:
+    """Search the web for information based on a query and return top 20 results."""
+
+
+DISTRACTORS = [
+    ("get_weather", "Get the current weather and forecast for a city."),
+    ("send_email", "Send an email to a recipient with a subject and body."),
+    ("create_calendar_event", "Create a calendar event with a title, start time and attendees."),
+    ("get_stock_quote", "Get the latest stock market quote for a ticker symbol."),
+    ("convert_currency", "Convert an amount of money from one currency to another."),
+    ("translate_text", "Translate text into a target language."),
+    ("create_ticket", "Open a support ticket in the issue tracker."),
+    ("run_sql_query", "Run a read-only SQL query against the analytics database."),
+    ("get_directions", "Get driving or walking directions between two places."),
+    ("book_restaurant", "Book a table at a restaurant for a date, time and party size."),
+    ("set_reminder", "Set a reminder notification at a given time."),
+    ("get_news_headlines", "Get today's top news headlines for a topic."),
+    ("calculate", "Evaluate a mathematical expression."),
+    ("lookup_order", "Look up the status of a customer order by order number."),
+    ("summarize_document", "Summarize an uploaded document."),
+    ("get_exchange_rate", "Get the exchange rate between two currencies."),
+]
+
+# (message, tools the answer needs besides the pinned ones)
+QUERIES = [
+    ("What is the price of apples?", {"get_fruit_price"}),
+    ("How much do bananas cost?", {"get_fruit_price"}),
+    ("Is mango expensive right now?", {"get_fruit_price"}),
+    ("What is the price of my favourite fruit?", {"get_fruit_price"}),
+    ("Compare the prices of kiwis and oranges", {"get_fruit_price"}),
+    ("Find information about the latest AI research.", {"web_search"}),
+    ("Search the web for python 3.13 release notes", {"web_search"}),
+    ("What happened in the news today?", {"web_search"}),
+    ("Who won the football match last night?", {"web_search"}),
+    ("Look up reviews of the new iPhone", {"web_search"}),
+    ("My name is Alice", set()),
+    ("What is my favourite colour?", set()),
+    ("Remember that my locker code is 4411", set()),
+    ("What do you know about me?", set()),
+    ("Hello!", set()),
+    ("Thanks, that's all", set()),
+]
+
+
+def catalog(extra: int) -> list:
+    tools = [save_memory, recall_memory, get_all_memories, get_fruit_price, web_search]
+    for name, description in DISTRACTORS[:extra]:
+        tools.append(StructuredTool.from_function(func=lambda query="": "", name=name, description=description))
+    return tools
+
+
+async def evaluate(router: ToolRouter, full_tokens: int) -> dict:
+    hits, bound, tokens, subsets = 0, 0, 0, set()
+    for message, needed in QUERIES:
+        names = await router.select(message)
+        hits += needed <= names
+        bound += len(names)
+        tokens += router.schema_tokens(names)
+        subsets.add(names)
+    n = len(QUERIES)
+    return {
+        "recall": hits / n,
+        "tools": bound / n,
+        "tokens": tokens / n,
+        "saved": 1 - tokens / n / full_tokens,
+        "subsets": len(subsets),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--extra-tools", type=int, default=0, help=f"Distractor tools to add (max {len(DISTRACTORS)})")
+    parser.add_argument("--min-similarity", default="0.1,0.15,0.2,0.25,0.3,0.4")
+    parser.add_argument("--top-k", default="2,4")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(os.path.join(tempfile.mkdtemp(), "embedding-metadata.json"))
+    embeddings = EmbeddingService(args.model, registry)
+    tools = catalog(args.extra_tools)
+    full = ToolRouter(embeddings, pinned=PINNED)
+    full.set_tools(tools, lambda subset: None, None)
+    full_tokens = full.schema_tokens(t.name for t in tools)
+
+    print(f"{len(tools)} tools ({full_tokens} schema tokens), {len(QUERIES)} messages, model={args.model}\n")
+    print(f"{'top_k':>5} | {'min_sim':>7} | {'recall':>6} | {'tools':>5} | {'tokens':>6} | {'saved':>6} | {'subsets':>7}")
+    print("-" * 62)
+    for top_k in [int(v) for v in args.top_k.split(",")]:
+        for min_similarity in [float(v) for v in args.min_similarity.split(",")]:
+            router = ToolRouter(embeddings, pinned=PINNED, top_k=top_k, min_similarity=min_similarity)
+            router.set_tools(tools, lambda subset: None, None)
+            r = await evaluate(router, full_tokens)
+            print(
+                f"{top_k:>5} | {min_similarity:>7.2f} | {r['recall']:>6.2f} | {r['tools']:>5.1f} | "
+                f"{r['tokens']:>6.0f} | {r['saved']:>6.0%} | {r['subsets']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
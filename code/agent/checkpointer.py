@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import aiosqlite
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger(__name__)
+
+
+def cap_messages(checkpoint: dict, max_messages: int) -> dict:
+    """Drop the oldest messages from a checkpoint so at most `max_messages` remain.
+
+    The cut is moved forward to the next HumanMessage so a kept window never starts
+    with an orphaned tool result. If no such boundary exists the checkpoint is
+    returned unchanged.
+    """
+    messages = checkpoint.get("channel_values", {}).get("messages")
+    if not max_messages or not messages or len(messages) <= max_messages:
+        return checkpoint
+    cut = len(messages) - max_messages
+    while cut < len(messages) and not isinstance(messages[cut], HumanMessage):
+        cut += 1
+    if cut >= len(messages):
+        return checkpoint
+    return {
+        **checkpoint,
+        "channel_values": {**checkpoint["channel_values"], "messages": messages[cut:]},
+    }
+
+
+def _thread_id(config: dict) -> str | None:
+    return config.get("configurable", {}).get("thread_id")
+
+
+# ============================================================================
+# In-process backend
+# ============================================================================
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver with a per-thread message cap, idle TTL and LRU thread limit.
+
+    Every step of every turn stores a checkpoint, so each `put` also compacts
+    the thread to its newest `keep_checkpoints` checkpoints, dropping their
+    pending writes and the channel values only they referenced.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 200,
+        thread_ttl: float = 86400.0,
+        max_threads: int = 10000,
+        keep_checkpoints: int = 3,
+    ):
+        super().__init__()
+        self.max_messages = max_messages
+        self.thread_ttl = thread_ttl
+        self.max_threads = max_threads
+        self.keep_checkpoints = keep_checkpoints
+        self._access: OrderedDict[str, float] = OrderedDict()
+        self._access_lock = threading.Lock()
+
+    def _touch(self, config: dict):
+        thread_id = _thread_id(config)
+        if thread_id is None:
+            return
+        with self._access_lock:
+            self._access[thread_id] = time.time()
+            self._access.move_to_end(thread_id)
+
+    def get_tuple(self, config):
+        self._touch(config)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self._touch(config)
+        saved = super().put(config, cap_messages(checkpoint, self.max_messages), metadata, new_versions)
+        self._compact(saved["configurable"]["thread_id"], saved["configurable"]["checkpoint_ns"])
+        return saved
+
+    def _compact(self, thread_id: str, checkpoint_ns: str):
+        checkpoints = self.storage.get(thread_id, {}).get(checkpoint_ns)
+        if not checkpoints or len(checkpoints) <= self.keep_checkpoints:
+            return
+        # Checkpoint ids are time-ordered (uuid6)
+        ids = sorted(checkpoints)
+        keep, drop = ids[-self.keep_checkpoints:], ids[:-self.keep_checkpoints]
+        live = {
+            (channel, version)
+            for checkpoint_id in keep
+            for channel, version in self.serde.loads_typed(checkpoints[checkpoint_id][0])["channel_versions"].items()
+        }
+        for checkpoint_id in drop:
+            # Every blob was stored with the checkpoint that first referenced its version
+            versions = self.serde.loads_typed(checkpoints.pop(checkpoint_id)[0])["channel_versions"]
+            for channel, version in versions.items():
+                if (channel, version) not in live:
+                    self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+    def compact(self):
+        """Compact every thread to its newest `keep_checkpoints` checkpoints."""
+        for thread_id in list(self.storage):
+            for checkpoint_ns in list(self.storage[thread_id]):
+                self._compact(thread_id, checkpoint_ns)
+
+    async def prune(self) -> int:
+        cutoff = time.time() - self.thread_ttl
+        with self._access_lock:
+            evict = [t for t, last in self._access.items() if last < cutoff]
+            overflow = len(self._access) - len(evict) - self.max_threads
+            if overflow > 0:
+                evict += [t for t in self._access if t not in evict][:overflow]
+            for thread_id in evict:
+                del self._access[thread_id]
+        for thread_id in evict:
+            self.delete_thread(thread_id)
+        self.compact()
+        return len(evict)
+
+    async def stats(self) -> dict:
+        checkpoints = sum(len(c) for namespaces in self.storage.values() for c in namespaces.values())
+        return {"backend": "memory", "threads": len(self._access), "checkpoints": checkpoints}
+
+    async def aclose(self):
+        pass
+
+
+# ============================================================================
+# SQLite backend
+# ============================================================================
+class BoundedSqliteSaver(AsyncSqliteSaver):
+    """SQLite (WAL) checkpointer that keeps thread state bounded.
+
+    - every read/write records the thread's last access time
+    - threads idle for longer than `thread_ttl` are deleted
+    - beyond `max_threads` the least recently used threads are deleted
+    - each stored checkpoint keeps at most `max_messages` messages
+    - compaction keeps only the newest `keep_checkpoints` checkpoints per thread
+    - pruning returns freed pages to the filesystem, so `size_bytes` shrinks.
+      Files created before incremental auto-vacuum was enabled don't shrink
+      (their free pages are reused instead) until they are VACUUMed once
+    """
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        path: str,
+        max_messages: int = 200,
+        thread_ttl: float = 86400.0,
+        max_threads: int = 10000,
+        keep_checkpoints: int = 3,
+    ):
+        super().__init__(conn)
+        self.path = path
+        self.max_messages = max_messages
+        self.thread_ttl = thread_ttl
+        self.max_threads = max_threads
+        self.keep_checkpoints = keep_checkpoints
+        self._access_setup = False
+
+    async def setup(self) -> None:
+        if self._access_setup:
+            return
+        if not self.is_setup:
+            async with self.lock:
+                # Lets prune() hand freed pages back to the filesystem. Only takes
+                # effect before the first table is created, i.e. on a new file
+                await self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await super().setup()
+        async with self.lock:
+            if self._access_setup:
+                return
+            await self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_access (thread_id TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+            )
+            await self.conn.commit()
+            self._access_setup = True
+
+    async def _touch(self, config: dict):
+        thread_id = _thread_id(config)
+        if thread_id is None:
+            return
+        await self.setup()
+        async with self.lock:
+            await self.conn.execute(
+                "INSERT INTO thread_access (thread_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_access = excluded.last_access",
+                (thread_id, time.time()),
+            )
+            await self.conn.commit()
+
+    async def aget_tuple(self, config):
+        await self._touch(config)
+        return await super().aget_tuple(config)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        await self._touch(config)
+        return await super().aput(config, cap_messages(checkpoint, self.max_messages), metadata, new_versions)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        async with self.lock:
+            await self.conn.execute("DELETE FROM thread_access WHERE thread_id = ?", (thread_id,))
+            await self.conn.commit()
+
+    async def prune(self) -> int:
+        """Evict expired / least recently used threads and compact the rest."""
+        await self.setup()
+        async with self.lock:
+            async with self.conn.execute(
+                "SELECT thread_id FROM thread_access WHERE last_access < ?",
+                (time.time() - self.thread_ttl,),
+            ) as cursor:
+                evict = [row[0] for row in await cursor.fetchall()]
+            async with self.conn.execute(
+                "SELECT thread_id FROM thread_access WHERE last_access >= ? "
+                "ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+                (time.time() - self.thread_ttl, self.max_threads),
+            ) as cursor:
+                evict += [row[0] for row in await cursor.fetchall()]
+
+        for thread_id in evict:
+            await self.adelete_thread(thread_id)
+        await self.compact()
+        return len(evict)
+
+    async def compact(self):
+        """Delete all but the newest `keep_checkpoints` checkpoints (and their writes) per thread."""
+        async with self.lock:
+            await self.conn.execute(
+                """DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                        ) AS rn FROM checkpoints
+                    ) WHERE rn > ?
+                )""",
+                (self.keep_checkpoints,),
+            )
+            await self.conn.execute(
+                """DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c
+                    WHERE c.thread_id = writes.thread_id
+                      AND c.checkpoint_ns = writes.checkpoint_ns
+                      AND c.checkpoint_id = writes.checkpoint_id
+                )"""
+            )
+            await self.conn.commit()
+            # Truncate the freed pages off the file, then fold the WAL back into it
+            await self.conn.executescript("PRAGMA incremental_vacuum; PRAGMA wal_checkpoint(TRUNCATE);")
+
+    async def stats(self) -> dict:
+        await self.setup()
+        async with self.lock:
+            async with self.conn.execute("SELECT COUNT(*) FROM thread_access") as cursor:
+                threads = (await cursor.fetchone())[0]
+            async with self.conn.execute("SELECT COUNT(*) FROM checkpoints") as cursor:
+                checkpoints = (await cursor.fetchone())[0]
+        size_bytes = 0
+        for suffix in ("", "-wal"):
+            try:
+                size_bytes += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return {"backend": "sqlite", "threads": threads, "checkpoints": checkpoints, "size_bytes": size_bytes}
+
+    async def aclose(self):
+        await self.conn.close()
+
+
+# ============================================================================
+# Factory + maintenance
+# ============================================================================
+async def create_checkpointer(
+    backend: str,
+    path: str,
+    max_messages: int,
+    thread_ttl: float,
+    max_threads: int,
+    keep_checkpoints: int,
+):
+    """Build the checkpointer selected by `backend` ("sqlite" or "memory")."""
+    if backend == "memory":
+        return BoundedMemorySaver(
+            max_messages=max_messages,
+            thread_ttl=thread_ttl,
+            max_threads=max_threads,
+            keep_checkpoints=keep_checkpoints,
+        )
+    if backend != "sqlite":
+        raise ValueError(f"Unknown checkpointer backend '{backend}' (expected 'sqlite' or 'memory')")
+
+    conn = await aiosqlite.connect(path)
+    saver = BoundedSqliteSaver(
+        conn,
+        path,
+        max_messages=max_messages,
+        thread_ttl=thread_ttl,
+        max_threads=max_threads,
+        keep_checkpoints=keep_checkpoints,
+    )
+    await saver.setup()
+    return saver
+
+
+async def run_checkpoint_maintenance(checkpointer, interval: float):
+    """Periodically evict idle threads and compact old checkpoints."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await checkpointer.prune()
+            if evicted:
+                logger.info(f"Checkpointer evicted {evicted} threads")
+        except Exception as e:
+            logger.error(f"Checkpointer maintenance failed: {e!r}")
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+from opentelemetry import metrics
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+
+# Output dimensions of common sentence-transformers models, so startup never has to
+# instantiate a model just to size the vector store
+KNOWN_EMBEDDING_DIMS = {
+    "all-MiniLM-L6-v2": 384,
+    "all-MiniLM-L12-v2": 384,
+    "all-mpnet-base-v2": 768,
+    "multi-qa-MiniLM-L6-cos-v1": 384,
+    "paraphrase-MiniLM-L6-v2": 384,
+    "BAAI/bge-small-en-v1.5": 384,
+    "BAAI/bge-base-en-v1.5": 768,
+}
+
+
+# ============================================================================
+# Model registry
+# ============================================================================
+class ModelRegistry:
+    """Loads each SentenceTransformer model at most once per process.
+
+    Dimensions come from `KNOWN_EMBEDDING_DIMS` or a small JSON metadata file
+    written the first time a model is loaded, so they are available without
+    loading the model. `preload` loads a model on a background thread and
+    `is_ready` reports whether it has finished.
+    """
+
+    def __init__(self, metadata_path: str):
+        self.metadata_path = metadata_path
+        self._models: dict[str, SentenceTransformer] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._errors: dict[str, Exception] = {}
+
+    def _read_metadata(self) -> dict:
+        try:
+            with open(self.metadata_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_metadata(self, model_name: str, dimension: int):
+        metadata = self._read_metadata()
+        if metadata.get(model_name, {}).get("dimension") == dimension:
+            return
+        metadata[model_name] = {"dimension": dimension}
+        try:
+            os.makedirs(os.path.dirname(self.metadata_path) or ".", exist_ok=True)
+            tmp_path = f"{self.metadata_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(metadata, f)
+            os.replace(tmp_path, self.metadata_path)
+        except OSError as e:
+            logger.warning(f"Could not write embedding metadata to {self.metadata_path}: {e}")
+
+    def dimension(self, model_name: str) -> int:
+        """Embedding dimension for `model_name`, loading the model only as a last resort."""
+        if model_name in KNOWN_EMBEDDING_DIMS:
+            return KNOWN_EMBEDDING_DIMS[model_name]
+        dimension = self._read_metadata().get(model_name, {}).get("dimension")
+        if dimension:
+            return dimension
+        return self.get(model_name).get_sentence_embedding_dimension()
+
+    def get(self, model_name: str) -> SentenceTransformer:
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+        with self._lock:
+            model_lock = self._locks.setdefault(model_name, threading.Lock())
+        with model_lock:
+            if model_name not in self._models:
+                started = time.perf_counter()
+                try:
+                    model = SentenceTransformer(model_name)
+                except Exception as e:
+                    self._errors[model_name] = e
+                    raise
+                self._errors.pop(model_name, None)
+                self._write_metadata(model_name, model.get_sentence_embedding_dimension())
+                self._models[model_name] = model
+                logger.info(f"Loaded embedding model '{model_name}' in {time.perf_counter() - started:.1f}s")
+            return self._models[model_name]
+
+    def preload(self, model_name: str) -> threading.Thread:
+        def _load():
+            try:
+                self.get(model_name)
+            except Exception as e:
+                logger.error(f"Failed to preload embedding model '{model_name}': {e}")
+
+        thread = threading.Thread(target=_load, name=f"preload-{model_name}", daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def error(self, model_name: str) -> Exception | None:
+        return self._errors.get(model_name)
+
+
+def normalize_text(text: str) -> str:
+    """Cache key normalisation: unicode NFC and collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+# ============================================================================
+# Embedding cache
+# ============================================================================
+class EmbeddingCache:
+    """Thread-safe LRU cache with a TTL, keyed by (model name, normalised text)."""
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> list[float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, vector = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def put(self, key: tuple[str, str], vector: list[float]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ============================================================================
+# Shared embedding service
+# ============================================================================
+class EmbeddingService(Embeddings):
+    """Cached, micro-batched SentenceTransformer encoder shared by the whole agent.
+
+    Cache misses are handed to a single batcher thread which waits up to
+    `batch_wait_ms` for other concurrent requests and encodes them all in one
+    `SentenceTransformer.encode` call. Implements LangChain's `Embeddings`
+    interface so Mem0 can use it through its `langchain` embedder provider.
+    The model itself comes from the shared `ModelRegistry`.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        registry: ModelRegistry,
+        cache_size: int = 4096,
+        cache_ttl: float = 3600.0,
+        batch_wait_ms: float = 5.0,
+        max_batch_size: int = 64,
+    ):
+        self.model_name = model_name
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache = EmbeddingCache(cache_size, cache_ttl)
+        self.registry = registry
+
+        self._requests: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._batches = 0
+        self._batched_texts = 0
+
+        self._hit_counter = meter.create_counter(
+            "embedding.cache.hits", description="Embedding requests served from cache"
+        )
+        self._miss_counter = meter.create_counter(
+            "embedding.cache.misses", description="Embedding requests that needed the model"
+        )
+        self._batch_hist = meter.create_histogram(
+            "embedding.batch.size", description="Texts encoded per SentenceTransformer.encode call"
+        )
+        self._encode_hist = meter.create_histogram(
+            "embedding.batch.duration", unit="ms", description="SentenceTransformer.encode latency per batch"
+        )
+
+        self._batcher = threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True)
+        self._batcher.start()
+
+    @property
+    def model(self) -> SentenceTransformer:
+        return self.registry.get(self.model_name)
+
+    @property
+    def dimension(self) -> int:
+        return self.registry.dimension(self.model_name)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            return {
+                "model": self.model_name,
+                "cache_entries": len(self.cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "batches": self._batches,
+                "avg_batch_size": self._batched_texts / self._batches if self._batches else 0.0,
+            }
+
+    # ------------------------------------------------------------------
+    # Batcher thread
+    # ------------------------------------------------------------------
+    def _batch_loop(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: list[tuple[str, Future]]):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        started = time.perf_counter()
+        try:
+            vectors = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self._encode_hist.record((time.perf_counter() - started) * 1000, {"model": self.model_name})
+        self._batch_hist.record(len(texts), {"model": self.model_name})
+        with self._stats_lock:
+            self._batches += 1
+            self._batched_texts += len(texts)
+
+        by_text = {text: vector.tolist() for text, vector in zip(texts, vectors)}
+        for text, future in batch:
+            future.set_result(by_text[text])
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def _submit(self, texts: list[str]) -> tuple[list, dict[int, Future]]:
+        """Resolve cached vectors and queue the rest. Returns (vectors, pending futures by index)."""
+        vectors: list = [None] * len(texts)
+        pending: dict[int, Future] = {}
+        queued: dict[str, Future] = {}
+        hits = 0
+        for i, text in enumerate(texts):
+            key_text = normalize_text(text)
+            cached = self.cache.get((self.model_name, key_text))
+            if cached is not None:
+                vectors[i] = cached
+                hits += 1
+                continue
+            if key_text not in queued:
+                future = Future()
+                queued[key_text] = future
+                self._requests.put((key_text, future))
+            pending[i] = queued[key_text]
+
+        misses = len(texts) - hits
+        with self._stats_lock:
+            self._hits += hits
+            self._misses += misses
+        if hits:
+            self._hit_counter.add(hits, {"model": self.model_name})
+        if misses:
+            self._miss_counter.add(misses, {"model": self.model_name})
+        return vectors, pending
+
+    def _store(self, texts: list[str], vectors: list, pending: dict[int, Future]):
+        for i in pending:
+            self.cache.put((self.model_name, normalize_text(texts[i])), vectors[i])
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors, pending = self._submit(texts)
+        for i, future in pending.items():
+            vectors[i] = future.result()
+        self._store(texts, vectors, pending)
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors, pending = self._submit(texts)
+        for i, future in pending.items():
+            vectors[i] = await asyncio.wrap_future(future)
+        self._store(texts, vectors, pending)
+        return vectors
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,165 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately, get_buffer_string, trim_messages
+from langchain_core.runnables import RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant.
+Update the existing summary with the new messages. Keep every fact the user shared about
+themselves, decisions made, and results of tool calls that may matter later. Be concise and
+write plain prose, no preamble."""
+
+
+def _last_human_index(messages: list) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return 0
+
+
+# ============================================================================
+# Pre-model history stage
+# ============================================================================
+class HistoryCompactor:
+    """`pre_model_hook` that bounds the prompt sent to the model on every ReAct step.
+
+    Three independent stages, each disabled by a threshold of 0:
+
+    1. Tool outputs from earlier turns longer than `tool_output_max_chars` are cut
+       down (the current turn's tool results are always sent in full).
+    2. Once a thread has more than `summarize_after` messages, everything except the
+       last `keep_recent` messages is replaced by a rolling LLM summary. The summary
+       is cached per thread and only extended with newly aged-out messages. It is
+       returned as a leading `SystemMessage`, which `build_agent_graph` merges into
+       the system prompt.
+    3. The result is trimmed to the newest messages that fit in `max_tokens`.
+
+    The output goes to `llm_input_messages`, so the checkpointed history is never
+    modified.
+    """
+
+    def __init__(
+        self,
+        llm,
+        max_tokens: int = 6000,
+        summarize_after: int = 40,
+        keep_recent: int = 20,
+        tool_output_max_chars: int = 2000,
+        summary_cache_size: int = 1000,
+    ):
+        self.llm = llm.with_config(tags=["history_summary"]) if llm is not None else None
+        self.max_tokens = max_tokens
+        self.summarize_after = summarize_after
+        self.keep_recent = keep_recent
+        self.tool_output_max_chars = tool_output_max_chars
+        self.summary_cache_size = summary_cache_size
+        # thread_id -> (id of the last summarised message, summary text)
+        self._summaries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def __call__(self, state: dict, config: RunnableConfig) -> dict:
+        messages = list(state["messages"])
+        messages = self._truncate_tool_outputs(messages)
+        messages = await self._summarize(messages, config.get("configurable", {}).get("thread_id"))
+        messages = self._trim(messages)
+        return {"llm_input_messages": messages}
+
+    # ------------------------------------------------------------------
+    # Stage 1: old tool outputs
+    # ------------------------------------------------------------------
+    def _truncate_tool_outputs(self, messages: list) -> list:
+        limit = self.tool_output_max_chars
+        if not limit:
+            return messages
+        current_turn = _last_human_index(messages)
+        for i, message in enumerate(messages[:current_turn]):
+            if isinstance(message, ToolMessage) and isinstance(message.content, str) and len(message.content) > limit:
+                dropped = len(message.content) - limit
+                messages[i] = message.model_copy(
+                    update={"content": f"{message.content[:limit]}\n... [truncated {dropped} chars]"}
+                )
+        return messages
+
+    # ------------------------------------------------------------------
+    # Stage 2: rolling summary
+    # ------------------------------------------------------------------
+    def _split_point(self, messages: list) -> int:
+        """Index where the recent window starts, moved forward to a human turn."""
+        cut = max(len(messages) - self.keep_recent, 0)
+        while cut < len(messages) and not isinstance(messages[cut], HumanMessage):
+            cut += 1
+        return cut
+
+    async def _summarize(self, messages: list, thread_id: str | None) -> list:
+        if not self.summarize_after or self.llm is None or len(messages) <= self.summarize_after:
+            return messages
+        cut = self._split_point(messages)
+        if cut == 0 or cut >= len(messages):
+            return messages
+        old, recent = messages[:cut], messages[cut:]
+
+        with self._lock:
+            cached = self._summaries.get(thread_id) if thread_id else None
+        summary = ""
+        new_old = old
+        if cached:
+            boundary_id, summary = cached
+            ids = [m.id for m in old]
+            if boundary_id in ids:
+                new_old = old[ids.index(boundary_id) + 1:]
+                # Only pay for another summary call once a full window has aged out
+                if len(new_old) < self.keep_recent:
+                    return [self._summary_message(summary)] + new_old + recent
+
+        if new_old:
+            try:
+                summary = await self._extend_summary(summary, new_old)
+            except Exception as e:
+                logger.warning(f"History summarisation failed, sending recent window only: {e}")
+                return recent
+            if thread_id and old[-1].id:
+                with self._lock:
+                    self._summaries[thread_id] = (old[-1].id, summary)
+                    self._summaries.move_to_end(thread_id)
+                    while len(self._summaries) > self.summary_cache_size:
+                        self._summaries.popitem(last=False)
+
+        return [self._summary_message(summary)] + recent
+
+    @staticmethod
+    def _summary_message(summary: str) -> SystemMessage:
+        return SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+
+    async def _extend_summary(self, summary: str, messages: list) -> str:
+        transcript = get_buffer_string(messages)
+        response = await self.llm.ainvoke([
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"),
+        ])
+        return response.content
+
+    # ------------------------------------------------------------------
+    # Stage 3: token budget
+    # ------------------------------------------------------------------
+    def _trim(self, messages: list) -> list:
+        if not self.max_tokens:
+            return messages
+        trimmed = trim_messages(
+            messages,
+            max_tokens=self.max_tokens,
+            strategy="last",
+            token_counter=count_tokens_approximately,
+            include_system=True,
+            start_on="human",
+            allow_partial=False,
+        )
+        # The current turn always goes through, even if it alone exceeds the budget
+        current_turn = _last_human_index(messages)
+        if not any(m is messages[current_turn] for m in trimmed):
+            head = messages[:1] if isinstance(messages[0], SystemMessage) else []
+            return head + messages[current_turn:]
+        return trimmed
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+
+def _results(response) -> list[dict]:
+    return response.get("results", []) if isinstance(response, dict) else response or []
+
+
+class _UserMemories:
+    """One user's memories by id, their vectors, and the matrix searched."""
+
+    def __init__(self, rows: dict[str, dict]):
+        self.rows = rows
+        self.vectors: dict[str, np.ndarray] = {}
+        self.loaded_at = time.monotonic()
+        self.nbytes = 0
+        # Bytes of this entry included in the index total
+        self.counted = 0
+        self._ids: list[str] = []
+        self._matrix: np.ndarray | None = None
+        self._sq_norms: np.ndarray | None = None
+
+    def apply(self, item: dict) -> None:
+        memory_id = item.get("id")
+        event = item.get("event", "ADD")
+        if not memory_id or event not in ("ADD", "UPDATE", "DELETE"):
+            return
+        if event == "DELETE":
+            self.rows.pop(memory_id, None)
+        else:
+            self.rows[memory_id] = {**self.rows.get(memory_id, {}), "id": memory_id, "memory": item.get("memory", "")}
+        self.vectors.pop(memory_id, None)
+        self._matrix = None
+
+    def missing(self) -> list[tuple[str, str]]:
+        return [(memory_id, row["memory"]) for memory_id, row in self.rows.items() if memory_id not in self.vectors]
+
+    def set_vectors(self, missing: list[tuple[str, str]], vectors: list[list[float]]) -> None:
+        for (memory_id, text), vector in zip(missing, vectors):
+            # Skip rows updated or deleted while they were being embedded
+            if self.rows.get(memory_id, {}).get("memory") == text:
+                self.vectors[memory_id] = np.asarray(vector, dtype=np.float32)
+        self._matrix = None
+
+    def compiled(self) -> tuple[list[str], np.ndarray, np.ndarray]:
+        if self._matrix is None:
+            self._ids = [memory_id for memory_id in self.rows if memory_id in self.vectors]
+            if self._ids:
+                self._matrix = np.stack([self.vectors[memory_id] for memory_id in self._ids])
+            else:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._sq_norms = np.einsum("ij,ij->i", self._matrix, self._matrix)
+            # Matrix plus per-row vectors, and the text
+            self.nbytes = 2 * self._matrix.nbytes + sum(len(row["memory"]) for row in self.rows.values())
+        return self._ids, self._matrix, self._sq_norms
+
+
+# ============================================================================
+# In-process per-user memory index
+# ============================================================================
+class HotMemoryIndex:
+    """Serves `recall_memory` from an in-process copy of each active user's memories.
+
+    Most users have a few dozen memories, so brute force over a contiguous
+    NumPy matrix answers a recall in microseconds, compared with a network round
+    trip to Milvus. A user's memories are loaded with `memory.get_all` on their
+    first recall and kept in LRU order within `max_bytes`. Scores are the same
+    squared L2 distances Milvus returns for the collection.
+
+    Milvus stays the source of truth:
+
+    - writes arrive through `recent_writes` listeners (saves, write-behind
+      flushes, consolidation) and are applied to loaded users
+    - a user is reloaded after `ttl` seconds. Other agent replicas' writes
+      are not seen before then, so with several replicas a fact saved
+      elsewhere can be missing from recalls here for up to `ttl`
+    - users with more than `max_per_user` memories, and any failure, fall
+      back to `memory.search`: `search` then returns None
+    """
+
+    def __init__(
+        self,
+        memory,
+        embeddings,
+        executor=None,
+        recent_writes=None,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_per_user: int = 500,
+        ttl: float = 5.0,
+    ):
+        self.memory = memory
+        self.embeddings = embeddings
+        self.executor = executor
+        self.recent_writes = recent_writes
+        self.max_bytes = max_bytes
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self._users: OrderedDict[str, _UserMemories] = OrderedDict()
+        self._bytes = 0
+        # user_id -> monotonic time until which the user is served by Milvus
+        self._bypassed: dict[str, float] = {}
+        self._loading: dict[str, asyncio.Future] = {}
+        # Writes that arrive while a user is loading, replayed onto the loaded copy
+        self._buffered: dict[str, list[dict]] = {}
+        self._lock = threading.Lock()
+        self._counts = {"hit": 0, "load": 0, "bypass": 0, "error": 0}
+        if recent_writes is not None:
+            recent_writes.add_listener(self.apply)
+
+        self._lookups = meter.create_counter(
+            "memory.hot_index.lookups", description="recall_memory lookups by outcome (hit, load, bypass, error)"
+        )
+        meter.create_observable_gauge(
+            "memory.hot_index.users",
+            callbacks=[lambda options: [Observation(len(self._users))]],
+            description="Users whose memories are held in process",
+        )
+        meter.create_observable_gauge(
+            "memory.hot_index.size",
+            callbacks=[lambda options: [Observation(self._bytes)]],
+            unit="By",
+            description="Approximate memory used by the in-process index",
+        )
+
+    def _count(self, outcome: str):
+        self._counts[outcome] += 1
+        self._lookups.add(1, {"outcome": outcome})
+
+    def apply(self, user_id: str, items: list) -> None:
+        """Apply `memory.add` result items (ADD / UPDATE / DELETE) to a loaded user."""
+        with self._lock:
+            if user_id in self._buffered:
+                self._buffered[user_id].extend(i for i in items if isinstance(i, dict))
+            entry = self._users.get(user_id)
+            if entry is not None:
+                for item in items:
+                    if isinstance(item, dict):
+                        entry.apply(item)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            entry = self._users.pop(user_id, None)
+            if entry is not None:
+                self._bytes -= entry.counted
+
+    async def search(self, query: str, user_id: str, limit: int = 10) -> list[dict] | None:
+        """Top `limit` memories for `query`, or None when the caller should ask Mem0."""
+        try:
+            entry, outcome = await self._entry(user_id)
+            if entry is None:
+                self._count(outcome)
+                return None
+            query_vector = np.asarray(await self.embeddings.aembed_query(query), dtype=np.float32)
+            await self._embed_missing(entry)
+            with self._lock:
+                # A row saved since _embed_missing has no vector yet; recent_writes covers it
+                ids, matrix, sq_norms = entry.compiled()
+                rows = [entry.rows[memory_id] for memory_id in ids]
+                if self._users.get(user_id) is entry:
+                    self._recount(entry)
+            self._count(outcome)
+            if not ids:
+                return []
+            distances = sq_norms - 2 * (matrix @ query_vector) + query_vector @ query_vector
+            k = min(limit, len(ids))
+            top = np.argpartition(distances, k - 1)[:k]
+            top = top[np.argsort(distances[top])]
+            return [{**rows[i], "score": float(max(distances[i], 0.0))} for i in top]
+        except Exception as e:
+            logger.warning(f"Hot memory index failed for user '{user_id}', using Mem0: {e!r}")
+            self.invalidate(user_id)
+            self._count("error")
+            return None
+
+    async def _entry(self, user_id: str) -> tuple[_UserMemories | None, str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and now - entry.loaded_at < self.ttl:
+                self._users.move_to_end(user_id)
+                return entry, "hit"
+            if self._bypassed.get(user_id, 0) > now:
+                return None, "bypass"
+        future = self._loading.get(user_id)
+        if future is None:
+            future = self._loading[user_id] = asyncio.ensure_future(self._load(user_id))
+            future.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        entry = await asyncio.shield(future)
+        return entry, "load" if entry is not None else "bypass"
+
+    async def _load(self, user_id: str) -> _UserMemories | None:
+        with self._lock:
+            self._buffered[user_id] = []
+        try:
+            if self.executor is not None:
+                response = await self.executor.run(
+                    "get_all", self.memory.get_all, user_id=user_id, limit=self.max_per_user + 1
+                )
+            else:
+                response = await asyncio.to_thread(self.memory.get_all, user_id=user_id, limit=self.max_per_user + 1)
+            rows = [r for r in _results(response) if isinstance(r, dict) and r.get("id") and r.get("memory")]
+            if len(rows) > self.max_per_user:
+                now = time.monotonic()
+                with self._lock:
+                    if len(self._bypassed) > 10000:
+                        self._bypassed = {u: until for u, until in self._bypassed.items() if until > now}
+                    self._bypassed[user_id] = now + self.ttl
+                return None
+            if self.recent_writes is not None:
+                # Saves from moments ago may not be visible to get_all yet
+                rows = [{k: v for k, v in r.items() if k != "recent"} for r in self.recent_writes.merge(user_id, rows)]
+            entry = _UserMemories({r["id"]: r for r in rows})
+            await self._embed_missing(entry)
+        except BaseException:
+            with self._lock:
+                self._buffered.pop(user_id, None)
+            raise
+
+        with self._lock:
+            for item in self._buffered.pop(user_id, []):
+                entry.apply(item)
+            old = self._users.pop(user_id, None)
+            if old is not None:
+                self._bytes -= old.counted
+            self._users[user_id] = entry
+            entry.compiled()
+            self._recount(entry)
+        return entry
+
+    async def _embed_missing(self, entry: _UserMemories) -> None:
+        with self._lock:
+            missing = entry.missing()
+        if not missing:
+            return
+        # Mem0 embedded these texts through the same service, so most are cache hits
+        vectors = await self.embeddings.aembed_documents([text for _, text in missing])
+        with self._lock:
+            entry.set_vectors(missing, vectors)
+
+    def _recount(self, entry: _UserMemories) -> None:
+        """Bring the total up to date with `entry`'s size and evict to fit (lock held)."""
+        self._bytes += entry.nbytes - entry.counted
+        entry.counted = entry.nbytes
+        while self._bytes > self.max_bytes and self._users:
+            _, evicted = self._users.popitem(last=False)
+            self._bytes -= evicted.counted
+
+    def stats(self) -> dict:
+        return {"users": len(self._users), "bytes": self._bytes, **self._counts}
@@ -1,7 +1,12 @@
 import os
+import json
+import asyncio
+import time
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -18,20 +23,33 @@ from opentelemetry.instrumentation.logging import LoggingInstrumentor
 
 # LangChain / LangGraph
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.tools import tool
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
 # from langchain.agents import create_agent
 
 # MCP
-from langchain_mcp_adapters.client import MultiServerMCPClient
+from mcp_pool import MCPConnectionManager
 
 # Mem0
 from mem0 import Memory
-from sentence_transformers import SentenceTransformer
 
-from tool import setup_telemetry, save_memory, recall_memory, get_all_memories, get_embedding_dim
+from tool import setup_telemetry, save_memory, recall_memory, get_all_memories
+from memory_executor import MemoryExecutor
+from memory_queue import WriteBehindQueue
+from recent_writes import RecentWrites
+from raw_memory import RawFactMemory
+from hot_memory import HotMemoryIndex
+from memory_prefetch import MemoryPrefetcher
+from vector_store import IndexConfig, PartitionedMilvusDB
+from embeddings import EmbeddingService, ModelRegistry
+from checkpointer import create_checkpointer, run_checkpoint_maintenance
+from agent_graph import build_agent_graph
+from history import HistoryCompactor
+from tool_router import ToolRouter
+from tool_wrappers import ToolResultCache, parse_cache_policies, with_caching, with_metrics, with_timeouts
+from response_cache import SemanticResponseCache
+from scheduler import ChatScheduler, ChatSchedulerFull
+from runtime_metrics import CheckpointerGauges, EventLoopLagMonitor, LLMMetricsCallback
 
 load_dotenv()
 
@@ -49,46 +67,187 @@ logger = logging.getLogger(__name__)
 # ============================================================================
 MILVUS_HOST = os.getenv("MILVUS_HOST", "milvus-standalone")
 MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
+# Server URL, or a local *.db path to run on Milvus Lite
+MILVUS_URI = os.getenv("MILVUS_URI", f"http://{MILVUS_HOST}:{MILVUS_PORT}")
+MILVUS_COLLECTION = os.getenv("MILVUS_COLLECTION", "mem0_agent_memory")
+# Memory collection layout, applied when the collection is created: "partition_key" (user_id
+# partition key, a user's searches only touch their partition), "partition" (one partition per user) or "none"
+MILVUS_PARTITIONING = os.getenv("MILVUS_PARTITIONING", "partition_key")
+MILVUS_NUM_PARTITIONS = int(os.getenv("MILVUS_NUM_PARTITIONS", "64"))
+# ANN index for memory vectors: AUTOINDEX, HNSW, IVF_FLAT or FLAT (exact); ef/nprobe apply per search
+MILVUS_INDEX_TYPE = os.getenv("MILVUS_INDEX_TYPE", "AUTOINDEX")
+MILVUS_HNSW_M = int(os.getenv("MILVUS_HNSW_M", "16"))
+MILVUS_HNSW_EF_CONSTRUCTION = int(os.getenv("MILVUS_HNSW_EF_CONSTRUCTION", "200"))
+MILVUS_HNSW_EF = int(os.getenv("MILVUS_HNSW_EF", "64"))
+MILVUS_IVF_NLIST = int(os.getenv("MILVUS_IVF_NLIST", "128"))
+MILVUS_IVF_NPROBE = int(os.getenv("MILVUS_IVF_NPROBE", "16"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "sk-123456")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "http://ai-gateway:4000")
 MODEL_NAME = os.getenv("MODEL_NAME", "llama-distributed")
 
 # make sure that this model is baked into the image and available locally for this agent code
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_TTL_S = float(os.getenv("EMBEDDING_CACHE_TTL_S", "3600"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+# Cached model dimensions, so startup can size the vector store without loading the model
+EMBEDDING_METADATA_PATH = os.getenv(
+    "EMBEDDING_METADATA_PATH", os.path.expanduser("~/.cache/agent/embedding_models.json")
+)
 
 MCP_HOST = os.getenv("MCP_HOST", "mcp")
 MCP_PORT = os.getenv("MCP_PORT", "8000")
+# "sse" or "streamable_http"; MCP_URL overrides the URL built from host/port
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse")
+MCP_URL = os.getenv("MCP_URL") or (
+    f"http://{MCP_HOST}:{MCP_PORT}/" + ("sse" if MCP_TRANSPORT == "sse" else "mcp")
+)
+# Long-lived, health-checked MCP sessions shared by all tool calls
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_HEALTH_INTERVAL_S = float(os.getenv("MCP_HEALTH_INTERVAL_S", "15"))
+MCP_CONNECT_WAIT_S = float(os.getenv("MCP_CONNECT_WAIT_S", "10"))
 OTEL_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://otel-collector:4318/v1/traces")
-
-SYSTEM_PROMPT = """You are a helpful and friendly AI assistant with persistent long-term memory that spans across conversations.
+OTEL_METRICS_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_METRICS_ENDPOINT")
+# Serve all OTel metrics in Prometheus format on GET /metrics
+METRICS_PROMETHEUS_ENABLED = os.getenv("METRICS_PROMETHEUS_ENABLED", "true").lower() == "true"
+
+# Mem0 calls (LLM extraction, embedding, Milvus I/O) run on this bounded worker pool
+MEMORY_MAX_WORKERS = int(os.getenv("MEMORY_MAX_WORKERS", "4"))
+MEMORY_MAX_QUEUE = int(os.getenv("MEMORY_MAX_QUEUE", "32"))
+MEMORY_TIMEOUT_S = float(os.getenv("MEMORY_TIMEOUT_S", "30"))
+
+# "sync" writes to Mem0 inside save_memory; "write_behind" queues locally and drains in the background
+MEMORY_WRITE_MODE = os.getenv("MEMORY_WRITE_MODE", "sync")
+MEMORY_QUEUE_PATH = os.getenv("MEMORY_QUEUE_PATH", "/tmp/agent-memory-queue.db")
+MEMORY_FLUSH_BATCH_SIZE = int(os.getenv("MEMORY_FLUSH_BATCH_SIZE", "16"))
+MEMORY_FLUSH_INTERVAL_S = float(os.getenv("MEMORY_FLUSH_INTERVAL_S", "1.0"))
+# A flush that timed out may still land: its facts are checked for in Mem0 after this long, not rewritten
+MEMORY_FLUSH_IN_DOUBT_RETRY_S = float(os.getenv("MEMORY_FLUSH_IN_DOUBT_RETRY_S", "120"))
+# A user's own writes are merged into their recalls for this long, covering Milvus indexing delay
+MEMORY_RECENT_WRITES_TTL_S = float(os.getenv("MEMORY_RECENT_WRITES_TTL_S", "30"))
+# Opt-in: in-process copy of active users' memories serving recall_memory (0 MB = off). Users with
+# more memories than the per-user cap are searched in Milvus. Writes made through another replica
+# are only seen once the user's entry is reloaded, after the TTL
+MEMORY_HOT_INDEX_MAX_MB = float(os.getenv("MEMORY_HOT_INDEX_MAX_MB", "0"))
+MEMORY_HOT_INDEX_MAX_PER_USER = int(os.getenv("MEMORY_HOT_INDEX_MAX_PER_USER", "500"))
+MEMORY_HOT_INDEX_TTL_S = float(os.getenv("MEMORY_HOT_INDEX_TTL_S", "5"))
+
+# "extract": Mem0 runs LLM fact extraction on every save. "raw": facts are stored verbatim
+# (no LLM call) with hash and similarity dedupe, and LLM consolidation is an opt-in background pass
+MEMORY_MODE = os.getenv("MEMORY_MODE", "extract")
+MEMORY_DEDUP_THRESHOLD = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.9"))
+MEMORY_DEDUP_CANDIDATES = int(os.getenv("MEMORY_DEDUP_CANDIDATES", "5"))
+MEMORY_CONSOLIDATE_INTERVAL_S = float(os.getenv("MEMORY_CONSOLIDATE_INTERVAL_S", "0"))
+MEMORY_CONSOLIDATE_MIN_FACTS = int(os.getenv("MEMORY_CONSOLIDATE_MIN_FACTS", "5"))
+
+# Conversation state: "sqlite" (persistent, bounded) or "memory" (in-process, bounded)
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "sqlite")
+CHECKPOINTER_PATH = os.getenv("CHECKPOINTER_PATH", "/tmp/agent-checkpoints.db")
+CHECKPOINT_MAX_MESSAGES = int(os.getenv("CHECKPOINT_MAX_MESSAGES", "200"))
+CHECKPOINT_THREAD_TTL_S = float(os.getenv("CHECKPOINT_THREAD_TTL_S", "86400"))
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "10000"))
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "3"))
+CHECKPOINT_MAINTENANCE_INTERVAL_S = float(os.getenv("CHECKPOINT_MAINTENANCE_INTERVAL_S", "300"))
+
+# Prompt history shaping before every model call (0 disables a stage)
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "6000"))
+HISTORY_SUMMARIZE_AFTER = int(os.getenv("HISTORY_SUMMARIZE_AFTER", "40"))
+HISTORY_KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "20"))
+HISTORY_TOOL_OUTPUT_MAX_CHARS = int(os.getenv("HISTORY_TOOL_OUTPUT_MAX_CHARS", "2000"))
+
+# Tool calls from one model step run concurrently, up to this many per request
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+TOOL_TIMEOUT_S = float(os.getenv("TOOL_TIMEOUT_S", "45"))
+# Per-tool overrides as JSON, e.g. '{"web_search": 20, "get_fruit_price": 5}'
+TOOL_TIMEOUTS = json.loads(os.getenv("TOOL_TIMEOUTS", "{}"))
+# MCP tool results cached per tool and arguments; tools without a policy are never cached
+TOOL_CACHE_POLICIES = parse_cache_policies(json.loads(os.getenv(
+    "TOOL_CACHE_POLICIES",
+    '{"get_fruit_price": {"ttl": 300, "ignore_case": true}, "web_search": {"ttl": 120, "ignore_case": true}}',
+)))
+TOOL_CACHE_MAX_BYTES = int(os.getenv("TOOL_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Opt-in: bind each request only to the pinned tools plus the top-k tools whose descriptions
+# are most similar to the message (cosine >= min), instead of sending every tool schema
+TOOL_ROUTER_ENABLED = os.getenv("TOOL_ROUTER_ENABLED", "false").lower() == "true"
+TOOL_ROUTER_PINNED = [
+    name.strip()
+    for name in os.getenv("TOOL_ROUTER_PINNED", "save_memory,recall_memory,get_all_memories").split(",")
+    if name.strip()
+]
+TOOL_ROUTER_TOP_K = int(os.getenv("TOOL_ROUTER_TOP_K", "4"))
+TOOL_ROUTER_MIN_SIMILARITY = float(os.getenv("TOOL_ROUTER_MIN_SIMILARITY", "0.2"))
+# Compiled graphs kept for distinct tool subsets
+TOOL_ROUTER_MAX_GRAPHS = int(os.getenv("TOOL_ROUTER_MAX_GRAPHS", "32"))
+
+# Admission control: agent runs at once, requests allowed to wait (beyond that 429)
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "64"))
+CHAT_MAX_QUEUE_PER_THREAD = int(os.getenv("CHAT_MAX_QUEUE_PER_THREAD", "4"))
+CHAT_QUEUE_TIMEOUT_S = float(os.getenv("CHAT_QUEUE_TIMEOUT_S", "30"))
+
+# Opt-in: answer near-duplicate messages from earlier responses instead of running the agent
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "false").lower() == "true"
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.95"))
+CHAT_CACHE_TTL_S = float(os.getenv("CHAT_CACHE_TTL_S", "600"))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "2000"))
+
+# Opt-in: search memory for personal messages while the agent starts and show the model the
+# matches (squared L2 distance <= max), so it can usually answer without a recall_memory step
+MEMORY_PREFETCH_ENABLED = os.getenv("MEMORY_PREFETCH_ENABLED", "false").lower() == "true"
+MEMORY_PREFETCH_LIMIT = int(os.getenv("MEMORY_PREFETCH_LIMIT", "5"))
+MEMORY_PREFETCH_MAX_DISTANCE = float(os.getenv("MEMORY_PREFETCH_MAX_DISTANCE", "1.0"))
+MEMORY_PREFETCH_TIMEOUT_MS = float(os.getenv("MEMORY_PREFETCH_TIMEOUT_MS", "300"))
+
+SYSTEM_PROMPT_INTRO = """You are a helpful and friendly AI assistant with persistent long-term memory that spans across conversations.
 
 You have access to a memory system that stores facts from ALL past conversations. Even if you don't see prior messages in this conversation, the user may have told you things before that are stored in memory.
-
-## Available Tools:
-- `save_memory`: Save facts about the user to long-term memory
-- `recall_memory`: Search memory for previously saved information
-- `get_fruit_price`: Get the current price of a specific fruit
-- `web_search`: Search the web for information based on a query and return top results
-
-## CRITICAL RULES:
-
-1. **ALWAYS check memory first**: When the user asks about ANY personal information (their name, preferences, codes, favorites, etc.), you MUST call `recall_memory` BEFORE responding. NEVER say "I don't know" or "I don't have that information" without first calling recall_memory to check. This applies even if you have no conversation history — memories persist across sessions.
-
-2. **Saving is MANDATORY**: When the user shares ANY personal fact (name, preferences, codes, numbers, etc.), you MUST call `save_memory` with the exact information verbatim. Do NOT respond without calling the tool first. NEVER say "I've saved" or "noted" without actually calling save_memory.
-
-3. **Fruit Prices**: Use `get_fruit_price` when asked about fruit prices.
-
-4. **Web Search**: Use `web_search` when the user asks for real-time information, current events, or anything that requires up-to-date data from the web. Always check if this tool can help before responding.
-
-5. **Multi-Step**: Some questions need multiple tools in sequence:
-   - "What is the price of my favourite fruit?"
-     → First call recall_memory("favourite fruit"), then call get_fruit_price with the result.
-   - "Find information about the latest AI research."
-     → First call web_search("latest AI research"), then summarize the results.
-
-6. **Chat Naturally**: For greetings or general questions with no personal info, reply directly.
 """
 
+# The prompt only describes tools the graph binds, so a routed request is never
+# told about a tool it can't call. Tools without an entry are listed by schema only
+SYSTEM_PROMPT_TOOLS = {
+    "save_memory": "Save facts about the user to long-term memory",
+    "recall_memory": "Search memory for previously saved information",
+    "get_fruit_price": "Get the current price of a specific fruit",
+    "web_search": "Search the web for information based on a query and return top results",
+}
+
+# (tools the rule needs, rule); numbered in this order
+SYSTEM_PROMPT_RULES = [
+    ({"recall_memory"}, """**ALWAYS check memory first**: When the user asks about ANY personal information (their name, preferences, codes, favorites, etc.), you MUST call `recall_memory` BEFORE responding. NEVER say "I don't know" or "I don't have that information" without first calling recall_memory to check. This applies even if you have no conversation history — memories persist across sessions."""),
+    ({"save_memory"}, """**Saving is MANDATORY**: When the user shares ANY personal fact (name, preferences, codes, numbers, etc.), you MUST call `save_memory` with the exact information verbatim. Do NOT respond without calling the tool first. NEVER say "I've saved" or "noted" without actually calling save_memory."""),
+    ({"get_fruit_price"}, """**Fruit Prices**: Use `get_fruit_price` when asked about fruit prices."""),
+    ({"web_search"}, """**Web Search**: Use `web_search` when the user asks for real-time information, current events, or anything that requires up-to-date data from the web. Always check if this tool can help before responding."""),
+]
+
+# (tools the example needs, example) under the multi-step rule
+SYSTEM_PROMPT_MULTI_STEP = [
+    ({"recall_memory", "get_fruit_price"}, """   - "What is the price of my favourite fruit?"
+     → First call recall_memory("favourite fruit"), then call get_fruit_price with the result."""),
+    ({"web_search"}, """   - "Find information about the latest AI research."
+     → First call web_search("latest AI research"), then summarize the results."""),
+]
+
+
+def build_system_prompt(tool_names) -> str:
+    """The system prompt for a graph binding `tool_names`."""
+    tool_names = set(tool_names)
+    tools = [f"- `{name}`: {line}" for name, line in SYSTEM_PROMPT_TOOLS.items() if name in tool_names]
+    rules = [rule for needs, rule in SYSTEM_PROMPT_RULES if needs <= tool_names]
+    examples = [example for needs, example in SYSTEM_PROMPT_MULTI_STEP if needs <= tool_names]
+    if examples:
+        rules.append("**Multi-Step**: Some questions need multiple tools in sequence:\n" + "\n".join(examples))
+    rules.append("**Chat Naturally**: For greetings or general questions with no personal info, reply directly.")
+    prompt = SYSTEM_PROMPT_INTRO
+    if tools:
+        prompt += "\n## Available Tools:\n" + "\n".join(tools) + "\n"
+    prompt += "\n## CRITICAL RULES:\n\n" + "\n\n".join(f"{i}. {rule}" for i, rule in enumerate(rules, 1)) + "\n"
+    return prompt
+
+
+SYSTEM_PROMPT = build_system_prompt(SYSTEM_PROMPT_TOOLS)
+
 SYSTEM_PROMPT_V2 = """You are a highly capable, friendly, and intelligent AI assistant. You have access to a persistent long-term memory system that spans across all past conversations with the user, as well as external tools.
 
 ## Core Persona & Behavior
@@ -159,9 +318,31 @@ You have access to external tools provided by MCP servers (e.g., `get_fruit_pric
 
 
 
-def create_memory():
-    """Create Mem0 memory client with Milvus backend."""
-    return Memory.from_config({
+def create_memory(embedding_service: EmbeddingService):
+    """Create Mem0 memory client with Milvus backend.
+
+    Embeddings go through the shared, cached `embedding_service` via Mem0's
+    LangChain embedder provider. Vectors are stored by `PartitionedMilvusDB`,
+    which lays the collection out per user and uses the configured ANN index.
+    """
+    # Created first so the collection gets the partitioned schema before Mem0's own client sees it
+    vector_store = PartitionedMilvusDB(
+        url=MILVUS_URI,
+        token="",
+        collection_name=MILVUS_COLLECTION,
+        embedding_model_dims=embedding_service.dimension,
+        partitioning=MILVUS_PARTITIONING,
+        num_partitions=MILVUS_NUM_PARTITIONS,
+        index=IndexConfig(
+            index_type=MILVUS_INDEX_TYPE,
+            hnsw_m=MILVUS_HNSW_M,
+            hnsw_ef_construction=MILVUS_HNSW_EF_CONSTRUCTION,
+            hnsw_ef=MILVUS_HNSW_EF,
+            ivf_nlist=MILVUS_IVF_NLIST,
+            ivf_nprobe=MILVUS_IVF_NPROBE,
+        ),
+    )
+    memory = Memory.from_config({
         "llm": {
             "provider": "openai",
             "config": {
@@ -174,22 +355,86 @@ def create_memory():
         "vector_store": {
             "provider": "milvus",
             "config": {
-                "collection_name": "mem0_agent_memory",
-                "url": f"http://{MILVUS_HOST}:{MILVUS_PORT}",
+                "collection_name": MILVUS_COLLECTION,
+                "url": MILVUS_URI,
                 "token": "",
-                "embedding_model_dims": get_embedding_dim(EMBEDDING_MODEL),
+                "db_name": "default",
+                "embedding_model_dims": embedding_service.dimension,
             }
         },
         "embedder": {
-            "provider": "huggingface",
-            "config": {"model": EMBEDDING_MODEL}
+            "provider": "langchain",
+            "config": {"model": embedding_service}
         }
     })
+    memory.vector_store = vector_store
+    logger.info(f"Memory vector store: {vector_store.stats()}")
+    return memory
 
 
 # Initialize telemetry and memory
-setup_telemetry(OTEL_ENDPOINT)
-memory = create_memory()
+setup_telemetry(OTEL_ENDPOINT, OTEL_METRICS_ENDPOINT, prometheus=METRICS_PROMETHEUS_ENABLED)
+llm_metrics = LLMMetricsCallback()
+loop_lag_monitor = EventLoopLagMonitor()
+model_registry = ModelRegistry(EMBEDDING_METADATA_PATH)
+# Load the embedding model in the background; /health reports not-ready until it is in memory
+model_registry.preload(EMBEDDING_MODEL)
+embedding_service = EmbeddingService(
+    EMBEDDING_MODEL,
+    model_registry,
+    cache_size=EMBEDDING_CACHE_SIZE,
+    cache_ttl=EMBEDDING_CACHE_TTL_S,
+    batch_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+    max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+)
+memory_executor = MemoryExecutor(
+    max_workers=MEMORY_MAX_WORKERS,
+    max_queue=MEMORY_MAX_QUEUE,
+    timeout=MEMORY_TIMEOUT_S,
+)
+memory_recent_writes = RecentWrites(ttl=MEMORY_RECENT_WRITES_TTL_S)
+memory = create_memory(embedding_service)
+if MEMORY_MODE == "raw":
+    memory = RawFactMemory(
+        memory,
+        embedding_service,
+        recent_writes=memory_recent_writes,
+        dedup_threshold=MEMORY_DEDUP_THRESHOLD,
+        dedup_candidates=MEMORY_DEDUP_CANDIDATES,
+        consolidate_interval=MEMORY_CONSOLIDATE_INTERVAL_S,
+        consolidate_min_facts=MEMORY_CONSOLIDATE_MIN_FACTS,
+    )
+elif MEMORY_MODE != "extract":
+    raise ValueError(f"Unknown MEMORY_MODE '{MEMORY_MODE}' (expected 'extract' or 'raw')")
+memory_write_queue = None
+if MEMORY_WRITE_MODE == "write_behind":
+    memory_write_queue = WriteBehindQueue(
+        MEMORY_QUEUE_PATH,
+        batch_size=MEMORY_FLUSH_BATCH_SIZE,
+        flush_interval=MEMORY_FLUSH_INTERVAL_S,
+        in_doubt_retry_after=MEMORY_FLUSH_IN_DOUBT_RETRY_S,
+    )
+memory_hot_index = None
+if MEMORY_HOT_INDEX_MAX_MB > 0:
+    memory_hot_index = HotMemoryIndex(
+        memory,
+        embedding_service,
+        executor=memory_executor,
+        recent_writes=memory_recent_writes,
+        max_bytes=int(MEMORY_HOT_INDEX_MAX_MB * 1024 * 1024),
+        max_per_user=MEMORY_HOT_INDEX_MAX_PER_USER,
+        ttl=MEMORY_HOT_INDEX_TTL_S,
+    )
+memory_prefetcher = None
+if MEMORY_PREFETCH_ENABLED:
+    memory_prefetcher = MemoryPrefetcher(
+        memory,
+        executor=memory_executor,
+        hot_index=memory_hot_index,
+        limit=MEMORY_PREFETCH_LIMIT,
+        max_distance=MEMORY_PREFETCH_MAX_DISTANCE,
+        timeout=MEMORY_PREFETCH_TIMEOUT_MS / 1000,
+    )
 # set_memory(memory)
 
 # Initialize LLM
@@ -197,7 +442,9 @@ llm = ChatOpenAI(
     openai_api_key=OPENAI_API_KEY,
     openai_api_base=OPENAI_BASE_URL,
     model_name=MODEL_NAME,
-    temperature=0
+    temperature=0,
+    # Report token usage on streamed responses too (llm.tokens metric)
+    stream_usage=True,
 )
 
 
@@ -206,48 +453,104 @@ llm = ChatOpenAI(
 
 local_tools = [save_memory, recall_memory, get_all_memories]
 
+history_compactor = HistoryCompactor(
+    llm,
+    max_tokens=HISTORY_MAX_TOKENS,
+    summarize_after=HISTORY_SUMMARIZE_AFTER,
+    keep_recent=HISTORY_KEEP_RECENT,
+    tool_output_max_chars=HISTORY_TOOL_OUTPUT_MAX_CHARS,
+)
+
+tool_result_cache = ToolResultCache(max_bytes=TOOL_CACHE_MAX_BYTES)
+
+tool_router = None
+if TOOL_ROUTER_ENABLED:
+    tool_router = ToolRouter(
+        embedding_service,
+        pinned=set(TOOL_ROUTER_PINNED),
+        top_k=TOOL_ROUTER_TOP_K,
+        min_similarity=TOOL_ROUTER_MIN_SIMILARITY,
+        max_graphs=TOOL_ROUTER_MAX_GRAPHS,
+    )
+
+# One run per thread at a time, slots shared round-robin between threads
+chat_scheduler = ChatScheduler(
+    max_concurrency=CHAT_MAX_CONCURRENCY,
+    max_queue=CHAT_MAX_QUEUE,
+    max_queue_per_thread=CHAT_MAX_QUEUE_PER_THREAD,
+    queue_timeout=CHAT_QUEUE_TIMEOUT_S,
+)
+
+response_cache = None
+if CHAT_CACHE_ENABLED:
+    response_cache = SemanticResponseCache(
+        embedding_service,
+        threshold=CHAT_CACHE_THRESHOLD,
+        ttl=CHAT_CACHE_TTL_S,
+        max_entries=CHAT_CACHE_MAX_ENTRIES,
+    )
+
 
 # ============================================================================
 # Agent Graph (Simplified with create_react_agent)
 # ============================================================================
 mcp_tools = []
+mcp_manager = None
 app_graph = None
-checkpointer = MemorySaver()
+checkpointer = None
 
 
-async def init_agent():
-    """Initialize MCP tools and create the ReAct agent."""
+def build_agent():
+    """(Re)build the ReAct agent from the local tools and the current MCP tools."""
     global mcp_tools, app_graph
     
-    # Load MCP tools
-    mcp_url = f"http://{MCP_HOST}:{MCP_PORT}/sse"
-    logger.info(f"Connecting to MCP server at {mcp_url}...")
-    
-    try:
-        mcp_client = MultiServerMCPClient({
-            "fruit_prices": {
-                "url": mcp_url,
-                "transport": "sse",
-            }
-        })
-        mcp_tools = await mcp_client.get_tools()
-        logger.info(f"Loaded {len(mcp_tools)} MCP tools: {[t.name for t in mcp_tools]}")
-    except Exception as e:
-        logger.warning(f"Failed to connect to MCP server: {e}")
-        mcp_tools = []
-    
-    # Create ReAct agent with all tools
-    all_tools = local_tools + mcp_tools
-    logger.info(f"Creating ReAct agent with {len(all_tools)} tools")
+    # Only MCP tools are cacheable: local tools read or write per-user memory
+    mcp_tools = with_caching(mcp_manager.tools(), tool_result_cache, TOOL_CACHE_POLICIES)
+
+    # Create ReAct agent with all tools, each bounded by its timeout
+    all_tools = with_metrics(with_timeouts(local_tools + mcp_tools, TOOL_TIMEOUT_S, TOOL_TIMEOUTS))
+    logger.info(f"Creating ReAct agent with {len(all_tools)} tools: {[t.name for t in all_tools]}")
     
-    # In LangGraph v1.0+, system prompt is passed via SystemMessage in the invoke call
-    # or by binding it to the model
-    app_graph = create_react_agent(
-        llm, 
-        all_tools,
-        checkpointer=checkpointer
+    # The system prompt is bound once here rather than sent with every request,
+    # so it is not appended to the checkpointed thread history on each turn
+    pre_model_hook = history_compactor
+    if memory_prefetcher is not None:
+        pre_model_hook = memory_prefetcher.hook(history_compactor)
+    app_graph = build_agent_graph(
+        llm, all_tools, checkpointer, build_system_prompt(t.name for t in all_tools), pre_model_hook=pre_model_hook
     )
+    if tool_router is not None:
+        # Graphs for tool subsets share the checkpointer, so a thread can move between them
+        tool_router.set_tools(
+            all_tools,
+            lambda tools: build_agent_graph(
+                llm, tools, checkpointer, build_system_prompt(t.name for t in tools), pre_model_hook=pre_model_hook
+            ),
+            app_graph,
+        )
+
+
+async def _on_mcp_tools_changed():
+    # A (re)connected MCP server exposes a different tool list: swap in a new graph.
+    # Requests already running keep the graph they started with.
+    if checkpointer is not None and mcp_manager is not None:
+        build_agent()
+
+
+async def init_agent():
+    """Connect to the MCP servers and create the ReAct agent."""
+    global mcp_manager
     
+    logger.info(f"Connecting to MCP server at {MCP_URL} ({MCP_TRANSPORT}, {MCP_POOL_SIZE} sessions)...")
+    mcp_manager = MCPConnectionManager(
+        {"fruit_prices": {"url": MCP_URL, "transport": MCP_TRANSPORT}},
+        on_tools_changed=_on_mcp_tools_changed,
+        size=MCP_POOL_SIZE,
+        health_interval=MCP_HEALTH_INTERVAL_S,
+    )
+    # If the server is down the agent starts without its tools; they are added on reconnect
+    await mcp_manager.start(wait=MCP_CONNECT_WAIT_S)
+    build_agent()
     logger.info("ReAct agent initialized successfully")
 
 
@@ -257,8 +560,37 @@ async def init_agent():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan - initialize agent on startup."""
+    global checkpointer
+    checkpointer = await create_checkpointer(
+        CHECKPOINTER_BACKEND,
+        CHECKPOINTER_PATH,
+        max_messages=CHECKPOINT_MAX_MESSAGES,
+        thread_ttl=CHECKPOINT_THREAD_TTL_S,
+        max_threads=CHECKPOINT_MAX_THREADS,
+        keep_checkpoints=CHECKPOINT_KEEP_PER_THREAD,
+    )
+    maintenance = asyncio.create_task(
+        run_checkpoint_maintenance(checkpointer, CHECKPOINT_MAINTENANCE_INTERVAL_S)
+    )
+    checkpointer_gauges = CheckpointerGauges(checkpointer)
+    checkpointer_gauges.start()
+    loop_lag_monitor.start()
     await init_agent()
+    if memory_write_queue is not None:
+        memory_write_queue.start(memory, memory_executor, memory_recent_writes)
+    if isinstance(memory, RawFactMemory):
+        memory.start(memory_executor)
     yield
+    if isinstance(memory, RawFactMemory):
+        memory.stop()
+    if memory_write_queue is not None:
+        await memory_write_queue.stop()
+    await mcp_manager.aclose()
+    loop_lag_monitor.stop()
+    checkpointer_gauges.stop()
+    maintenance.cancel()
+    await checkpointer.aclose()
+    memory_executor.shutdown()
 
 
 app = FastAPI(title="LangGraph Agent API", lifespan=lifespan)
@@ -268,6 +600,106 @@ FastAPIInstrumentor.instrument_app(app)
 class ChatRequest(BaseModel):
     message: str
     thread_id: str = "default"
+    # Whose long-term memory the memory tools (and prefetch) use
+    user_id: str = "default"
+
+
+def _agent_config(request: ChatRequest, prefetch=None) -> dict:
+    return {
+        "configurable": {
+            "thread_id": request.thread_id,
+            "user_id": request.user_id,
+            "memory_client": memory,
+            "memory_executor": memory_executor,
+            "memory_write_queue": memory_write_queue,
+            "memory_recent_writes": memory_recent_writes,
+            "memory_hot_index": memory_hot_index,
+            "memory_prefetch": prefetch,
+        },
+        # Caps how many of one step's tool calls run at the same time
+        "max_concurrency": TOOL_MAX_CONCURRENCY,
+        "callbacks": [llm_metrics],
+    }
+
+
+def _tool_usage(messages: list) -> list:
+    return [
+        m.tool_calls for m in messages
+        if hasattr(m, 'tool_calls') and m.tool_calls
+    ]
+
+
+def _current_turn(messages: list) -> list:
+    """Messages from the last HumanMessage onwards."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i:]
+    return messages
+
+
+async def _cache_lookup(request: ChatRequest):
+    """Cached answer for the request (or None) and the message vector to store a miss under."""
+    if response_cache is None:
+        return None, None
+    try:
+        # Follow-ups are only answered from turns that followed the same exchange
+        state = await app_graph.aget_state(_agent_config(request))
+        history = (state.values or {}).get("messages", [])
+        return await response_cache.lookup(request.message, request.thread_id, history)
+    except Exception as e:
+        logger.warning(f"Response cache lookup failed: {e}")
+        return None, None
+
+
+async def _record_cached_turn(request: ChatRequest, response: str):
+    # Keep the thread's history complete even though the agent did not run
+    await app_graph.aupdate_state(
+        _agent_config(request),
+        {"messages": [HumanMessage(content=request.message), AIMessage(content=response)]},
+        as_node="agent",
+    )
+
+
+async def _admit(request: ChatRequest):
+    """Wait for a scheduler slot for the request's thread, or fail with 429."""
+    try:
+        await chat_scheduler.acquire(request.thread_id)
+    except ChatSchedulerFull as e:
+        logger.warning(f"Rejected chat for thread {request.thread_id}: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+async def _graph_for(request: ChatRequest):
+    """The agent graph bound to the tools this request needs (every tool without routing)."""
+    if tool_router is None:
+        return app_graph
+    return await tool_router.graph_for(request.message, request.thread_id)
+
+
+def _start_prefetch(request: ChatRequest):
+    if memory_prefetcher is None:
+        return None
+    # Same user the memory tools get through the run config
+    return memory_prefetcher.start(request.message, user_id=request.user_id)
+
+
+def _cancel_prefetch(prefetch):
+    # A failed or abandoned run leaves nothing to use the search for
+    if prefetch is not None and not prefetch.task.done():
+        prefetch.task.cancel()
+
+
+def _observe_prefetch(prefetch, messages: list):
+    if memory_prefetcher is not None and messages:
+        memory_prefetcher.observe(prefetch, messages)
+
+
+def _cache_store(request: ChatRequest, vector, messages: list):
+    if response_cache is None or vector is None or not messages:
+        return
+    turn = _current_turn(messages)
+    history = messages[:len(messages) - len(turn)]
+    response_cache.store(request.message, request.thread_id, vector, turn[-1].content, _tool_usage(turn), history)
 
 
 @app.post("/chat")
@@ -276,25 +708,33 @@ async def chat(request: ChatRequest):
     if app_graph is None:
         logger.error("Agent not initialized yet")
         raise HTTPException(status_code=503, detail="Agent not initialized yet")
-    
-    # Invoke the agent with system prompt + user message
-    result = await app_graph.ainvoke(
-        {"messages": [
-            SystemMessage(content=SYSTEM_PROMPT),
-            HumanMessage(content=request.message)
-        ]},
-        config={"configurable": {
-            "thread_id": request.thread_id,
-            "memory_client": memory
-        }}
-    )
+
+    await _admit(request)
+    started = time.monotonic()
+    prefetch = None
+    try:
+        cached, vector = await _cache_lookup(request)
+        if cached is not None:
+            await _record_cached_turn(request, cached.response)
+            return {"response": cached.response, "tool_usage": cached.tool_usage, "cached": True}
+
+        # Memory search runs while the graph loads the thread and prepares the first model call
+        prefetch = _start_prefetch(request)
+        graph = await _graph_for(request)
+        # Invoke the agent with the user message (system prompt is bound in the graph)
+        result = await graph.ainvoke(
+            {"messages": [HumanMessage(content=request.message)]},
+            config=_agent_config(request, prefetch)
+        )
+    finally:
+        _cancel_prefetch(prefetch)
+        chat_scheduler.release(request.thread_id, time.monotonic() - started)
     
     # Extract response and tool usage
+    _observe_prefetch(prefetch, result["messages"])
     last_message = result["messages"][-1]
-    tool_usage = [
-        m.tool_calls for m in result["messages"] 
-        if hasattr(m, 'tool_calls') and m.tool_calls
-    ]
+    tool_usage = _tool_usage(result["messages"])
+    _cache_store(request, vector, result["messages"])
     
     return {
         "response": last_message.content,
@@ -302,13 +742,131 @@ async def chat(request: ChatRequest):
     }
 
 
+class _ScheduledStreamingResponse(StreamingResponse):
+    """Frees the request's scheduler slot however the stream ends, even if it never starts."""
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Streaming chat endpoint - Server-Sent Events.
+
+    Events: `token` (model output as it is generated), `tool_start` / `tool_end`
+    (each tool call), `done` (final `response` and `tool_usage`, same shape as
+    /chat) and `error`.
+    """
+    if app_graph is None:
+        logger.error("Agent not initialized yet")
+        raise HTTPException(status_code=503, detail="Agent not initialized yet")
+
+    async def events():
+        cached, vector = await _cache_lookup(request)
+        if cached is not None:
+            await _record_cached_turn(request, cached.response)
+            yield _sse("token", {"content": cached.response})
+            yield _sse("done", {"response": cached.response, "tool_usage": cached.tool_usage, "cached": True})
+            return
+
+        final_state = None
+        prefetch = _start_prefetch(request)
+        try:
+            graph = await _graph_for(request)
+            async for event in graph.astream_events(
+                {"messages": [HumanMessage(content=request.message)]},
+                config=_agent_config(request, prefetch),
+                version="v2",
+            ):
+                kind = event["event"]
+                # Only the agent node's model calls are user-facing (not history summaries)
+                if kind == "on_chat_model_stream" and event["metadata"].get("langgraph_node") == "agent":
+                    content = event["data"]["chunk"].content
+                    if isinstance(content, str) and content:
+                        yield _sse("token", {"content": content})
+                elif kind == "on_tool_start":
+                    yield _sse("tool_start", {
+                        "run_id": event["run_id"],
+                        "name": event["name"],
+                        "args": event["data"].get("input"),
+                    })
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    yield _sse("tool_end", {
+                        "run_id": event["run_id"],
+                        "name": event["name"],
+                        "output": getattr(output, "content", output),
+                    })
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    final_state = event["data"].get("output")
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {e}")
+            yield _sse("error", {"detail": str(e)})
+            return
+        finally:
+            # Also runs when the client disconnects and the stream is closed
+            _cancel_prefetch(prefetch)
+
+        messages = (final_state or {}).get("messages", [])
+        _observe_prefetch(prefetch, messages)
+        _cache_store(request, vector, messages)
+        yield _sse("done", {
+            "response": messages[-1].content if messages else "",
+            "tool_usage": _tool_usage(messages),
+        })
+
+    # Admit before the response starts, so a rejection is still a plain 429
+    await _admit(request)
+    started = time.monotonic()
+    return _ScheduledStreamingResponse(
+        events(),
+        release=lambda: chat_scheduler.release(request.thread_id, time.monotonic() - started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/health")
 def health():
     """Health check endpoint."""
     if app_graph is None:
         raise HTTPException(status_code=503, detail="Agent not initialized yet")
+    if not model_registry.is_ready(EMBEDDING_MODEL):
+        error = model_registry.error(EMBEDDING_MODEL)
+        detail = f"Embedding model failed to load: {error}" if error else "Embedding model loading"
+        raise HTTPException(status_code=503, detail=detail)
+
+    # MCP outages degrade the agent (no MCP tools) but don't make it unhealthy
+    return {
+        "status": "ok",
+        "mcp": mcp_manager.stats(),
+        "scheduler": chat_scheduler.stats(),
+        "memory_executor": memory_executor.stats(),
+        "memory_write_queue": memory_write_queue.stats() if memory_write_queue is not None else None,
+        "memory_store": memory.vector_store.stats(),
+        "memory_hot_index": memory_hot_index.stats() if memory_hot_index is not None else None,
+        "memory_prefetch": memory_prefetcher.stats() if memory_prefetcher is not None else None,
+        "tool_router": tool_router.stats() if tool_router is not None else None,
+    }
+
 
-    return {"status": "ok"}
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint for the agent's OTel metrics."""
+    if not METRICS_PROMETHEUS_ENABLED:
+        raise HTTPException(status_code=404, detail="Prometheus metrics are disabled")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import random
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import load_mcp_tools
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+
+logger = logging.getLogger(__name__)
+
+
+class MCPUnavailable(RuntimeError):
+    """Raised when no healthy session to an MCP server is available."""
+
+
+class _Slot:
+    """One long-lived session, owned by its own worker task."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.session: ClientSession | None = None
+        self.in_flight = 0
+        self.broken = asyncio.Event()
+
+
+# ============================================================================
+# Session pool for one MCP server
+# ============================================================================
+class MCPSessionPool:
+    """Keeps `size` initialized sessions to one MCP server open and reuses them.
+
+    Each session is opened, health-checked and closed by its own worker task
+    (the MCP transports are task-bound context managers). A worker pings its
+    session every `health_interval` seconds and reconnects with backoff when
+    the ping or a call fails. Tool calls go to the least busy healthy session;
+    a call that fails on a broken connection is retried once on another one.
+
+    The pool is duck-typed as a `ClientSession` (`list_tools` / `call_tool`), so
+    `load_mcp_tools(pool)` builds LangChain tools that outlive any one session.
+    After every (re)connect the tool list is re-read, and `on_tools_changed` is
+    awaited when it differs from the last one seen.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connection: dict,
+        size: int = 2,
+        health_interval: float = 15.0,
+        health_timeout: float = 5.0,
+        max_backoff: float = 30.0,
+        on_tools_changed=None,
+    ):
+        self.name = name
+        self.connection = connection
+        self.size = size
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.max_backoff = max_backoff
+        self.on_tools_changed = on_tools_changed
+        self.tools: list[BaseTool] = []
+        self._tools_signature: str | None = None
+        self._slots = [_Slot(i) for i in range(size)]
+        self._workers: list[asyncio.Task] = []
+        self._ready = asyncio.Event()
+        self._refresh_lock = asyncio.Lock()
+        self._closing = asyncio.Event()
+        self.reconnects = 0
+
+    # ------------------------------------------------------------------
+    # ClientSession interface used by load_mcp_tools / the adapter tools
+    # ------------------------------------------------------------------
+    async def list_tools(self, cursor: str | None = None):
+        return await self._with_session(lambda s: s.list_tools(cursor=cursor))
+
+    async def call_tool(self, name: str, arguments: dict | None = None, **kwargs):
+        return await self._with_session(lambda s: s.call_tool(name, arguments, **kwargs))
+
+    # ------------------------------------------------------------------
+    # Session selection
+    # ------------------------------------------------------------------
+    def _healthy(self) -> list[_Slot]:
+        return [s for s in self._slots if s.session is not None and not s.broken.is_set()]
+
+    async def _with_session(self, fn, attempts: int = 2):
+        last_error = None
+        for _ in range(attempts):
+            healthy = self._healthy()
+            if not healthy:
+                break
+            slot = min(healthy, key=lambda s: s.in_flight)
+            slot.in_flight += 1
+            try:
+                return await fn(slot.session)
+            except McpError:
+                # The server answered with an error; the connection is fine
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(f"MCP '{self.name}' session {slot.index} failed, reconnecting: {e!r}")
+                slot.broken.set()
+            finally:
+                slot.in_flight -= 1
+        raise MCPUnavailable(f"No healthy session to MCP server '{self.name}'") from last_error
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    async def _worker(self, slot: _Slot):
+        backoff = 1.0
+        while not self._closing.is_set():
+            try:
+                async with create_session(self.connection) as session:
+                    await session.initialize()
+                    slot.broken.clear()
+                    slot.session = session
+                    backoff = 1.0
+                    logger.info(f"MCP '{self.name}' session {slot.index} connected")
+                    await self._refresh_tools()
+                    self._ready.set()
+                    await self._monitor(slot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP '{self.name}' session {slot.index} error: {e!r}")
+            finally:
+                slot.session = None
+            if self._closing.is_set():
+                break
+            self.reconnects += 1
+            # Jitter so the pool's sessions don't reconnect in lockstep
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _monitor(self, slot: _Slot):
+        """Return when the session should be closed (broken, unhealthy or shutting down)."""
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(slot.broken.wait(), self.health_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(slot.session.send_ping(), self.health_timeout)
+            except Exception as e:
+                logger.warning(f"MCP '{self.name}' session {slot.index} failed health check: {e!r}")
+                slot.broken.set()
+                return
+
+    async def _refresh_tools(self):
+        async with self._refresh_lock:
+            try:
+                tools = await load_mcp_tools(self, server_name=self.name)
+            except Exception as e:
+                logger.warning(f"MCP '{self.name}' tool list refresh failed: {e!r}")
+                return
+            signature = json.dumps(
+                sorted((t.name, t.description, t.args_schema) for t in tools), sort_keys=True, default=str
+            )
+            if signature == self._tools_signature:
+                return
+            self.tools = tools
+            self._tools_signature = signature
+            logger.info(f"MCP '{self.name}' tools: {[t.name for t in tools]}")
+        if self.on_tools_changed is not None:
+            await self.on_tools_changed()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self, wait: float = 10.0) -> bool:
+        """Start the workers; wait up to `wait` seconds for the first session."""
+        self._workers = [asyncio.create_task(self._worker(slot)) for slot in self._slots]
+        try:
+            await asyncio.wait_for(self._ready.wait(), wait)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"MCP '{self.name}' not reachable yet; tools will be added once it connects")
+            return False
+
+    async def aclose(self):
+        self._closing.set()
+        for slot in self._slots:
+            slot.broken.set()
+        _, pending = await asyncio.wait(self._workers, timeout=5) if self._workers else (set(), set())
+        for task in pending:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": self.size,
+            "healthy": len(self._healthy()),
+            "in_flight": sum(s.in_flight for s in self._slots),
+            "reconnects": self.reconnects,
+            "tools": [t.name for t in self.tools],
+        }
+
+
+# ============================================================================
+# All configured MCP servers
+# ============================================================================
+class MCPConnectionManager:
+    """One `MCPSessionPool` per configured server, with a combined tool list."""
+
+    def __init__(self, servers: dict[str, dict], on_tools_changed=None, **pool_kwargs):
+        self.pools = {
+            name: MCPSessionPool(name, connection, on_tools_changed=on_tools_changed, **pool_kwargs)
+            for name, connection in servers.items()
+        }
+
+    def tools(self) -> list[BaseTool]:
+        return [tool for pool in self.pools.values() for tool in pool.tools]
+
+    async def start(self, wait: float = 10.0):
+        await asyncio.gather(*(pool.start(wait) for pool in self.pools.values()))
+
+    async def aclose(self):
+        await asyncio.gather(*(pool.aclose() for pool in self.pools.values()))
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self.pools.items()}
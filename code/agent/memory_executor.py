@@ -0,0 +1,172 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+
+class MemoryExecutorSaturated(RuntimeError):
+    """Raised when the memory worker pool and its wait queue are both full."""
+
+
+# ============================================================================
+# Bounded executor for blocking Mem0 calls
+# ============================================================================
+class MemoryExecutor:
+    """Run blocking Mem0 operations on a dedicated, size-limited thread pool.
+
+    Mem0's `add` / `search` / `get_all` are synchronous (LLM extraction, embedding,
+    Milvus I/O). Calling them from a tool running under `app_graph.ainvoke` blocks
+    the event loop, so they are dispatched here instead. At most `max_workers` calls
+    run at once and at most `max_queue` more may wait; beyond that callers get
+    `MemoryExecutorSaturated` straight away instead of piling up.
+
+    A call whose caller times out or is cancelled before a worker picks it up
+    never runs and gives its queue slot back. Once it has started it cannot be
+    stopped: the caller is released, but the thread finishes the Mem0 call and
+    holds its worker until then. These abandoned calls are counted in
+    `memory.executor.abandoned` (and `stats()`), so a pool full of them can be
+    told apart from a slow one, and their completion is logged.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, timeout: float = 30.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mem0")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        # Calls still running on a worker after their caller timed out or was cancelled
+        self._abandoned = 0
+        self._completed = 0
+        self._timeouts = 0
+        self._cancelled = 0
+        self._rejected = 0
+
+        self._wait_hist = meter.create_histogram(
+            "memory.executor.wait", unit="ms", description="Time a Mem0 call waited for a worker"
+        )
+        self._run_hist = meter.create_histogram(
+            "memory.executor.duration", unit="ms", description="Time a Mem0 call ran on a worker"
+        )
+        self._timeout_counter = meter.create_counter(
+            "memory.executor.timeouts", description="Mem0 calls that exceeded their timeout"
+        )
+        self._rejected_counter = meter.create_counter(
+            "memory.executor.rejected", description="Mem0 calls rejected because the pool was saturated"
+        )
+        meter.create_observable_gauge(
+            "memory.executor.queue_depth",
+            callbacks=[lambda options: [Observation(self._queued)]],
+            description="Mem0 calls waiting for a worker",
+        )
+        meter.create_observable_gauge(
+            "memory.executor.in_flight",
+            callbacks=[lambda options: [Observation(self._running)]],
+            description="Mem0 calls currently running",
+        )
+        meter.create_observable_gauge(
+            "memory.executor.abandoned",
+            callbacks=[lambda options: [Observation(self._abandoned)]],
+            description="Mem0 calls still holding a worker after their caller timed out or was cancelled",
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "abandoned": self._abandoned,
+                "completed": self._completed,
+                "timeouts": self._timeouts,
+                "cancelled": self._cancelled,
+                "rejected": self._rejected,
+            }
+
+    async def run(self, op: str, fn, *args, timeout: float | None = None, **kwargs):
+        """Run `fn(*args, **kwargs)` on the pool and await its result.
+
+        Raises `MemoryExecutorSaturated` if the wait queue is full and
+        `asyncio.TimeoutError` if the call does not finish within `timeout`.
+        """
+        attributes = {"memory.op": op}
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                self._rejected_counter.add(1, attributes)
+                raise MemoryExecutorSaturated(
+                    f"Memory worker pool saturated ({self._running} running, of which "
+                    f"{self._abandoned} abandoned by their caller, {self._queued} queued)"
+                )
+            self._queued += 1
+
+        submitted = time.perf_counter()
+        started = False
+        abandoned = False
+        finished = False
+        # The caller stopped waiting while the call was running
+        detached = False
+
+        def _call():
+            nonlocal started, finished
+            with self._lock:
+                if abandoned:
+                    return None
+                self._queued -= 1
+                self._running += 1
+                started = True
+            begin = time.perf_counter()
+            self._wait_hist.record((begin - submitted) * 1000, attributes)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - begin
+                self._run_hist.record(elapsed * 1000, attributes)
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    finished = True
+                    if detached:
+                        self._abandoned -= 1
+                if detached:
+                    logger.warning(f"Abandoned memory op '{op}' finished after {elapsed:.1f}s, freeing its worker")
+
+        # Carry the current OTel span / contextvars into the worker thread
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, functools.partial(ctx.run, _call))
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Either way asyncio cancels `future`, so a queued `_call` may never run
+            with self._lock:
+                if isinstance(e, asyncio.CancelledError):
+                    self._cancelled += 1
+                else:
+                    self._timeouts += 1
+                # Not picked up by a worker yet: make sure it never runs
+                if not started:
+                    abandoned = True
+                    self._queued -= 1
+                # Already running: it keeps its worker until Mem0 returns
+                elif not finished:
+                    detached = True
+                    self._abandoned += 1
+            if isinstance(e, asyncio.TimeoutError):
+                self._timeout_counter.add(1, attributes)
+                logger.warning(f"Memory op '{op}' timed out after {timeout or self.timeout}s")
+            raise
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from opentelemetry import metrics
+
+from response_cache import is_personal
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+RECALL_TOOL = "recall_memory"
+
+CONTEXT_HEADER = (
+    "[Long-term memory was already searched for this message. Relevant memories:]\n"
+    "{memories}\n"
+    "[If these answer the question, answer directly without calling recall_memory.]"
+)
+
+
+def _results(response) -> list[dict]:
+    return response.get("results", []) if isinstance(response, dict) else response or []
+
+
+def _last_human_index(messages: list) -> int | None:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return None
+
+
+class Prefetch:
+    """One turn's memory search, started before the agent runs."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.started = time.monotonic()
+        self.memories: list[dict] | None = None
+        # Why nothing was injected, if nothing was: "no_match", "late" or "error"
+        self.miss: str | None = None
+
+
+# ============================================================================
+# Speculative memory prefetch
+# ============================================================================
+class MemoryPrefetcher:
+    """Searches memory for a personal message while the agent starts up.
+
+    The system prompt makes the model call `recall_memory` before answering
+    anything personal, so a recall turn costs an LLM round trip only to decide
+    to search. `start` launches that search as soon as the request arrives, in
+    parallel with the checkpoint load and history stage. `hook` wraps the
+    `pre_model_hook` and adds memories within `max_distance` of the message to
+    the model's view of the current message. The checkpointed history is not
+    changed. The search may not finish within `timeout` of the agent's first
+    model call; the agent then goes ahead without it, and the model can still
+    call the tool.
+
+    `observe` classifies each finished turn into `memory.prefetch.turns`. The
+    key outcome is `recall_avoided`: memories were injected and the model did
+    not call `recall_memory`.
+    """
+
+    def __init__(
+        self,
+        memory,
+        executor=None,
+        hot_index=None,
+        limit: int = 5,
+        max_distance: float = 1.0,
+        timeout: float = 0.3,
+    ):
+        self.memory = memory
+        self.executor = executor
+        self.hot_index = hot_index
+        self.limit = limit
+        self.max_distance = max_distance
+        self.timeout = timeout
+        self._counts: dict[str, int] = {}
+
+        self._turns = meter.create_counter(
+            "memory.prefetch.turns",
+            description="Agent turns by prefetch outcome (recall_avoided, recalled_anyway, no_match, late, error, skipped)",
+        )
+        self._duration_hist = meter.create_histogram(
+            "memory.prefetch.duration", unit="ms", description="Time to prefetch memories for a message"
+        )
+
+    def start(self, message: str, user_id: str) -> Prefetch | None:
+        """Begin searching memory for `message`; None for messages that aren't personal."""
+        if not is_personal(message):
+            return None
+        return Prefetch(asyncio.create_task(self._search(message, user_id)))
+
+    async def _search(self, message: str, user_id: str) -> list[dict]:
+        started = time.perf_counter()
+        results = await self.hot_index.search(message, user_id, limit=self.limit) if self.hot_index else None
+        if results is None:
+            if self.executor is not None:
+                response = await self.executor.run("search", self.memory.search, message, user_id=user_id, limit=self.limit)
+            else:
+                response = await asyncio.to_thread(self.memory.search, message, user_id=user_id, limit=self.limit)
+            results = _results(response)
+        self._duration_hist.record((time.perf_counter() - started) * 1000)
+        # Scores are distances: lower is closer
+        return [r for r in results if isinstance(r, dict) and r.get("memory") and r.get("score", 0.0) <= self.max_distance]
+
+    async def _memories(self, prefetch: Prefetch) -> list[dict]:
+        if prefetch.memories is not None or prefetch.miss is not None:
+            return prefetch.memories or []
+        remaining = self.timeout - (time.monotonic() - prefetch.started)
+        try:
+            prefetch.memories = await asyncio.wait_for(asyncio.shield(prefetch.task), max(remaining, 0.001))
+        except asyncio.TimeoutError:
+            prefetch.miss = "late"
+            prefetch.task.cancel()
+            return []
+        except Exception as e:
+            logger.warning(f"Memory prefetch failed: {e!r}")
+            prefetch.miss = "error"
+            return []
+        if not prefetch.memories:
+            prefetch.miss = "no_match"
+        return prefetch.memories
+
+    def hook(self, inner=None):
+        """`pre_model_hook` running `inner` (e.g. a `HistoryCompactor`), then adding prefetched memories."""
+
+        async def pre_model_hook(state: dict, config: RunnableConfig) -> dict:
+            if inner is not None:
+                update = await inner(state, config)
+            else:
+                update = {"llm_input_messages": list(state["messages"])}
+            prefetch = (config or {}).get("configurable", {}).get("memory_prefetch")
+            if prefetch is None:
+                return update
+            memories = await self._memories(prefetch)
+            messages = list(update.get("llm_input_messages", state["messages"]))
+            i = _last_human_index(messages)
+            if not memories or i is None or not isinstance(messages[i].content, str):
+                return update
+            block = CONTEXT_HEADER.format(memories="\n".join(f"- {m['memory']}" for m in memories))
+            messages[i] = messages[i].model_copy(update={"content": f"{messages[i].content}\n\n{block}"})
+            return {**update, "llm_input_messages": messages}
+
+        return pre_model_hook
+
+    def observe(self, prefetch: Prefetch | None, messages: list) -> str:
+        """Record how the prefetch played out in the finished turn's `messages`."""
+        i = _last_human_index(messages)
+        turn = messages[i:] if i is not None else messages
+        recalled = any(
+            call.get("name") == RECALL_TOOL
+            for message in turn
+            if isinstance(message, AIMessage)
+            for call in message.tool_calls
+        )
+        if prefetch is None:
+            outcome = "skipped"
+        elif prefetch.memories:
+            outcome = "recalled_anyway" if recalled else "recall_avoided"
+        else:
+            if not prefetch.task.done():
+                prefetch.task.cancel()
+            outcome = prefetch.miss or "no_match"
+        self._counts[outcome] = self._counts.get(outcome, 0) + 1
+        self._turns.add(1, {"outcome": outcome, "recalled": str(recalled).lower()})
+        return outcome
+
+    def stats(self) -> dict:
+        injected = self._counts.get("recall_avoided", 0) + self._counts.get("recalled_anyway", 0)
+        return {
+            **self._counts,
+            "avoided_rate": round(self._counts.get("recall_avoided", 0) / injected, 3) if injected else 0.0,
+        }
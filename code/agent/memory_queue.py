@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+# Mem0 metadata key tagging the memories written by one flush
+BATCH_KEY = "write_behind_batch"
+
+
+def batch_key(user_id: str, ids: list[int]) -> str:
+    return hashlib.sha1(f"{user_id}:{','.join(map(str, ids))}".encode()).hexdigest()
+
+
+# ============================================================================
+# Write-behind queue for save_memory
+# ============================================================================
+class WriteBehindQueue:
+    """Durable local queue of facts waiting to be written to Mem0.
+
+    `save_memory` records the fact in a SQLite (WAL) file and returns straight away;
+    a background task drains the file into `memory.add` in per-user batches, so
+    one Mem0 extraction call covers several facts. Rows are only removed once Mem0
+    accepted them, so pending facts survive a restart and are retried. Facts that
+    keep failing are kept (with their last error) after `max_attempts` but no
+    longer retried; these dead letters are counted in `stats()` and the
+    `memory.write_behind.dead_letters` gauge.
+
+    A timed-out `memory.add` usually still completes on its worker thread, so
+    its facts are not simply retried. Each flush tags its memories with a
+    `write_behind_batch` key in Mem0 metadata. Rows from a timed-out flush are
+    marked in doubt with that key, and after `in_doubt_retry_after` seconds
+    Mem0 is checked for it: if the write landed, the rows are acknowledged,
+    otherwise they are written again under the same key.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 16,
+        flush_interval: float = 1.0,
+        max_attempts: int = 5,
+        in_doubt_retry_after: float = 120.0,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.in_doubt_retry_after = in_doubt_retry_after
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pending_memories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )"""
+        )
+        # Queue files created before timeouts were tracked lack these columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pending_memories)")}
+        if "batch_key" not in columns:
+            self._conn.execute("ALTER TABLE pending_memories ADD COLUMN batch_key TEXT")
+        if "retry_after" not in columns:
+            self._conn.execute("ALTER TABLE pending_memories ADD COLUMN retry_after REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pending_memories_user ON pending_memories (user_id, id)"
+        )
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+        self._flushed = meter.create_counter(
+            "memory.write_behind.flushed", description="Facts written from the write-behind queue to Mem0"
+        )
+        self._failed = meter.create_counter(
+            "memory.write_behind.failed", description="Failed attempts to flush queued facts to Mem0, by outcome"
+        )
+        meter.create_observable_gauge(
+            "memory.write_behind.depth",
+            callbacks=[lambda options: [Observation(self.depth())]],
+            description="Facts waiting in the write-behind queue",
+        )
+        meter.create_observable_gauge(
+            "memory.write_behind.dead_letters",
+            callbacks=[lambda options: [Observation(self.dead_letters())]],
+            description="Queued facts no longer retried after max_attempts failures",
+        )
+
+    # ------------------------------------------------------------------
+    # Queue operations (cheap, safe to call from the event loop)
+    # ------------------------------------------------------------------
+    def enqueue(self, user_id: str, content: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO pending_memories (user_id, content, created_at) VALUES (?, ?, ?)",
+                (user_id, content, time.time()),
+            )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return cursor.lastrowid
+
+    def pending(self, user_id: str, limit: int = 50) -> list[dict]:
+        """Facts for `user_id` that have not reached Mem0 yet, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, content, created_at FROM pending_memories "
+                "WHERE user_id = ? AND attempts < ? ORDER BY id DESC LIMIT ?",
+                (user_id, self.max_attempts, limit),
+            ).fetchall()
+        return [{"id": r[0], "memory": r[1], "created_at": r[2]} for r in rows]
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM pending_memories WHERE attempts < ?", (self.max_attempts,)
+            ).fetchone()[0]
+
+    def dead_letters(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM pending_memories WHERE attempts >= ?", (self.max_attempts,)
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_doubt = self._conn.execute(
+                "SELECT COUNT(*) FROM pending_memories WHERE attempts < ? AND batch_key IS NOT NULL",
+                (self.max_attempts,),
+            ).fetchone()[0]
+        return {"depth": self.depth(), "in_doubt": in_doubt, "dead_letters": self.dead_letters()}
+
+    def _next_batch(self) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, user_id, content, batch_key FROM pending_memories "
+                "WHERE attempts < ? AND (retry_after IS NULL OR retry_after <= ?) ORDER BY id LIMIT ?",
+                (self.max_attempts, time.time(), self.batch_size),
+            ).fetchall()
+
+    def _ack(self, ids: list[int]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending_memories WHERE id = ?", [(i,) for i in ids])
+
+    def _fail(self, ids: list[int], error: str, key: str | None = None):
+        """Count a failed attempt; with `key`, the write may have landed and is checked before a retry."""
+        retry_after = time.time() + self.in_doubt_retry_after if key is not None else None
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE pending_memories SET attempts = attempts + 1, last_error = ?, "
+                "batch_key = COALESCE(?, batch_key), retry_after = ? WHERE id = ?",
+                [(error, key, retry_after, i) for i in ids],
+            )
+            dead = self._conn.execute(
+                f"SELECT COUNT(*) FROM pending_memories WHERE attempts = ? AND id IN ({','.join('?' * len(ids))})",
+                (self.max_attempts, *ids),
+            ).fetchone()[0]
+        if dead:
+            logger.error(f"{dead} queued facts reached {self.max_attempts} failed attempts and will not be retried")
+
+    async def _landed(self, memory, executor, user_id: str, key: str) -> bool:
+        """Whether an earlier, timed-out write tagged `key` reached Mem0."""
+        response = await executor.run("get_all", memory.get_all, user_id=user_id, filters={BATCH_KEY: key}, limit=1)
+        results = response.get("results", []) if isinstance(response, dict) else response or []
+        return bool(results)
+
+    # ------------------------------------------------------------------
+    # Background drain
+    # ------------------------------------------------------------------
+    async def flush(self, memory, executor, recent_writes=None) -> int:
+        """Write one batch to Mem0. Returns the number of facts written.
+
+        Results are recorded in `recent_writes` (if given) so the facts stay
+        visible to their owner while Milvus indexes them.
+        """
+        batch = self._next_batch()
+        if not batch:
+            return 0
+        # Rows from a timed-out flush are retried together, under their original key
+        groups = defaultdict(list)
+        for row_id, user_id, content, key in batch:
+            groups[(user_id, key)].append((row_id, content))
+
+        written = 0
+        for (user_id, key), rows in groups.items():
+            ids = [row_id for row_id, _ in rows]
+            messages = [{"role": "user", "content": content} for _, content in rows]
+            in_doubt = key is not None
+            key = key or batch_key(user_id, ids)
+            try:
+                if not in_doubt or not await self._landed(memory, executor, user_id, key):
+                    result = await executor.run("add", memory.add, messages, user_id=user_id, metadata={BATCH_KEY: key})
+                else:
+                    logger.info(f"write-behind: timed-out write {key[:12]} for user '{user_id}' did land; not retrying")
+                    result = None
+            except asyncio.TimeoutError as e:
+                logger.warning(f"write-behind flush timed out for user '{user_id}'; checking for it before a retry")
+                self._fail(ids, repr(e), key)
+                self._failed.add(len(ids), {"outcome": "timeout"})
+                continue
+            except Exception as e:
+                logger.error(f"write-behind flush failed for user '{user_id}': {e!r}")
+                self._fail(ids, repr(e))
+                self._failed.add(len(ids), {"outcome": "error"})
+                continue
+            if recent_writes is not None and result is not None:
+                recent_writes.record(user_id, result)
+            self._ack(ids)
+            self._flushed.add(len(ids))
+            written += len(ids)
+        return written
+
+    async def _drain_forever(self, memory, executor, recent_writes):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                # Keep going while full batches come back; a short one means we caught up
+                while await self.flush(memory, executor, recent_writes) >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"write-behind drain loop error: {e!r}")
+
+    def start(self, memory, executor, recent_writes=None):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._drain_forever(memory, executor, recent_writes))
+        logger.info(f"Write-behind memory queue started ({self.depth()} pending in {self.path})")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import Counter
+
+import numpy as np
+from opentelemetry import metrics
+
+from embeddings import normalize_text
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+# Payload marker for facts stored verbatim and not yet consolidated by the LLM
+RAW_SOURCE = "raw"
+
+
+def content_hash(text: str) -> str:
+    """Hash of a fact that ignores case and whitespace differences."""
+    return hashlib.sha256(normalize_text(text).casefold().encode()).hexdigest()
+
+
+def _texts(messages) -> list[str]:
+    if isinstance(messages, str):
+        return [messages]
+    if isinstance(messages, dict):
+        messages = [messages]
+    return [m["content"] for m in messages if isinstance(m, dict) and m.get("role") != "system" and m.get("content")]
+
+
+def _results(response) -> list[dict]:
+    return response.get("results", []) if isinstance(response, dict) else response or []
+
+
+# ============================================================================
+# Raw-fact memory: Mem0 without the LLM on the write path
+# ============================================================================
+class RawFactMemory:
+    """Stores facts verbatim through Mem0 with `infer=False`.
+
+    A drop-in for the Mem0 `Memory` used by the tools and the write-behind
+    queue. `add` skips Mem0's LLM fact extraction and update round trip: each
+    fact is embedded and inserted as is, unless it duplicates something the
+    user already has:
+
+    - exact duplicates are caught by `content_hash` (case and whitespace
+      insensitive)
+    - near duplicates are caught by cosine similarity >= `dedup_threshold`
+      against the user's closest `dedup_candidates` memories and their writes
+      that Milvus may not have indexed yet (`recent_writes`)
+
+    Duplicates come back as `NONE` events with the existing memory's id.
+    Everything else (`search`, `get_all`, ...) is delegated to Mem0.
+
+    LLM consolidation is opt-in: `start` runs a background pass that, for users
+    with at least `consolidate_min_facts` new raw facts, replaces them with
+    what Mem0's extraction makes of them.
+    """
+
+    def __init__(
+        self,
+        memory,
+        embeddings,
+        recent_writes=None,
+        dedup_threshold: float = 0.9,
+        dedup_candidates: int = 5,
+        consolidate_interval: float = 0.0,
+        consolidate_min_facts: int = 5,
+    ):
+        self.memory = memory
+        self.embeddings = embeddings
+        self.recent_writes = recent_writes
+        self.dedup_threshold = dedup_threshold
+        self.dedup_candidates = dedup_candidates
+        self.consolidate_interval = consolidate_interval
+        self.consolidate_min_facts = consolidate_min_facts
+        # Saves for one user are checked and inserted one at a time, so two
+        # concurrent saves of the same fact can't both miss each other
+        self._user_locks = [threading.Lock() for _ in range(64)]
+        # user_id -> raw facts written since that user's last consolidation
+        self._unconsolidated: Counter[str] = Counter()
+        self._task: asyncio.Task | None = None
+
+        self._writes = meter.create_counter(
+            "memory.raw.writes", description="Facts passed to save_memory in raw mode, by outcome"
+        )
+        self._consolidations = meter.create_counter(
+            "memory.raw.consolidations", description="Background LLM consolidation passes, by outcome"
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.memory, name)
+
+    def _lock(self, user_id: str) -> threading.Lock:
+        return self._user_locks[hash(user_id) % len(self._user_locks)]
+
+    def _vectors(self, texts: list[str]) -> np.ndarray:
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _candidates(self, fact: str, user_id: str) -> list[dict]:
+        found = _results(self.memory.search(fact, user_id=user_id, limit=self.dedup_candidates))
+        if self.recent_writes is not None:
+            found = self.recent_writes.merge(user_id, found)
+        return [r for r in found if isinstance(r, dict) and r.get("memory")]
+
+    def _find_duplicate(self, fact: str, vector: np.ndarray, candidates: list[dict]) -> tuple[dict, str] | None:
+        digest = content_hash(fact)
+        for candidate in candidates:
+            if content_hash(candidate["memory"]) == digest:
+                return candidate, "exact"
+        if not candidates or self.dedup_threshold <= 0:
+            return None
+        scores = self._vectors([c["memory"] for c in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.dedup_threshold:
+            return candidates[best], "near"
+        return None
+
+    def add(self, messages, *, user_id: str, metadata: dict | None = None, **kwargs) -> dict:
+        """Insert the non-duplicate facts in `messages` without LLM extraction (blocking)."""
+        facts = [normalize_text(text) for text in _texts(messages)]
+        facts = [fact for fact in facts if fact]
+        if not facts:
+            return {"results": []}
+
+        with self._lock(user_id):
+            vectors = self._vectors(facts)
+            results, new_facts, accepted = [], [], []
+            for fact, vector in zip(facts, vectors):
+                # Facts earlier in this batch count as candidates too
+                candidates = accepted + self._candidates(fact, user_id)
+                duplicate = self._find_duplicate(fact, vector, candidates)
+                if duplicate is not None:
+                    existing, kind = duplicate
+                    self._writes.add(1, {"outcome": f"{kind}_duplicate"})
+                    results.append({"id": existing.get("id"), "memory": existing["memory"], "event": "NONE", "duplicate": kind})
+                    continue
+                new_facts.append(fact)
+                accepted.append({"memory": fact})
+
+            if new_facts:
+                added = self.memory.add(
+                    [{"role": "user", "content": fact} for fact in new_facts],
+                    user_id=user_id,
+                    metadata={**(metadata or {}), "source": RAW_SOURCE},
+                    infer=False,
+                )
+                results = _results(added) + results
+                self._writes.add(len(new_facts), {"outcome": "added"})
+                self._unconsolidated[user_id] += len(new_facts)
+        return {"results": results}
+
+    # ------------------------------------------------------------------
+    # Opt-in background consolidation
+    # ------------------------------------------------------------------
+    def consolidate(self, user_id: str) -> dict:
+        """Replace a user's raw facts with Mem0's LLM-extracted memories (blocking)."""
+        with self._lock(user_id):
+            memories = _results(self.memory.get_all(user_id=user_id, limit=1000))
+            raw = [m for m in memories if (m.get("metadata") or {}).get("source") == RAW_SOURCE]
+            self._unconsolidated.pop(user_id, None)
+            if not raw:
+                return {"results": []}
+            messages = [{"role": "user", "content": m["memory"]} for m in raw]
+            # Removed first so the extraction reconciles against consolidated memories only
+            for m in raw:
+                self.memory.delete(m["id"])
+            try:
+                result = self.memory.add(messages, user_id=user_id)
+            except Exception:
+                # Put the facts back as they were rather than lose them
+                self.memory.add(messages, user_id=user_id, metadata={"source": RAW_SOURCE}, infer=False)
+                raise
+            if self.recent_writes is not None:
+                self.recent_writes.record(user_id, [{"id": m["id"], "event": "DELETE"} for m in raw])
+                self.recent_writes.record(user_id, result)
+            return result
+
+    async def _consolidate_forever(self, executor):
+        while True:
+            await asyncio.sleep(self.consolidate_interval)
+            due = [u for u, n in self._unconsolidated.items() if n >= self.consolidate_min_facts]
+            for user_id in due:
+                try:
+                    result = await executor.run("consolidate", self.consolidate, user_id)
+                    self._consolidations.add(1, {"outcome": "ok"})
+                    logger.info(f"Consolidated raw memories for user '{user_id}': {len(_results(result))} changes")
+                except Exception as e:
+                    self._consolidations.add(1, {"outcome": "error"})
+                    logger.error(f"Memory consolidation failed for user '{user_id}': {e!r}")
+
+    def start(self, executor):
+        """Start the background consolidation pass if `consolidate_interval` is set."""
+        if self.consolidate_interval > 0:
+            self._task = asyncio.create_task(self._consolidate_forever(executor))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# ============================================================================
+# Read-your-writes buffer for Mem0
+# ============================================================================
+class RecentWrites:
+    """Per-user record of memories Mem0 just wrote, merged into search results.
+
+    Milvus makes new vectors searchable only after a short delay, so a recall
+    straight after a save can miss the fact the user just shared. Every
+    `memory.add` result is recorded here for `ttl` seconds and `merge` folds it
+    into later search results for the same user:
+
+    - ADD / UPDATE entries missing from the results are added, and stale text
+      for an updated id is replaced
+    - DELETE entries remove the id from the results
+    - an entry is dropped as soon as search returns it itself
+
+    Every write path records here, so other caches of a user's memories
+    subscribe with `add_listener` to see the same writes.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_per_user: int = 50, max_users: int = 10000):
+        self.ttl = ttl
+        self.max_per_user = max_per_user
+        self.max_users = max_users
+        # user_id -> memory id -> (recorded_at, event, text)
+        self._users: OrderedDict[str, OrderedDict[str, tuple[float, str, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._listeners: list = []
+
+    def add_listener(self, listener) -> None:
+        """Call `listener(user_id, items)` with every recorded write, even when `ttl` is 0."""
+        self._listeners.append(listener)
+
+    def record(self, user_id: str, result) -> None:
+        """Record the outcome of `memory.add` (`{"results": [...]}` or a list)."""
+        items = result.get("results", []) if isinstance(result, dict) else result or []
+        for listener in self._listeners:
+            listener(user_id, items)
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entries = self._users.setdefault(user_id, OrderedDict())
+            self._users.move_to_end(user_id)
+            for item in items:
+                if not isinstance(item, dict) or not item.get("id"):
+                    continue
+                event = item.get("event", "ADD")
+                if event not in ("ADD", "UPDATE", "DELETE"):
+                    continue
+                entries[item["id"]] = (now, event, item.get("memory", ""))
+                entries.move_to_end(item["id"])
+            while len(entries) > self.max_per_user:
+                entries.popitem(last=False)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def _live(self, user_id: str) -> dict[str, tuple[float, str, str]]:
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            entries = self._users.get(user_id)
+            if not entries:
+                return {}
+            for memory_id in [k for k, (at, _, _) in entries.items() if at < cutoff]:
+                del entries[memory_id]
+            if not entries:
+                del self._users[user_id]
+                return {}
+            return dict(entries)
+
+    def _forget(self, user_id: str, memory_ids: list[str]):
+        with self._lock:
+            entries = self._users.get(user_id)
+            for memory_id in memory_ids:
+                if entries is not None:
+                    entries.pop(memory_id, None)
+
+    def merge(self, user_id: str, results: list[dict]) -> list[dict]:
+        """Return `results` with this user's recent writes applied, newest writes first."""
+        entries = self._live(user_id)
+        if not entries:
+            return results
+
+        visible = []
+        merged = []
+        for r in results:
+            entry = entries.get(r.get("id")) if isinstance(r, dict) else None
+            if entry is None:
+                merged.append(r)
+                continue
+            _, event, text = entry
+            if event == "DELETE":
+                continue
+            if r.get("memory") == text:
+                visible.append(r["id"])
+                merged.append(r)
+            else:
+                merged.append({**r, "memory": text})
+        # Search already reflects these writes; no need to keep patching them in
+        self._forget(user_id, visible)
+
+        seen = {r.get("id") for r in merged if isinstance(r, dict)}
+        recent = [
+            {"id": memory_id, "memory": text, "recent": True}
+            for memory_id, (_, event, text) in reversed(entries.items())
+            if event != "DELETE" and memory_id not in seen
+        ]
+        return recent + merged
@@ -0,0 +1,185 @@
+import hashlib
+import itertools
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+from embeddings import normalize_text
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+# Turns that call these tools change state and are never cached
+WRITE_TOOLS = frozenset({"save_memory"})
+# Turns that read the user's memory are only reused within the same thread
+MEMORY_TOOLS = frozenset({"recall_memory", "get_all_memories"})
+# First-person messages are personal: "what is MY name", "I like ..."
+PERSONAL_PATTERN = re.compile(r"\b(i|i'm|i've|me|my|mine|myself|we|our|us)\b", re.IGNORECASE)
+
+GLOBAL_SCOPE = "global"
+
+
+def is_personal(message: str) -> bool:
+    return bool(PERSONAL_PATTERN.search(message))
+
+
+def context_digest(history: list) -> str:
+    """Digest of the last exchange in `history`, the context a follow-up like "and its price?" refers to.
+
+    Empty for a thread with no earlier turns.
+    """
+    for i in range(len(history) - 1, -1, -1):
+        if isinstance(history[i], HumanMessage):
+            answers = [m.content for m in history[i + 1:] if isinstance(m, AIMessage) and isinstance(m.content, str) and m.content]
+            exchange = [normalize_text(str(history[i].content)).casefold(), answers[-1] if answers else ""]
+            return hashlib.sha1("\n".join(exchange).encode()).hexdigest()
+    return ""
+
+
+def cache_scope(message: str, thread_id: str, tool_names: set[str]) -> str | None:
+    """Scope a finished turn may be cached under, or None if it must not be cached."""
+    if tool_names & WRITE_TOOLS:
+        return None
+    if tool_names & MEMORY_TOOLS or is_personal(message):
+        return f"thread:{thread_id}"
+    return GLOBAL_SCOPE
+
+
+@dataclass
+class CachedResponse:
+    scope: str
+    context: str
+    message: str
+    vector: np.ndarray
+    response: str
+    tool_usage: list
+    expires_at: float
+
+
+# ============================================================================
+# Semantic response cache for /chat
+# ============================================================================
+class SemanticResponseCache:
+    """Serves near-duplicate chat messages from earlier answers.
+
+    Messages are embedded with the shared `EmbeddingService` and matched by
+    cosine similarity (>= `threshold`) against cached turns:
+
+    - turns that called a write tool (`save_memory`) are never cached and drop
+      the thread's cached entries, since their answers may now be stale
+    - personal (first-person) or memory-reading turns are cached per thread and
+      only served back to that thread
+    - everything else is shared across threads
+
+    Every entry is also keyed by the `context_digest` of the thread's history
+    before the turn, so a follow-up is only served where the exchange it
+    follows is the same. First messages of threads have an empty context and
+    are shared freely.
+
+    Entries expire after `ttl` seconds; beyond `max_entries` the least recently
+    used are evicted.
+    """
+
+    def __init__(self, embeddings, threshold: float = 0.95, ttl: float = 600.0, max_entries: int = 2000):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, CachedResponse] = OrderedDict()
+        self._scopes: dict[str, set[int]] = {}
+        self._ids = itertools.count()
+        self.hits = 0
+        self.misses = 0
+
+        self._hit_counter = meter.create_counter("chat.cache.hits", description="/chat requests served from cache")
+        self._miss_counter = meter.create_counter("chat.cache.misses", description="/chat requests not in cache")
+        self._similarity_hist = meter.create_histogram(
+            "chat.cache.similarity", description="Best cosine similarity found per cache lookup"
+        )
+        meter.create_observable_gauge(
+            "chat.cache.entries",
+            callbacks=[lambda options: [Observation(len(self._entries))]],
+            description="Cached chat responses",
+        )
+
+    async def embed(self, message: str) -> np.ndarray:
+        text = normalize_text(message).casefold()
+        vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            ids = self._scopes.get(entry.scope)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._scopes[entry.scope]
+
+    async def lookup(self, message: str, thread_id: str, history: list = ()) -> tuple[CachedResponse | None, np.ndarray]:
+        """Best cached answer for `message` visible to `thread_id` after `history`, plus the message vector."""
+        vector = await self.embed(message)
+        scopes = [f"thread:{thread_id}"] if is_personal(message) else [GLOBAL_SCOPE, f"thread:{thread_id}"]
+        context = context_digest(history)
+        now = time.monotonic()
+        candidates = []
+        for scope in scopes:
+            for entry_id in list(self._scopes.get(scope, ())):
+                if self._entries[entry_id].expires_at < now:
+                    self._remove(entry_id)
+                elif self._entries[entry_id].context == context:
+                    candidates.append(entry_id)
+
+        best_id, best_score = None, 0.0
+        if candidates:
+            scores = np.stack([self._entries[i].vector for i in candidates]) @ vector
+            index = int(np.argmax(scores))
+            best_id, best_score = candidates[index], float(scores[index])
+            self._similarity_hist.record(best_score)
+
+        if best_id is not None and best_score >= self.threshold:
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            self._hit_counter.add(1, {"scope": self._entries[best_id].scope.split(":")[0]})
+            return self._entries[best_id], vector
+        self.misses += 1
+        self._miss_counter.add(1)
+        return None, vector
+
+    def store(self, message: str, thread_id: str, vector: np.ndarray, response: str, tool_usage: list, history: list = ()):
+        """Cache a finished turn, which followed `history`, according to the scoping rules."""
+        tool_names = {call.get("name") for calls in tool_usage for call in calls}
+        scope = cache_scope(message, thread_id, tool_names)
+        if scope is None:
+            self.invalidate_thread(thread_id)
+            return
+        if not response:
+            return
+        entry_id = next(self._ids)
+        self._entries[entry_id] = CachedResponse(
+            scope, context_digest(history), message, vector, response, tool_usage, time.monotonic() + self.ttl
+        )
+        self._scopes.setdefault(scope, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate_thread(self, thread_id: str):
+        for entry_id in list(self._scopes.get(f"thread:{thread_id}", ())):
+            self._remove(entry_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
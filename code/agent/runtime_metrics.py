@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+
+# ============================================================================
+# LLM calls
+# ============================================================================
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records latency, time to first token and token counts of every chat model call.
+
+    Passed in the run config's `callbacks`, so it sees the agent's model calls
+    as well as history summaries (tagged `history_summary`), which are labelled
+    separately.
+    """
+
+    # Bookkeeping only; run on the event loop instead of a thread pool
+    run_inline = True
+
+    def __init__(self):
+        self._started: dict[UUID, tuple[float, dict]] = {}
+        self._first_token: set[UUID] = set()
+        self._duration_hist = meter.create_histogram(
+            "llm.duration", unit="ms", description="Chat model call latency"
+        )
+        self._ttft_hist = meter.create_histogram(
+            "llm.time_to_first_token", unit="ms", description="Time until a streamed model call produced its first token"
+        )
+        self._token_hist = meter.create_histogram(
+            "llm.tokens", description="Tokens per chat model call, by direction (input, output)"
+        )
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, tags=None, metadata=None, **kwargs):
+        call = "summary" if "history_summary" in (tags or []) else "agent"
+        model = (metadata or {}).get("ls_model_name", "unknown")
+        self._started[run_id] = (time.perf_counter(), {"call": call, "model": model})
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        if run_id in self._first_token or run_id not in self._started:
+            return
+        self._first_token.add(run_id)
+        started, attributes = self._started[run_id]
+        self._ttft_hist.record((time.perf_counter() - started) * 1000, attributes)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        attributes = self._finish(run_id, "ok")
+        if attributes is None:
+            return
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        # Streamed responses only carry usage when the gateway reports it
+        if input_tokens or output_tokens:
+            self._token_hist.record(input_tokens, {**attributes, "direction": "input"})
+            self._token_hist.record(output_tokens, {**attributes, "direction": "output"})
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._finish(run_id, "error")
+
+    def _finish(self, run_id: UUID, outcome: str) -> dict | None:
+        self._first_token.discard(run_id)
+        entry = self._started.pop(run_id, None)
+        if entry is None:
+            return None
+        started, attributes = entry
+        self._duration_hist.record((time.perf_counter() - started) * 1000, {**attributes, "outcome": outcome})
+        return attributes
+
+
+# ============================================================================
+# Event loop lag
+# ============================================================================
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes up a task sleeping for `interval` seconds.
+
+    Lag is time the loop spent running something else: blocking calls,
+    CPU-heavy callbacks, or simply too many ready tasks. It shows up as
+    extra latency on every in-flight request.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._task: asyncio.Task | None = None
+        self._lag_hist = meter.create_histogram(
+            "event_loop.lag", unit="ms", description="Delay in waking a sleeping task on the event loop"
+        )
+        meter.create_observable_gauge(
+            "event_loop.lag.max",
+            callbacks=[self._observe_max],
+            unit="ms",
+            description="Worst event loop lag since the previous collection",
+        )
+
+    def _observe_max(self, options):
+        value, self.max_lag_ms = self.max_lag_ms, self.last_lag_ms
+        return [Observation(value)]
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - started - self.interval) * 1000)
+            self.last_lag_ms = lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self._lag_hist.record(lag_ms)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+# ============================================================================
+# Checkpointer size
+# ============================================================================
+class CheckpointerGauges:
+    """Exposes `checkpointer.stats()` as gauges, refreshed every `interval` seconds.
+
+    Gauge callbacks can't await, and counting checkpoints on every scrape is
+    wasteful, so the stats are polled in the background and the last values
+    are reported.
+    """
+
+    def __init__(self, checkpointer, interval: float = 30.0):
+        self.checkpointer = checkpointer
+        self.interval = interval
+        self.latest: dict = {}
+        self._task: asyncio.Task | None = None
+        for key, name, unit, description in (
+            ("threads", "checkpointer.threads", "", "Conversation threads held by the checkpointer"),
+            ("checkpoints", "checkpointer.checkpoints", "", "Checkpoints stored"),
+            ("size_bytes", "checkpointer.size", "By", "Checkpoint database size on disk (sqlite backend)"),
+        ):
+            meter.create_observable_gauge(name, callbacks=[self._observer(key)], unit=unit, description=description)
+
+    def _observer(self, key: str):
+        def observe(options):
+            value = self.latest.get(key)
+            if value is None:
+                return []
+            return [Observation(value, {"backend": self.latest.get("backend", "unknown")})]
+        return observe
+
+    async def refresh(self):
+        try:
+            self.latest = await self.checkpointer.stats()
+        except Exception as e:
+            logger.warning(f"Checkpointer stats failed: {e!r}")
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
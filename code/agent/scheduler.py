@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+
+class ChatSchedulerFull(RuntimeError):
+    """Raised when a chat request can't be admitted; `retry_after` is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ============================================================================
+# Admission control for agent runs
+# ============================================================================
+class ChatScheduler:
+    """Limits concurrent agent runs and shares them fairly between threads.
+
+    - at most `max_concurrency` runs at once; further requests wait in a queue
+      of at most `max_queue`, beyond that they are rejected straight away
+    - one run per `thread_id` at a time, so two requests never interleave on the
+      same checkpoint; a thread may queue at most `max_queue_per_thread` more
+    - a freed slot goes to the next thread in round-robin order, not to the
+      oldest request, so a chatty thread can't starve the others
+    - a request that waits longer than `queue_timeout` is rejected
+
+    Rejections raise `ChatSchedulerFull` with a Retry-After estimate based on the
+    recent average run time.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queue: int = 64,
+        max_queue_per_thread: int = 4,
+        queue_timeout: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_thread = max_queue_per_thread
+        self.queue_timeout = queue_timeout
+        self._running: set[str] = set()
+        # thread_id -> waiting requests, oldest first
+        self._waiting: dict[str, deque[asyncio.Future]] = {}
+        # Threads with waiting requests and no run in progress, in round-robin order
+        self._ready: deque[str] = deque()
+        self._queued = 0
+        self._avg_run_s = 1.0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+        self._wait_hist = meter.create_histogram(
+            "chat.scheduler.wait", unit="ms", description="Time a chat request waited for a slot"
+        )
+        self._rejected_counter = meter.create_counter(
+            "chat.scheduler.rejected", description="Chat requests rejected with 429"
+        )
+        meter.create_observable_gauge(
+            "chat.scheduler.in_flight",
+            callbacks=[lambda options: [Observation(len(self._running))]],
+            description="Agent runs in progress",
+        )
+        meter.create_observable_gauge(
+            "chat.scheduler.queue_depth",
+            callbacks=[lambda options: [Observation(self._queued)]],
+            description="Chat requests waiting for a slot",
+        )
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queued request would start."""
+        return max(1, math.ceil(self._avg_run_s * (self._queued + 1) / self.max_concurrency))
+
+    def _reject(self, reason: str):
+        self._rejected += 1
+        self._rejected_counter.add(1, {"reason": reason})
+        raise ChatSchedulerFull(f"Too many chat requests ({reason})", self.retry_after())
+
+    async def acquire(self, thread_id: str):
+        """Wait for a slot for `thread_id`; pair every successful call with `release`."""
+        started = time.monotonic()
+        if (
+            thread_id not in self._running
+            and thread_id not in self._waiting
+            and not self._ready
+            and len(self._running) < self.max_concurrency
+        ):
+            self._running.add(thread_id)
+            self._wait_hist.record(0)
+            return
+
+        queue = self._waiting.get(thread_id)
+        if self._queued >= self.max_queue:
+            self._reject("queue_full")
+        if queue is not None and len(queue) >= self.max_queue_per_thread:
+            self._reject("thread_queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._waiting[thread_id] = deque()
+            if thread_id not in self._running:
+                self._ready.append(thread_id)
+        queue.append(future)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller gave up: hand the slot on
+                self.release(thread_id)
+            else:
+                self._discard(thread_id, future)
+            if isinstance(e, asyncio.TimeoutError):
+                self._timeouts += 1
+                self._reject("queue_timeout")
+            raise
+        self._wait_hist.record((time.monotonic() - started) * 1000)
+
+    def release(self, thread_id: str, run_s: float | None = None):
+        self._running.discard(thread_id)
+        if run_s is not None:
+            self._completed += 1
+            self._avg_run_s = 0.9 * self._avg_run_s + 0.1 * run_s
+        if thread_id in self._waiting:
+            # Back of the line: every other waiting thread goes first
+            self._ready.append(thread_id)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, thread_id: str):
+        await self.acquire(thread_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(thread_id, time.monotonic() - started)
+
+    def _dispatch(self):
+        while self._ready and len(self._running) < self.max_concurrency:
+            thread_id = self._ready.popleft()
+            queue = self._waiting[thread_id]
+            # Skip waiters that timed out or were cancelled but haven't cleaned up yet
+            while queue and queue[0].done():
+                queue.popleft()
+                self._queued -= 1
+            if not queue:
+                del self._waiting[thread_id]
+                continue
+            future = queue.popleft()
+            self._queued -= 1
+            if not queue:
+                del self._waiting[thread_id]
+            self._running.add(thread_id)
+            future.set_result(None)
+
+    def _discard(self, thread_id: str, future: asyncio.Future):
+        queue = self._waiting.get(thread_id)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self._queued -= 1
+        if not queue:
+            del self._waiting[thread_id]
+            if thread_id in self._ready:
+                self._ready.remove(thread_id)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": len(self._running),
+            "queued": self._queued,
+            "waiting_threads": len(self._waiting),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timeouts": self._timeouts,
+            "avg_run_s": round(self._avg_run_s, 3),
+        }
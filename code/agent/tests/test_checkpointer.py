@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_graph import build_agent_graph  # noqa: E402
+from checkpointer import BoundedMemorySaver, create_checkpointer  # noqa: E402
+
+
+class _ScriptedModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _run_turns(saver: BoundedMemorySaver, turns: int) -> list[tuple[int, int, int]]:
+    """Run `turns` turns on one thread; (checkpoints, blobs, writes) held after each."""
+    llm = _ScriptedModel(messages=iter([AIMessage(content=f"answer {i}") for i in range(turns)]))
+    graph = build_agent_graph(llm, [], saver, "You are a test assistant.")
+    config = {"configurable": {"thread_id": "t1"}}
+    sizes = []
+    for i in range(turns):
+        asyncio.run(graph.ainvoke({"messages": [HumanMessage(content=f"question {i}")]}, config))
+        sizes.append((len(saver.storage["t1"][""]), len(saver.blobs), len(saver.writes)))
+    return sizes
+
+
+def test_memory_saver_checkpoints_stay_flat_across_turns():
+    saver = BoundedMemorySaver(max_messages=200, keep_checkpoints=3)
+    sizes = _run_turns(saver, 60)
+    assert sizes[-1][0] == 3
+    # Nothing grows with the number of turns once the first few have run
+    assert sizes[-1] == sizes[10]
+
+
+def test_memory_saver_keeps_latest_state_after_compaction():
+    saver = BoundedMemorySaver(max_messages=200, keep_checkpoints=3)
+    _run_turns(saver, 20)
+    state = saver.get_tuple({"configurable": {"thread_id": "t1"}})
+    messages = state.checkpoint["channel_values"]["messages"]
+    assert [m.content for m in messages[-2:]] == ["question 19", "answer 19"]
+    assert len(messages) == 40
+
+
+def test_memory_saver_prune_compacts_to_lower_keep():
+    saver = BoundedMemorySaver(keep_checkpoints=10)
+    _run_turns(saver, 10)
+    saver.keep_checkpoints = 2
+    asyncio.run(saver.prune())
+    assert len(saver.storage["t1"][""]) == 2
+
+
+def test_sqlite_saver_sets_up_once_and_shrinks_on_prune(tmp_path):
+    async def scenario():
+        saver = await create_checkpointer("sqlite", str(tmp_path / "checkpoints.db"), 200, 86400.0, 10000, 3)
+        statements = []
+        execute = saver.conn.execute
+        saver.conn.execute = lambda sql, *args: statements.append(sql) or execute(sql, *args)
+        try:
+            for t in range(50):
+                config = {"configurable": {"thread_id": f"t{t}", "checkpoint_ns": ""}}
+                for _ in range(5):
+                    checkpoint = empty_checkpoint()
+                    checkpoint["channel_values"] = {"payload": "x" * 2000}
+                    config = await saver.aput(config, checkpoint, {}, {})
+                await saver.aget_tuple(config)
+            # No per-call setup statements on the read/write path
+            assert not [sql for sql in statements if "CREATE" in sql]
+
+            before = (await saver.stats())["size_bytes"]
+            saver.thread_ttl = 0
+            assert await saver.prune() == 50
+            after = (await saver.stats())["size_bytes"]
+            assert after < before / 4
+        finally:
+            await saver.aclose()
+
+    asyncio.run(scenario())
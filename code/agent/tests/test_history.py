@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_graph import build_agent_graph  # noqa: E402
+from history import HistoryCompactor  # noqa: E402
+
+SYSTEM_PROMPT = "You are a test assistant."
+
+
+class _RecordingModel(GenericFakeChatModel):
+    """Scripted replies; keeps the messages of every call."""
+
+    calls: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, *args, **kwargs):
+        self.calls.append(list(messages))
+        return super()._generate(messages, *args, **kwargs)
+
+
+def test_summary_is_merged_into_the_single_leading_system_prompt():
+    llm = _RecordingModel(messages=iter([AIMessage(content=f"answer {i}") for i in range(12)]), calls=[])
+    summarizer = GenericFakeChatModel(messages=iter([AIMessage(content=f"summary {i}") for i in range(12)]))
+    compactor = HistoryCompactor(summarizer, max_tokens=0, summarize_after=6, keep_recent=4, tool_output_max_chars=0)
+    graph = build_agent_graph(llm, [], MemorySaver(), SYSTEM_PROMPT, pre_model_hook=compactor)
+    config = {"configurable": {"thread_id": "t1"}}
+    for i in range(6):
+        asyncio.run(graph.ainvoke({"messages": [HumanMessage(content=f"question {i}")]}, config))
+
+    first, last = llm.calls[0], llm.calls[-1]
+    assert [type(m) for m in first] == [SystemMessage, HumanMessage]
+    assert first[0].content == SYSTEM_PROMPT
+
+    # Summarised turn: one system message, first, starting with the bound prompt
+    assert [type(m) for m in last] == [SystemMessage, HumanMessage, AIMessage, HumanMessage]
+    assert last[0].content.startswith(f"{SYSTEM_PROMPT}\n\nSummary of the earlier conversation:\nsummary ")
+    # The recent window starts on a human turn
+    assert [m.content for m in last[1:]] == ["question 4", "answer 4", "question 5"]
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from memory_executor import MemoryExecutor  # noqa: E402
+
+
+def _idle(stats: dict) -> bool:
+    return stats["queued"] == 0 and stats["running"] == 0 and stats["abandoned"] == 0
+
+
+async def _wait_for(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_cancelled_queued_calls_release_their_slots():
+    async def scenario():
+        executor = MemoryExecutor(max_workers=1, max_queue=2, timeout=5.0)
+        release = threading.Event()
+        try:
+            blocker = asyncio.create_task(executor.run("add", release.wait))
+            queued = [asyncio.create_task(executor.run("search", lambda: "late")) for _ in range(2)]
+            await _wait_for(lambda: executor.stats()["queued"] == 2 and executor.stats()["running"] == 1)
+
+            for task in queued:
+                task.cancel()
+            await asyncio.gather(*queued, return_exceptions=True)
+            assert executor.stats()["queued"] == 0
+
+            release.set()
+            await blocker
+            await _wait_for(lambda: _idle(executor.stats()))
+            assert executor.stats()["cancelled"] == 2
+            # The pool still takes work
+            assert await executor.run("search", lambda: "ok") == "ok"
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_running_call_is_abandoned_until_it_finishes():
+    async def scenario():
+        executor = MemoryExecutor(max_workers=1, max_queue=0, timeout=5.0)
+        release = threading.Event()
+        try:
+            task = asyncio.create_task(executor.run("add", release.wait))
+            await _wait_for(lambda: executor.stats()["running"] == 1)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            assert executor.stats()["abandoned"] == 1
+
+            release.set()
+            await _wait_for(lambda: _idle(executor.stats()))
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+import threading
+
+from langchain_core.messages import HumanMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from memory_executor import MemoryExecutor  # noqa: E402
+from memory_prefetch import MemoryPrefetcher  # noqa: E402
+
+
+class _Memory:
+    def search(self, query, user_id, limit):
+        return {"results": [{"memory": "Favourite fruit is mango", "score": 0.1}]}
+
+
+async def _wait_for(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_late_prefetches_do_not_leak_executor_slots():
+    async def scenario():
+        executor = MemoryExecutor(max_workers=1, max_queue=2, timeout=5.0)
+        prefetcher = MemoryPrefetcher(_Memory(), executor=executor, timeout=0.05)
+        hook = prefetcher.hook()
+        release = threading.Event()
+        try:
+            # Another user's slow Mem0 call holds the only worker
+            blocker = asyncio.create_task(executor.run("add", release.wait))
+            await _wait_for(lambda: executor.stats()["running"] == 1)
+
+            # More late prefetches than the queue has room for
+            for turn in range(5):
+                message = f"What is my favourite fruit? ({turn})"
+                prefetch = prefetcher.start(message, user_id="alice")
+                state = {"messages": [HumanMessage(content=message)]}
+                update = await hook(state, {"configurable": {"memory_prefetch": prefetch}})
+                assert update["llm_input_messages"] == state["messages"]
+                assert prefetch.miss == "late"
+                await asyncio.gather(prefetch.task, return_exceptions=True)
+                assert executor.stats()["queued"] == 0
+            assert executor.stats()["rejected"] == 0
+
+            release.set()
+            await blocker
+            await _wait_for(lambda: executor.stats()["running"] == 0)
+            # Memory still works once the worker is free
+            prefetch = prefetcher.start("What is my favourite fruit?", user_id="alice")
+            assert [m["memory"] for m in await prefetch.task] == ["Favourite fruit is mango"]
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
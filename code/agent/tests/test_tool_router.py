@@ -0,0 +1,115 @@
+import asyncio
+import os
+import re
+import sys
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_graph import build_agent_graph  # noqa: E402
+from tool import get_all_memories, recall_memory, save_memory  # noqa: E402
+from tool_router import ToolRouter  # noqa: E402
+
+PINNED = {"save_memory", "recall_memory", "get_all_memories"}
+
+
+# The MCP server's tools, as the agent sees them
+@tool
+async def get_fruit_price(fruit_name: str) -> str:
+    """Get price with the fruit_name passed in as parameter."""
+    return "$1"
+
+
+@tool
+async def web_search(query: str) -> str:
+    """Search the web for information based on a query and return top 20 results."""
+    return "[]"
+
+
+CATALOG = [save_memory, recall_memory, get_all_memories, get_fruit_price, web_search]
+
+# Words per topic axis; everything else lands on a shared "other" axis
+TOPICS = [
+    {"price", "prices", "cost", "fruit", "apples", "bananas", "kiwis"},
+    {"search", "web", "news", "latest", "research", "information", "results"},
+    {"memory", "remember", "save", "saved", "recall", "memories"},
+]
+
+
+class TopicEmbeddings:
+    """Deterministic stand-in for the sentence embedding model."""
+
+    def __init__(self):
+        self.document_calls = 0
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * (len(TOPICS) + 1)
+        for word in re.findall(r"[a-z]+", text.lower()):
+            axis = next((i for i, words in enumerate(TOPICS) if word in words), len(TOPICS))
+            vector[axis] += 1.0 if axis < len(TOPICS) else 0.02
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.document_calls += 1
+        return [self._embed(text) for text in texts]
+
+
+class _RecordingModel(GenericFakeChatModel):
+    bound: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound.append(sorted(t.name for t in tools))
+        return self
+
+
+def _router(embeddings=None) -> tuple[ToolRouter, list[list[str]]]:
+    """Router over the shipped catalog, and the tool names each graph it builds binds."""
+    llm = _RecordingModel(messages=iter([AIMessage(content="ok")] * 10))
+
+    def build(tools):
+        return build_agent_graph(llm, tools, None, "You are a test assistant.")
+
+    router = ToolRouter(embeddings or TopicEmbeddings(), pinned=PINNED)
+    router.set_tools(CATALOG, build, build(CATALOG))
+    return router, llm.bound
+
+
+def test_router_narrows_the_shipped_catalog():
+    router, _ = _router()
+    assert asyncio.run(router.select("What is the price of apples?")) == PINNED | {"get_fruit_price"}
+    assert asyncio.run(router.select("Find the latest AI research news")) == PINNED | {"web_search"}
+    assert asyncio.run(router.select("Hello!")) == PINNED
+
+
+def test_router_keeps_previous_turn_tools_for_follow_ups():
+    router, _ = _router()
+    asyncio.run(router.select("What is the price of apples?", "t1"))
+    assert "get_fruit_price" in asyncio.run(router.select("and what about that one?", "t1"))
+    # Only the previous turn's matches carry over
+    assert asyncio.run(router.select("thanks!", "t1")) == PINNED
+    assert asyncio.run(router.select("and what about that one?", "t2")) == PINNED
+
+
+def test_router_caches_one_graph_per_subset():
+    embeddings = TopicEmbeddings()
+    router, builds = _router(embeddings)
+    first = asyncio.run(router.graph_for("What is the price of apples?"))
+    second = asyncio.run(router.graph_for("How much do bananas cost?"))
+    assert first is second
+    # The full graph plus one subset, bound to just its tools; descriptions embedded once
+    assert builds == [sorted(t.name for t in CATALOG), sorted(PINNED | {"get_fruit_price"})]
+    assert embeddings.document_calls == 1
+
+
+def test_router_falls_back_to_every_tool_on_failure():
+    class FailingEmbeddings(TopicEmbeddings):
+        async def aembed_documents(self, texts):
+            raise RuntimeError("embedding model still loading")
+
+    router, _ = _router(FailingEmbeddings())
+    assert asyncio.run(router.graph_for("What is the price of apples?")) is router._full_graph
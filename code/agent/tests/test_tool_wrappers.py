@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tool_wrappers import ToolResultCache  # noqa: E402
+
+KEY = ("get_fruit_price", '{"fruit_name": "apple"}')
+
+
+class _Upstream:
+    """A tool call that blocks until released and counts how often it ran."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> tuple:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "Apple: $1.20", None
+
+
+def test_cancelled_leader_does_not_cancel_coalesced_followers():
+    async def scenario():
+        cache, upstream = ToolResultCache(), _Upstream()
+        leader = asyncio.create_task(cache.get_or_call(KEY, 60, upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_call(KEY, 60, upstream))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        upstream.release.set()
+
+        assert await follower == ("Apple: $1.20", None)
+        assert leader.cancelled() and not upstream.cancelled
+        assert upstream.calls == 1
+        # The result was cached for the next caller
+        assert await cache.get_or_call(KEY, 60, upstream) == ("Apple: $1.20", None)
+        assert upstream.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_call_is_cancelled_once_no_caller_waits():
+    async def scenario():
+        cache, upstream = ToolResultCache(), _Upstream()
+        callers = [asyncio.create_task(cache.get_or_call(KEY, 60, upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not upstream.cancelled
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert upstream.cancelled
+        assert upstream.calls == 1
+        assert not cache._inflight
+
+    asyncio.run(scenario())
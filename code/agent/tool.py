@@ -6,10 +6,15 @@
 # from dotenv import load_dotenv
 
 # OpenTelemetry
-from opentelemetry import trace
+from opentelemetry import trace, metrics
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+from opentelemetry.exporter.prometheus import PrometheusMetricReader
+from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.instrumentation.langchain import LangchainInstrumentor
@@ -28,35 +33,63 @@ from langchain_core.tools import tool
 
 # Mem0
 # from mem0 import Memory
-from sentence_transformers import SentenceTransformer
 
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnableConfig
 
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
 # ============================================================================
 # Setup: Telemetry
 # ============================================================================
-def setup_telemetry(otel_endpoint: str):
+# Histogram buckets sized for what each instrument measures (the SDK default tops out at 10s)
+_MS_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000]
+_HISTOGRAM_VIEWS = [
+    View(instrument_name="llm.duration", aggregation=ExplicitBucketHistogramAggregation(_MS_BUCKETS)),
+    View(instrument_name="llm.time_to_first_token", aggregation=ExplicitBucketHistogramAggregation(_MS_BUCKETS)),
+    View(instrument_name="tool.duration", aggregation=ExplicitBucketHistogramAggregation(_MS_BUCKETS)),
+    View(instrument_name="chat.scheduler.wait", aggregation=ExplicitBucketHistogramAggregation(_MS_BUCKETS)),
+    View(instrument_name="memory.executor.wait", aggregation=ExplicitBucketHistogramAggregation(_MS_BUCKETS)),
+    View(instrument_name="memory.executor.duration", aggregation=ExplicitBucketHistogramAggregation(_MS_BUCKETS)),
+    View(
+        instrument_name="llm.tokens",
+        aggregation=ExplicitBucketHistogramAggregation([16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768]),
+    ),
+    View(
+        instrument_name="embedding.batch.size",
+        aggregation=ExplicitBucketHistogramAggregation([1, 2, 4, 8, 16, 32, 64, 128, 256]),
+    ),
+    View(
+        instrument_name="event_loop.lag",
+        aggregation=ExplicitBucketHistogramAggregation([1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]),
+    ),
+]
+
+
+def setup_telemetry(otel_endpoint: str, otel_metrics_endpoint: str | None = None, prometheus: bool = True):
     resource = Resource(attributes={"service.name": "agentic-app"})
     trace.set_tracer_provider(TracerProvider(resource=resource))
     trace.get_tracer_provider().add_span_processor(
         BatchSpanProcessor(OTLPSpanExporter(endpoint=otel_endpoint))
     )
+    # Metrics are pushed to a collector endpoint that accepts them, and/or served for
+    # Prometheus to scrape (prometheus_client's default registry, see /metrics)
+    readers = []
+    if otel_metrics_endpoint:
+        readers.append(PeriodicExportingMetricReader(OTLPMetricExporter(endpoint=otel_metrics_endpoint)))
+    if prometheus:
+        readers.append(PrometheusMetricReader())
+    if readers:
+        metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=readers, views=_HISTOGRAM_VIEWS))
     LangchainInstrumentor().instrument()
     HTTPXClientInstrumentor().instrument()
     
 
 
 
-# ============================================================================
-# Setup: Memory (Mem0 + Milvus)
-# ============================================================================
-def get_embedding_dim(embedding_model:str):
-    """Get embedding dimension from the model."""
-    model = SentenceTransformer(embedding_model)
-    return model.get_sentence_embedding_dimension()
-
-    
 # ============================================================================
 # Tools
 # ============================================================================
@@ -68,22 +101,63 @@ def get_embedding_dim(embedding_model:str):
 #     memory = mem_instance
 
 
+def _configurable(config: RunnableConfig) -> dict:
+    return (config or {}).get("configurable", {})
+
+
+def _user_id(config: RunnableConfig, user_id: str) -> str:
+    """The request's user when the run config names one, else the tool argument."""
+    return _configurable(config).get("user_id") or user_id
+
+
+def _memory_from_config(config: RunnableConfig):
+    return _configurable(config).get("memory_client")
+
+
+async def _run_memory_op(config: RunnableConfig, op: str, fn, *args, **kwargs):
+    """Run a blocking Mem0 call off the event loop.
+
+    Uses the bounded `memory_executor` from the run config when present, otherwise
+    falls back to the default thread pool.
+    """
+    executor = _configurable(config).get("memory_executor")
+    if executor is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await executor.run(op, fn, *args, **kwargs)
+
+
 @tool
-def save_memory(content: str, user_id: str = "default", config: RunnableConfig = None) -> str:
+async def save_memory(content: str, user_id: str = "default", config: RunnableConfig = None) -> str:
     """Save valuable information or facts to long-term memory for future retrieval."""
-    import logging
-    logger = logging.getLogger(__name__)
-
     # Extract memory from config
-    memory = config.get("configurable", {}).get("memory_client")
+    memory = _memory_from_config(config)
+    user_id = _user_id(config, user_id)
     if not memory:
         return "Error: Memory client not configured."
         
     logger.info(f"save_memory called with content='{content}', user_id='{user_id}'")
+
+    # Write-behind mode: persist locally, Mem0 ingestion happens in the background
+    write_queue = _configurable(config).get("memory_write_queue")
+    if write_queue is not None:
+        try:
+            write_queue.enqueue(user_id, content)
+            return f"Saved to memory: {content}"
+        except Exception as e:
+            logger.error(f"save_memory enqueue failed: {e}")
+            return f"Failed to save memory: {e}"
+
     try:
-        result = memory.add(content, user_id=user_id)
+        result = await _run_memory_op(config, "add", memory.add, content, user_id=user_id)
         logger.info(f"save_memory result: {result}")
+        # Make the write visible to this user's next recall before Milvus indexes it
+        recent_writes = _configurable(config).get("memory_recent_writes")
+        if recent_writes is not None:
+            recent_writes.record(user_id, result)
         return f"Saved to memory: {result}"
+    except asyncio.TimeoutError:
+        logger.error("save_memory timed out")
+        return "Failed to save memory: timed out"
     except Exception as e:
         logger.error(f"save_memory failed: {e}")
         return f"Failed to save memory: {e}"
@@ -95,25 +169,50 @@ def save_memory(content: str, user_id: str = "default", config: RunnableConfig =
 
 
 @tool
-def recall_memory(query: str, user_id: str = "default", config: RunnableConfig = None) -> str:
+async def recall_memory(query: str, user_id: str = "default", config: RunnableConfig = None) -> str:
     """Search long-term memory for relevant information based on a query."""
-    import logging
-    logger = logging.getLogger(__name__)
-    memory = config.get("configurable", {}).get("memory_client")
+    memory = _memory_from_config(config)
+    user_id = _user_id(config, user_id)
     if not memory:
         return "Error: Memory client not configured."
-    results = memory.search(query, user_id=user_id, limit=10)
-    logger.info(f"recall_memory query='{query}' results={results}")
+    # Facts still waiting in the write-behind queue are visible to their owner immediately
+    write_queue = _configurable(config).get("memory_write_queue")
+    pending = write_queue.pending(user_id) if write_queue is not None else []
+
+    try:
+        # Active users are answered in process; None means ask Mem0
+        hot_index = _configurable(config).get("memory_hot_index")
+        results = await hot_index.search(query, user_id, limit=10) if hot_index is not None else None
+        if results is None:
+            results = await _run_memory_op(config, "search", memory.search, query, user_id=user_id, limit=10)
+    except asyncio.TimeoutError:
+        logger.error("recall_memory timed out")
+        if not pending:
+            return "Failed to search memory: timed out"
+        results = []
+    except Exception as e:
+        logger.error(f"recall_memory failed: {e}")
+        if not pending:
+            return f"Failed to search memory: {e}"
+        results = []
+    logger.info(f"recall_memory query='{query}' results={results} pending={len(pending)}")
 
     # mem0 returns {'results': [...]} — extract the list
     if isinstance(results, dict) and 'results' in results:
         results = results['results']
 
-    if not results:
+    # Writes Mem0 accepted moments ago may not be searchable yet
+    recent_writes = _configurable(config).get("memory_recent_writes")
+    if recent_writes is not None:
+        results = recent_writes.merge(user_id, results or [])
+
+    if not results and not pending:
         return "No relevant memories found."
-    formatted = []
+    formatted = [f"- {p['memory']} (pending)" for p in pending]
     for r in results:
-        if isinstance(r, dict):
+        if isinstance(r, dict) and r.get("recent"):
+            formatted.append(f"- {r['memory']} (just saved)")
+        elif isinstance(r, dict):
             formatted.append(f"- {r.get('memory', r)} (score: {r.get('score', 0):.2f})")
         else:
             formatted.append(f"- {r}")
@@ -125,12 +224,20 @@ def recall_memory(query: str, user_id: str = "default", config: RunnableConfig =
 
 
 @tool
-def get_all_memories(user_id: str = "default", config: RunnableConfig = None) -> str:
+async def get_all_memories(user_id: str = "default", config: RunnableConfig = None) -> str:
     """Get all stored memories for a user."""
-    memory = config.get("configurable", {}).get("memory_client")
+    memory = _memory_from_config(config)
+    user_id = _user_id(config, user_id)
     if not memory:
         return "Error: Memory client not configured."
-    memories = memory.get_all(user_id=user_id)
+    try:
+        memories = await _run_memory_op(config, "get_all", memory.get_all, user_id=user_id)
+    except asyncio.TimeoutError:
+        logger.error("get_all_memories timed out")
+        return "Failed to load memories: timed out"
+    except Exception as e:
+        logger.error(f"get_all_memories failed: {e}")
+        return f"Failed to load memories: {e}"
     # mem0 may return {'results': [...]} — extract the list
     if isinstance(memories, dict) and 'results' in memories:
         memories = memories['results']
@@ -142,4 +249,4 @@ def get_all_memories(user_id: str = "default", config: RunnableConfig = None) ->
             formatted.append(m.get("memory", str(m)))
         else:
             formatted.append(str(m))
-    return "\n---\n".join(formatted)    
\ No newline at end of file
+    return "\n---\n".join(formatted)    
@@ -0,0 +1,171 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+
+def _schema_tokens(tool: BaseTool) -> int:
+    """Rough prompt tokens the tool's schema adds to every model call (4 characters per token)."""
+    try:
+        return len(json.dumps(convert_to_openai_tool(tool))) // 4
+    except Exception:
+        return len(tool.description or "") // 4
+
+
+# ============================================================================
+# Per-request tool selection
+# ============================================================================
+class ToolRouter:
+    """Binds each request to the tools relevant to its message, not the whole catalog.
+
+    Every bound tool's JSON schema is sent with every model call, so prompt
+    size and model latency grow with the tool catalog. For each request the
+    router picks:
+
+    - the `pinned` tools, always
+    - the `top_k` other tools whose description embedding is closest to the
+      message, if their cosine similarity is at least `min_similarity`
+    - the tools matched on the thread's previous turn, so a follow-up like
+      "and bananas?" keeps the tool the question before it needed
+
+    Description vectors are computed once per catalog. Compiled graphs are
+    cached per tool subset (LRU, `max_graphs`), so a request only pays for an
+    embedding lookup and a dot product. `build` is expected to give each
+    subset a system prompt that describes only its tools. Any routing failure
+    falls back to the graph with every tool.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        pinned: set[str],
+        top_k: int = 4,
+        min_similarity: float = 0.2,
+        max_graphs: int = 32,
+        max_threads: int = 10000,
+    ):
+        self.embeddings = embeddings
+        self.pinned = pinned
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.max_graphs = max_graphs
+        self.max_threads = max_threads
+        self._tools: list[BaseTool] = []
+        self._build = None
+        self._full_graph = None
+        self._routable: list[BaseTool] = []
+        self._matrix: np.ndarray | None = None
+        self._schema_tokens: dict[str, int] = {}
+        self._graphs: OrderedDict[frozenset[str], object] = OrderedDict()
+        # thread_id -> tools matched on the thread's previous turn
+        self._previous: OrderedDict[str, frozenset[str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._graph_hits = 0
+        self._graph_builds = 0
+
+        self._selected_hist = meter.create_histogram(
+            "tool_router.selected", description="Tools bound per request after routing"
+        )
+        self._schema_hist = meter.create_histogram(
+            "tool_router.schema_tokens", description="Approximate prompt tokens of the tool schemas bound per request"
+        )
+        self._fallbacks = meter.create_counter(
+            "tool_router.fallbacks", description="Requests given every tool because routing failed"
+        )
+
+    def set_tools(self, tools: list[BaseTool], build, full_graph) -> None:
+        """Use a new tool catalog. `build(tools)` compiles a graph; `full_graph` has every tool."""
+        with self._lock:
+            self._tools = list(tools)
+            self._build = build
+            self._full_graph = full_graph
+            self._routable = [t for t in tools if t.name not in self.pinned]
+            # Recomputed lazily: the embedding model may still be loading
+            self._matrix = None
+            self._schema_tokens = {t.name: _schema_tokens(t) for t in tools}
+            self._graphs.clear()
+            self._graphs[frozenset(t.name for t in tools)] = full_graph
+
+    async def _description_matrix(self, routable: list[BaseTool]) -> np.ndarray:
+        if self._matrix is None or len(self._matrix) != len(routable):
+            vectors = await self.embeddings.aembed_documents([f"{t.name}: {t.description}" for t in routable])
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.where(norms == 0, 1, norms)
+        return self._matrix
+
+    async def select(self, message: str, thread_id: str | None = None) -> frozenset[str]:
+        """Names of the tools to bind for `message`."""
+        tools, routable = self._tools, self._routable
+        known = {t.name for t in tools}
+        pinned = frozenset(n for n in self.pinned if n in known)
+        if not routable:
+            return pinned
+        matrix = await self._description_matrix(routable)
+        query = np.asarray(await self.embeddings.aembed_query(message), dtype=np.float32)
+        similarities = matrix @ (query / (np.linalg.norm(query) or 1))
+        top = np.argsort(-similarities)[: self.top_k]
+        matched = frozenset(routable[i].name for i in top if similarities[i] >= self.min_similarity)
+
+        previous = frozenset()
+        if thread_id is not None:
+            with self._lock:
+                previous = self._previous.pop(thread_id, frozenset())
+                self._previous[thread_id] = matched
+                while len(self._previous) > self.max_threads:
+                    self._previous.popitem(last=False)
+        return pinned | matched | (previous & known)
+
+    def graph(self, names: frozenset[str]):
+        """The compiled graph for the tool subset `names`, built on first use."""
+        with self._lock:
+            graph = self._graphs.get(names)
+            if graph is not None:
+                self._graphs.move_to_end(names)
+                self._graph_hits += 1
+                return graph
+            tools, build = self._tools, self._build
+        # Keep the catalog's order so identical subsets produce identical prompts
+        graph = build([t for t in tools if t.name in names])
+        with self._lock:
+            self._graph_builds += 1
+            self._graphs[names] = graph
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        return graph
+
+    async def graph_for(self, message: str, thread_id: str | None = None):
+        """Graph bound to the tools relevant to `message`; the full graph if routing fails."""
+        try:
+            names = await self.select(message, thread_id)
+            graph = self.graph(names)
+        except Exception as e:
+            logger.warning(f"Tool routing failed, binding every tool: {e!r}")
+            self._fallbacks.add(1)
+            names = frozenset(t.name for t in self._tools)
+            graph = self._full_graph
+        self._selected_hist.record(len(names))
+        self._schema_hist.record(self.schema_tokens(names))
+        logger.debug(f"Routed tools: {sorted(names)}")
+        return graph
+
+    def schema_tokens(self, names) -> int:
+        """Approximate prompt tokens the schemas of the tools `names` add to each model call."""
+        return sum(self._schema_tokens.get(n, 0) for n in names)
+
+    def stats(self) -> dict:
+        return {
+            "tools": len(self._tools),
+            "pinned": sorted(self.pinned),
+            "graphs": len(self._graphs),
+            "graph_hits": self._graph_hits,
+            "graph_builds": self._graph_builds,
+        }
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+_tool_duration = meter.create_histogram("tool.duration", unit="ms", description="Tool call latency, by tool and outcome")
+_tool_errors = meter.create_counter("tool.errors", description="Tool calls that raised or returned an error result")
+
+
+# ============================================================================
+# Tool wrappers
+# ============================================================================
+class DelegatingTool(BaseTool):
+    """Base class for tools that wrap another tool.
+
+    Keeps the wrapped tool's name, description and argument schema, so the model
+    sees exactly the same tool. Subclasses override `_call` to add behaviour
+    around `_call_inner`. Results are passed through as (content, artifact), so
+    MCP tools keep their artifacts.
+    """
+
+    inner: BaseTool
+    response_format: str = "content_and_artifact"
+
+    def __init__(self, inner: BaseTool, **kwargs):
+        super().__init__(
+            name=inner.name,
+            description=inner.description,
+            args_schema=inner.args_schema,
+            metadata=inner.metadata,
+            tags=inner.tags,
+            inner=inner,
+            **kwargs,
+        )
+
+    def _run(self, *args, **kwargs):
+        raise NotImplementedError(f"{type(self).__name__} only supports async invocation")
+
+    async def _arun(self, config: RunnableConfig, **kwargs) -> tuple:
+        return await self._call(kwargs, config)
+
+    async def _call(self, args: dict, config: RunnableConfig) -> tuple:
+        return await self._call_inner(args, config)
+
+    async def _call_inner(self, args: dict, config: RunnableConfig) -> tuple:
+        # The wrapper's own run is what callbacks/tracing see; don't report the call twice
+        message = await self.inner.ainvoke(
+            {"type": "tool_call", "name": self.inner.name, "args": args, "id": f"call_{uuid.uuid4().hex}"},
+            {**config, "callbacks": []},
+        )
+        return message.content, getattr(message, "artifact", None)
+
+
+class TimeoutTool(DelegatingTool):
+    """Fails a tool call that runs longer than `timeout` seconds.
+
+    The model gets an error result instead of the whole ReAct step hanging on
+    one slow tool.
+    """
+
+    timeout: float
+
+    async def _call(self, args: dict, config: RunnableConfig) -> tuple:
+        try:
+            return await asyncio.wait_for(self._call_inner(args, config), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool '{self.name}' timed out after {self.timeout}s")
+            return f"Error: tool '{self.name}' timed out after {self.timeout:g}s", None
+
+
+class MeteredTool(DelegatingTool):
+    """Records each call's latency and outcome (`tool.duration`, `tool.errors`)."""
+
+    async def _call(self, args: dict, config: RunnableConfig) -> tuple:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self._call_inner(args, config)
+            outcome = "error" if _is_error(result[0]) else "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            _tool_duration.record((time.perf_counter() - started) * 1000, {"tool": self.name, "outcome": outcome})
+            if outcome == "error":
+                _tool_errors.add(1, {"tool": self.name})
+
+
+@dataclass
+class CachePolicy:
+    ttl: float
+    ignore_case: bool = False
+
+
+def _canonical(value, ignore_case: bool):
+    if isinstance(value, str):
+        value = re.sub(r"\s+", " ", unicodedata.normalize("NFC", value)).strip()
+        return value.casefold() if ignore_case else value
+    if isinstance(value, dict):
+        return {k: _canonical(v, ignore_case) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(v, ignore_case) for v in value]
+    return value
+
+
+def _is_error(content) -> bool:
+    """Tools report failures as an "Error ..." / "Failed ..." result instead of raising."""
+    if isinstance(content, list):
+        content = next((b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text"), "")
+    return isinstance(content, str) and content.startswith(("Error", "Failed"))
+
+
+def _size(content, artifact) -> int:
+    return len(json.dumps([content, artifact], default=str))
+
+
+class _InFlight:
+    """An upstream tool call and the number of callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class ToolResultCache:
+    """Results of cacheable tool calls, shared by all `CachedTool`s.
+
+    Keyed by tool name and canonical (sorted, whitespace-normalised) arguments.
+    Bounded by the total size of cached results; least recently used entries
+    are evicted first. Concurrent identical calls share one in-flight call,
+    which runs as its own task: a caller that is cancelled (tool timeout,
+    client disconnect) stops waiting without cancelling it for the others.
+    The call is cancelled only once no caller is waiting for it.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[float, int, tuple]] = OrderedDict()
+        self._inflight: dict[tuple, _InFlight] = {}
+        self._bytes = 0
+
+        self._lookups = meter.create_counter(
+            "tool.cache.lookups", description="Cacheable tool calls, by tool and outcome (hit, coalesced, miss)"
+        )
+        meter.create_observable_gauge(
+            "tool.cache.bytes",
+            callbacks=[lambda options: [Observation(self._bytes)]],
+            description="Approximate size of cached tool results",
+        )
+
+    def key(self, tool: str, args: dict, policy: CachePolicy) -> tuple:
+        return tool, json.dumps(_canonical(args, policy.ignore_case), sort_keys=True, default=str)
+
+    def _get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, result = entry
+        if expires_at < time.monotonic():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _evict(self, key: tuple):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _put(self, key: tuple, result: tuple, ttl: float):
+        size = _size(*result)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (time.monotonic() + ttl, size, result)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    async def get_or_call(self, key: tuple, ttl: float, call) -> tuple:
+        attributes = {"tool": key[0]}
+        result = self._get(key)
+        if result is not None:
+            self._lookups.add(1, {**attributes, "outcome": "hit"})
+            return result
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self._lookups.add(1, {**attributes, "outcome": "coalesced"})
+        else:
+            self._lookups.add(1, {**attributes, "outcome": "miss"})
+            flight = _InFlight(asyncio.create_task(self._fill(key, ttl, call)))
+            self._inflight[key] = flight
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            # Every caller gave up before the call finished: nobody wants its result
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def _fill(self, key: tuple, ttl: float, call) -> tuple:
+        try:
+            result = await call()
+            if not _is_error(result[0]):
+                self._put(key, result, ttl)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+
+class CachedTool(DelegatingTool):
+    """Serves repeated calls with the same arguments from a `ToolResultCache`."""
+
+    cache: ToolResultCache
+    policy: CachePolicy
+
+    async def _call(self, args: dict, config: RunnableConfig) -> tuple:
+        return await self.cache.get_or_call(
+            self.cache.key(self.name, args, self.policy),
+            self.policy.ttl,
+            lambda: self._call_inner(args, config),
+        )
+
+
+def with_caching(tools: list[BaseTool], cache: ToolResultCache, policies: dict[str, CachePolicy]) -> list[BaseTool]:
+    """Wrap tools that have a policy with a positive TTL in a `CachedTool`."""
+    wrapped = []
+    for t in tools:
+        policy = policies.get(t.name)
+        wrapped.append(CachedTool(t, cache=cache, policy=policy) if policy and policy.ttl > 0 else t)
+    return wrapped
+
+
+def parse_cache_policies(raw: dict) -> dict[str, CachePolicy]:
+    """Build policies from `{"tool": {"ttl": 300, "ignore_case": true}}` (or `{"tool": 300}`)."""
+    return {
+        name: CachePolicy(**spec) if isinstance(spec, dict) else CachePolicy(ttl=float(spec))
+        for name, spec in raw.items()
+    }
+
+
+def with_timeouts(tools: list[BaseTool], default_timeout: float, overrides: dict[str, float]) -> list[BaseTool]:
+    """Wrap each tool in a `TimeoutTool` (a timeout of 0 leaves the tool unwrapped)."""
+    wrapped = []
+    for t in tools:
+        timeout = overrides.get(t.name, default_timeout)
+        wrapped.append(TimeoutTool(t, timeout=timeout) if timeout else t)
+    return wrapped
+
+
+def with_metrics(tools: list[BaseTool]) -> list[BaseTool]:
+    """Wrap each tool in a `MeteredTool`; apply last so timeouts and cache hits are measured too."""
+    return [MeteredTool(t) for t in tools]
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+
+from mem0.vector_stores.milvus import MilvusDB, OutputData
+from pymilvus import DataType, MilvusClient
+
+logger = logging.getLogger(__name__)
+
+PARTITIONING_MODES = ("none", "partition_key", "partition")
+# Top-level copy of the payload's user_id, used as the partition key
+USER_ID_FIELD = "user_id"
+
+
+@dataclass
+class IndexConfig:
+    """ANN index for the memory vectors, with its build and search parameters.
+
+    `index_type` is one of AUTOINDEX (Milvus picks), HNSW, IVF_FLAT or FLAT
+    (exact). HNSW: `hnsw_m` links per node and `hnsw_ef_construction` at build
+    time, `hnsw_ef` candidates per search. IVF_FLAT: `ivf_nlist` clusters, of
+    which `ivf_nprobe` are scanned per search.
+    """
+
+    index_type: str = "AUTOINDEX"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 200
+    hnsw_ef: int = 64
+    ivf_nlist: int = 128
+    ivf_nprobe: int = 16
+
+    def build_params(self) -> dict:
+        if self.index_type == "HNSW":
+            return {"M": self.hnsw_m, "efConstruction": self.hnsw_ef_construction}
+        if self.index_type == "IVF_FLAT":
+            return {"nlist": self.ivf_nlist}
+        return {}
+
+    def search_params(self, index_type: str | None = None) -> dict:
+        index_type = index_type or self.index_type
+        if index_type == "HNSW":
+            return {"ef": self.hnsw_ef}
+        if index_type == "IVF_FLAT":
+            return {"nprobe": self.ivf_nprobe}
+        return {}
+
+
+def partition_name(user_id: str) -> str:
+    """Milvus partition for a user in `partition` mode (names allow only letters, digits and _)."""
+    return "u_" + hashlib.sha1(user_id.encode()).hexdigest()[:24]
+
+
+# ============================================================================
+# Mem0 Milvus store with a per-user layout and a tunable index
+# ============================================================================
+class PartitionedMilvusDB(MilvusDB):
+    """Mem0's Milvus vector store, laid out per user.
+
+    Every Mem0 search and listing is filtered by `user_id`. With one flat
+    collection, that filter runs over every user's vectors. `partitioning`
+    changes how a new collection is created:
+
+    - `partition_key`: `user_id` is also stored as a top-level partition key
+      field. Milvus hashes users into `num_partitions` partitions, and a
+      `user_id == ...` filter only searches the user's partition
+    - `partition`: one named partition per user, created on first write and
+      searched by name. This isolates users fully, but Milvus caps partitions
+      per collection (1024 by default), so it only suits a few users
+    - `none`: Mem0's original layout
+
+    An existing collection keeps the layout and index it was created with. A
+    mismatch with the configured values is logged, and the store works with
+    what the collection actually has.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        collection_name: str,
+        embedding_model_dims: int,
+        metric_type: str = "L2",
+        db_name: str = "",
+        partitioning: str = "partition_key",
+        num_partitions: int = 64,
+        index: IndexConfig | None = None,
+    ):
+        if partitioning not in PARTITIONING_MODES:
+            raise ValueError(f"Unknown partitioning '{partitioning}' (expected one of {', '.join(PARTITIONING_MODES)})")
+        self.collection_name = collection_name
+        self.embedding_model_dims = embedding_model_dims
+        self.metric_type = metric_type
+        self.partitioning = partitioning
+        self.num_partitions = num_partitions
+        self.index = index or IndexConfig()
+        self._index_type = self.index.index_type
+        self._partitions: set[str] = set()
+        self._partitions_lock = threading.Lock()
+        # Milvus Lite (a local *.db path) fails on an empty database name
+        self.client = MilvusClient(uri=url, token=token, db_name=db_name or "default")
+        self.create_col(collection_name, embedding_model_dims, metric_type)
+
+    def create_col(self, collection_name: str, vector_size: int, metric_type: str = "L2") -> None:
+        if self.client.has_collection(collection_name):
+            self._adopt_existing(collection_name)
+            return
+
+        schema = MilvusClient.create_schema(enable_dynamic_field=True)
+        schema.add_field("id", DataType.VARCHAR, is_primary=True, max_length=512)
+        schema.add_field("vectors", DataType.FLOAT_VECTOR, dim=vector_size)
+        schema.add_field("metadata", DataType.JSON)
+        extra = {}
+        if self.partitioning == "partition_key":
+            schema.add_field(USER_ID_FIELD, DataType.VARCHAR, max_length=512, is_partition_key=True)
+            extra["num_partitions"] = self.num_partitions
+
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(
+            field_name="vectors",
+            index_name="vector_index",
+            index_type=self.index.index_type,
+            metric_type=str(metric_type),
+            params=self.index.build_params(),
+        )
+        self.client.create_collection(collection_name=collection_name, schema=schema, index_params=index_params, **extra)
+        logger.info(
+            f"Created Milvus collection '{collection_name}' "
+            f"(partitioning={self.partitioning}, index={self.index.index_type} {self.index.build_params()})"
+        )
+
+    def _adopt_existing(self, collection_name: str) -> None:
+        fields = self.client.describe_collection(collection_name)["fields"]
+        has_partition_key = any(f.get("is_partition_key") for f in fields)
+        if has_partition_key:
+            if self.partitioning != "partition_key":
+                logger.warning(f"Collection '{collection_name}' has a user_id partition key; using partition_key layout")
+            self.partitioning = "partition_key"
+        elif self.partitioning == "partition_key":
+            logger.warning(
+                f"Collection '{collection_name}' was created without a partition key; "
+                "searches scan all users (recreate the collection to partition it)"
+            )
+            self.partitioning = "none"
+        elif self.partitioning == "partition":
+            self._partitions.update(self.client.list_partitions(collection_name))
+
+        for name in self.client.list_indexes(collection_name, field_name="vectors"):
+            self._index_type = self.client.describe_index(collection_name, name).get("index_type", self._index_type)
+        if self._index_type != self.index.index_type:
+            logger.warning(
+                f"Collection '{collection_name}' is indexed with {self._index_type}, not {self.index.index_type}; "
+                "drop its index or the collection to change it"
+            )
+
+    def _ensure_partition(self, user_id: str) -> str:
+        name = partition_name(user_id)
+        if name not in self._partitions:
+            with self._partitions_lock:
+                if name not in self._partitions:
+                    if not self.client.has_partition(self.collection_name, name):
+                        self.client.create_partition(self.collection_name, name)
+                    self._partitions.add(name)
+        return name
+
+    def _rows(self, ids, vectors, payloads) -> list[dict]:
+        rows = []
+        for idx, vector, payload in zip(ids, vectors, payloads):
+            row = {"id": idx, "vectors": vector, "metadata": payload}
+            if self.partitioning == "partition_key":
+                row[USER_ID_FIELD] = (payload or {}).get("user_id") or ""
+            rows.append(row)
+        return rows
+
+    def _write(self, method, rows: list[dict]) -> None:
+        if self.partitioning != "partition":
+            method(collection_name=self.collection_name, data=rows)
+            return
+        by_partition: dict[str, list[dict]] = {}
+        for row in rows:
+            user_id = (row["metadata"] or {}).get("user_id") or ""
+            by_partition.setdefault(self._ensure_partition(user_id), []).append(row)
+        for name, partition_rows in by_partition.items():
+            method(collection_name=self.collection_name, data=partition_rows, partition_name=name)
+
+    def insert(self, ids, vectors, payloads, **kwargs):
+        self._write(self.client.insert, self._rows(ids, vectors, payloads))
+
+    def update(self, vector_id=None, vector=None, payload=None):
+        self._write(self.client.upsert, self._rows([vector_id], [vector], [payload]))
+
+    def _create_filter(self, filters: dict) -> str:
+        operands = []
+        for key, value in filters.items():
+            # The top-level field is what lets Milvus prune partitions
+            field = key if key == USER_ID_FIELD and self.partitioning == "partition_key" else f'metadata["{key}"]'
+            operands.append(f"({field} == {json.dumps(value)})")
+        return " and ".join(operands)
+
+    def _has_partition(self, name: str) -> bool:
+        if name not in self._partitions and self.client.has_partition(self.collection_name, name):
+            # Created by another process since we last looked
+            self._partitions.add(name)
+        return name in self._partitions
+
+    def _partition_names(self, filters: dict | None) -> list[str] | None:
+        """Partitions to search for `filters`; `[]` means the user has no memories yet."""
+        if self.partitioning != "partition" or not filters or not filters.get("user_id"):
+            return None
+        name = partition_name(filters["user_id"])
+        return [name] if self._has_partition(name) else []
+
+    def search(self, query: str, vectors: list, limit: int = 5, filters: dict = None) -> list:
+        partitions = self._partition_names(filters)
+        if partitions == []:
+            return []
+        hits = self.client.search(
+            collection_name=self.collection_name,
+            data=[vectors],
+            limit=limit,
+            filter=self._create_filter(filters) if filters else "",
+            output_fields=["*"],
+            search_params={"params": self.index.search_params(self._index_type)},
+            partition_names=partitions,
+        )
+        return self._parse_output(data=hits[0])
+
+    def list(self, filters: dict = None, limit: int = 100) -> list:
+        partitions = self._partition_names(filters)
+        if partitions == []:
+            return [[]]
+        rows = self.client.query(
+            collection_name=self.collection_name,
+            filter=self._create_filter(filters) if filters else "",
+            limit=limit,
+            partition_names=partitions,
+        )
+        return [[OutputData(id=row.get("id"), score=None, payload=row.get("metadata")) for row in rows]]
+
+    def stats(self) -> dict:
+        return {
+            "collection": self.collection_name,
+            "partitioning": self.partitioning,
+            "index_type": self._index_type,
+            "search_params": self.index.search_params(self._index_type),
+        }
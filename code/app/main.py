@@ -1,4 +1,5 @@
 import base64
+import json
 import os
 import requests
 import streamlit as st
@@ -15,6 +16,8 @@ import logging
 # Config
 AGENT_HOST = os.getenv("AGENT_HOST", "http://app.internal:8000")
 CHAT_ENDPOINT = os.getenv("CHAT_ENDPOINT", f"{AGENT_HOST}/chat")
+STREAM_ENDPOINT = os.getenv("STREAM_ENDPOINT", f"{AGENT_HOST}/chat/stream")
+USE_STREAMING = os.getenv("USE_STREAMING", "true").lower() == "true"
 OTEL_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://jaeger.internal:4317")
 
 # Enable debug logging for OpenTelemetry
@@ -47,6 +50,52 @@ def call_agent(message: str):
 		return {"error": str(e)}
 
 
+def stream_agent(message: str):
+	"""Call the streaming endpoint and yield (event, data) pairs as they arrive."""
+	thread_id = os.getenv("THREAD_ID", "default")
+	payload = {"message": message, "thread_id": thread_id}
+	try:
+		with requests.post(STREAM_ENDPOINT, json=payload, stream=True, timeout=(5, 120)) as resp:
+			resp.raise_for_status()
+			event = "message"
+			for line in resp.iter_lines(decode_unicode=True):
+				if line.startswith("event:"):
+					event = line[len("event:"):].strip()
+				elif line.startswith("data:"):
+					yield event, json.loads(line[len("data:"):].strip())
+					event = "message"
+	except Exception as e:
+		yield "error", {"detail": str(e)}
+
+
+def render_streamed_response(prompt: str):
+	"""Render tokens and tool calls progressively. Returns (response, tool_usage)."""
+	tool_status = st.empty()
+	answer = st.empty()
+	text = ""
+	for event, data in stream_agent(prompt):
+		if event == "token":
+			text += data["content"]
+			answer.markdown(text + "▌")
+		elif event == "tool_start":
+			# Text streamed before a tool call is the model thinking aloud, not the answer
+			text = ""
+			answer.empty()
+			tool_status.caption(f"🔧 Calling `{data['name']}`...")
+		elif event == "tool_end":
+			tool_status.caption(f"✅ `{data['name']}` finished")
+		elif event == "done":
+			tool_status.empty()
+			answer.markdown(data.get("response", "No response received."))
+			return data.get("response", "No response received."), data.get("tool_usage", [])
+		elif event == "error":
+			tool_status.empty()
+			answer.empty()
+			st.error(data["detail"])
+			return f"Error: {data['detail']}", []
+	return text or "No response received.", []
+
+
 def main():
     
 	st.set_page_config(page_title="Agent Chat", layout="centered")
@@ -86,21 +135,27 @@ def main():
 
 		# Display assistant response in chat message container
 		with st.chat_message("assistant"):
-			with st.spinner("Thinking..."):
-				result = call_agent(prompt)
-				
-				if "error" in result:
-					st.error(result["error"])
-					response_content = f"Error: {result['error']}"
-					tool_usage = []
-				else:
-					response_content = result.get("response", "No response received.")
-					tool_usage = result.get("tool_usage", [])
+			if USE_STREAMING:
+				response_content, tool_usage = render_streamed_response(prompt)
+				if tool_usage:
+					with st.expander("Tool Usage"):
+						st.json(tool_usage)
+			else:
+				with st.spinner("Thinking..."):
+					result = call_agent(prompt)
 					
-					st.markdown(response_content)
-					if tool_usage:
-						with st.expander("Tool Usage"):
-							st.json(tool_usage)
+					if "error" in result:
+						st.error(result["error"])
+						response_content = f"Error: {result['error']}"
+						tool_usage = []
+					else:
+						response_content = result.get("response", "No response received.")
+						tool_usage = result.get("tool_usage", [])
+						
+						st.markdown(response_content)
+						if tool_usage:
+							with st.expander("Tool Usage"):
+								st.json(tool_usage)
 			
 			# Add assistant response to chat history
 			st.session_state.messages.append({
@@ -0,0 +1,270 @@
+"""
+Agent load test
+
+Drives POST /chat with N concurrent virtual users. Each user runs multi-turn
+conversation scripts (SCRIPTS) on its own thread ids, back to back, until the
+duration is up. Reports throughput, error rate and p50/p95/p99 latency overall,
+per script and per turn, and, when the stub servers are used, a per-stage
+breakdown of where request time went (model, MCP tools, agent overhead).
+
+Results are written as JSON. With --baseline, p50/p95/p99 and throughput are
+compared against an earlier run and the process exits non-zero when any of them
+regressed by more than --max-regression.
+
+Run (with docker-compose.bench.yaml):
+  python load_test.py --users 20 --duration 120 --output results.json
+  python load_test.py --users 20 --duration 120 --baseline results.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+import httpx
+
+NAMES = ("Alice", "Bob", "Chen", "Dana", "Emeka", "Farah")
+FRUITS = ("apple", "banana", "mango", "pear", "plum")
+TOPICS = ("electric cars", "the Olympics", "quantum computing", "coffee prices")
+
+# Multi-turn conversations; placeholders are filled per run
+SCRIPTS = {
+    "introduce_and_recall": [
+        "Hi, my name is {name}.",
+        "My favourite fruit is {fruit}.",
+        "What is my name?",
+    ],
+    "shopping": [
+        "What is the price of {fruit}s?",
+        "Compare the price of apples and bananas.",
+        "What is the price of my favourite fruit?",
+    ],
+    "research": [
+        "Search the web for the latest news on {topic}.",
+        "Thanks, that's helpful!",
+    ],
+    "small_talk": [
+        "Hello!",
+        "How are you today?",
+    ],
+}
+
+
+@dataclass
+class Sample:
+    script: str
+    turn: int
+    latency_ms: float
+    ok: bool
+    error: str = ""
+    rejected: bool = False
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def summarize(samples: list[Sample], elapsed_s: float | None = None) -> dict:
+    latencies = [s.latency_ms for s in samples if s.ok]
+    summary = {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s.ok),
+        # Subset of errors: turned away by the agent's admission control (429)
+        "rejected": sum(1 for s in samples if s.rejected),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "max_ms": max(latencies, default=0.0),
+    }
+    if elapsed_s:
+        summary["throughput_rps"] = len(latencies) / elapsed_s
+    return summary
+
+
+# ============================================================================
+# Virtual users
+# ============================================================================
+async def run_script(client: httpx.AsyncClient, url: str, user: int, name: str, turns: list[str]) -> list[Sample]:
+    params = {"name": random.choice(NAMES), "fruit": random.choice(FRUITS), "topic": random.choice(TOPICS)}
+    thread_id = f"bench-{user}-{name}-{uuid.uuid4().hex[:8]}"
+    samples = []
+    for turn, template in enumerate(turns):
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, json={"message": template.format(**params), "thread_id": thread_id})
+            latency_ms = (time.perf_counter() - started) * 1000
+            if response.status_code == 429:
+                samples.append(Sample(name, turn, latency_ms, False, "429 Too Many Requests", rejected=True))
+                # Back off like a well-behaved client before starting another script
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                break
+            response.raise_for_status()
+            samples.append(Sample(name, turn, latency_ms, True))
+        except Exception as e:
+            latency_ms = (time.perf_counter() - started) * 1000
+            samples.append(Sample(name, turn, latency_ms, False, f"{type(e).__name__}: {e}"))
+            break  # later turns depend on this one
+    return samples
+
+
+async def virtual_user(client: httpx.AsyncClient, url: str, user: int, deadline: float, scripts: list[str]) -> list[Sample]:
+    samples = []
+    while time.perf_counter() < deadline:
+        name = random.choice(scripts)
+        samples += await run_script(client, url, user, name, SCRIPTS[name])
+    return samples
+
+
+# ============================================================================
+# Stub server stats -> per-stage breakdown
+# ============================================================================
+async def stub_stats(client: httpx.AsyncClient, base_url: str | None, reset: bool = False) -> dict:
+    if not base_url:
+        return {}
+    try:
+        if reset:
+            await client.post(f"{base_url}/stats/reset")
+            return {}
+        response = await client.get(f"{base_url}/stats")
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPError as e:
+        print(f"Could not read stats from {base_url}: {e}", file=sys.stderr)
+        return {}
+
+
+def stage_breakdown(samples: list[Sample], llm: dict, tools: dict) -> dict:
+    """Average time per /chat request spent in each stage.
+
+    Model and tool times come from the stub servers. Agent overhead is what is
+    left of the mean latency: graph execution, Mem0 / Milvus / embeddings,
+    checkpointing and HTTP. Tool calls that run in parallel are counted once
+    each, so with parallel tools the overhead is a lower bound.
+    """
+    ok = [s for s in samples if s.ok]
+    if not ok or not (llm or tools):
+        return {}
+    per_request = len(ok)
+    stages = {f"llm_{kind}_ms": v["total_ms"] / per_request for kind, v in llm.items()}
+    stages.update({f"tool_{name}_ms": v["total_ms"] / per_request for name, v in tools.items()})
+    stages["llm_calls_per_request"] = sum(v["calls"] for v in llm.values()) / per_request
+    stages["tool_calls_per_request"] = sum(v["calls"] for v in tools.values()) / per_request
+    accounted = sum(v for k, v in stages.items() if k.endswith("_ms"))
+    stages["agent_overhead_ms"] = max(statistics.fmean(s.latency_ms for s in ok) - accounted, 0.0)
+    return stages
+
+
+# ============================================================================
+# Baseline comparison
+# ============================================================================
+def compare(current: dict, baseline: dict, max_regression: float) -> bool:
+    """Print the change against `baseline`; return False on a regression."""
+    ok = True
+    print(f"\nComparison with baseline ({baseline.get('started_at', '?')}):")
+    for key, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+        old, new = baseline["overall"].get(key), current["overall"].get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change > max_regression if higher_is_worse else -change > max_regression
+        ok &= not regressed
+        print(f"  {key:>15}: {old:10.1f} -> {new:10.1f} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def print_report(result: dict):
+    overall = result["overall"]
+    print(f"\n{result['config']['users']} users, {result['elapsed_s']:.0f}s: "
+          f"{overall['requests']} requests, {overall['errors']} errors ({overall['rejected']} rejected with 429), "
+          f"{overall.get('throughput_rps', 0):.2f} req/s")
+    print(f"{'':>28} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = [("overall", overall)] + list(result["per_script"].items()) + list(result["per_turn"].items())
+    for label, s in rows:
+        print(f"{label:>28} {s['requests']:>6} {s['p50_ms']:>8.0f}ms {s['p95_ms']:>8.0f}ms {s['p99_ms']:>8.0f}ms")
+    if result["stages"]:
+        print("\nPer-request stage breakdown (mean):")
+        for key, value in result["stages"].items():
+            print(f"  {key:>28}: {value:8.1f}")
+    errors = {s["error"] for s in result["samples"] if s["error"]}
+    for error in list(errors)[:5]:
+        print(f"  error: {error}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/chat")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds over which users start")
+    parser.add_argument("--scripts", nargs="+", choices=sorted(SCRIPTS), default=sorted(SCRIPTS))
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--llm-stats-url", default="http://localhost:4000", help="stub LLM server ('' to skip)")
+    parser.add_argument("--mcp-stats-url", default="http://localhost:8002", help="stub MCP server ('' to skip)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed fractional regression")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    limits = httpx.Limits(max_connections=args.users + 4, max_keepalive_connections=args.users + 4)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        await stub_stats(client, args.llm_stats_url, reset=True)
+        await stub_stats(client, args.mcp_stats_url, reset=True)
+
+        started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        async def delayed_user(user: int):
+            await asyncio.sleep(args.ramp_up * user / max(args.users, 1))
+            return await virtual_user(client, args.url, user, deadline, args.scripts)
+
+        per_user = await asyncio.gather(*(delayed_user(u) for u in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+        llm = await stub_stats(client, args.llm_stats_url)
+        tools = await stub_stats(client, args.mcp_stats_url)
+
+    samples = [s for user_samples in per_user for s in user_samples]
+    result = {
+        "started_at": started_at,
+        "elapsed_s": elapsed,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "overall": summarize(samples, elapsed),
+        "per_script": {name: summarize([s for s in samples if s.script == name]) for name in args.scripts},
+        "per_turn": {
+            f"{name}[{turn}]": summarize([s for s in samples if s.script == name and s.turn == turn])
+            for name in args.scripts
+            for turn in range(len(SCRIPTS[name]))
+        },
+        "stages": stage_breakdown(samples, llm, tools),
+        "stub_stats": {"llm": llm, "mcp": tools},
+        "samples": [asdict(s) for s in samples],
+    }
+    print_report(result)
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if baseline and not compare(result, baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
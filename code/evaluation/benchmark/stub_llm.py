@@ -0,0 +1,218 @@
+"""
+Stub OpenAI-compatible LLM server
+
+Stands in for the ai-gateway during benchmarks. It answers /chat/completions with
+scripted replies and tool calls after a configurable delay, so the agent can be
+load-tested without a real model and the model's share of each request is known.
+
+  agent calls   - requests carrying `tools`: the last user message is matched
+                  against SCRIPT to pick the tool calls for each ReAct step
+  memory calls  - Mem0 fact extraction / memory update (`response_format` json)
+  summary calls - anything else (e.g. the history summariser)
+
+Both non-streaming and streaming (SSE) responses are supported.
+GET /stats returns call counts and time spent per kind; POST /stats/reset clears them.
+
+Run:  python stub_llm.py   (listens on STUB_LLM_PORT, default 4000)
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+PORT = int(os.getenv("STUB_LLM_PORT", "4000"))
+# Time before the first token / the full response of every call
+LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "300"))
+JITTER_MS = float(os.getenv("STUB_LLM_JITTER_MS", "100"))
+# Extra time per generated token
+TOKEN_MS = float(os.getenv("STUB_LLM_TOKEN_MS", "10"))
+
+FRUITS = ("apple", "banana", "mango", "pear", "plum", "orange", "cherry")
+
+# (pattern on the last user message, tool calls per ReAct step)
+# Each step is a list of (tool name, args builder); several calls in one step are parallel.
+SCRIPT = [
+    (r"\bmy (name|favou?rite \w+) is\b", [[("save_memory", lambda msg, prev: {"content": msg})]]),
+    (r"\bprice of my\b", [
+        [("recall_memory", lambda msg, prev: {"query": msg})],
+        [("get_fruit_price", lambda msg, prev: {"fruit_name": _find_fruit(prev) or "banana"})],
+    ]),
+    (r"\bcompare\b.*\bprice", [[
+        ("get_fruit_price", lambda msg, prev, fruit=fruit: {"fruit_name": fruit}) for fruit in FRUITS[:2]
+    ]]),
+    (r"\bwhat is my\b|\bdo you remember\b", [[("recall_memory", lambda msg, prev: {"query": msg})]]),
+    (r"\bprice\b|\bhow much\b", [[("get_fruit_price", lambda msg, prev: {"fruit_name": _find_fruit(msg) or "apple"})]]),
+    (r"\bsearch\b|\blook up\b|\bnews\b", [[("web_search", lambda msg, prev: {"query": msg})]]),
+]
+
+app = FastAPI()
+stats: dict[str, dict] = {}
+
+
+def _find_fruit(text: str) -> str | None:
+    for fruit in FRUITS:
+        if fruit in text.lower():
+            return fruit
+    return None
+
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _record(kind: str, elapsed_ms: float):
+    entry = stats.setdefault(kind, {"calls": 0, "total_ms": 0.0})
+    entry["calls"] += 1
+    entry["total_ms"] += elapsed_ms
+
+
+# ============================================================================
+# Scripted replies
+# ============================================================================
+def agent_reply(messages: list, tools: list) -> dict:
+    """Next assistant message for the ReAct agent: tool calls or a final answer."""
+    available = {t["function"]["name"] for t in tools}
+    last_user = max(i for i, m in enumerate(messages) if m["role"] == "user")
+    user_text = _text(messages[last_user]["content"])
+    after = messages[last_user + 1:]
+    step = sum(1 for m in after if m["role"] == "assistant" and m.get("tool_calls"))
+    previous = " ".join(_text(m.get("content")) for m in after if m["role"] == "tool")
+
+    for pattern, steps in SCRIPT:
+        if re.search(pattern, user_text, re.IGNORECASE):
+            if step < len(steps):
+                calls = [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:24]}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps(build(user_text, previous))},
+                    }
+                    for name, build in steps[step]
+                    if name in available
+                ]
+                if calls:
+                    return {"role": "assistant", "content": None, "tool_calls": calls}
+            break
+
+    if previous:
+        return {"role": "assistant", "content": f"Here is what I found: {previous[:300]}"}
+    return {"role": "assistant", "content": "Sure! Happy to help with that. Let me know if there is anything else."}
+
+
+def memory_reply(messages: list) -> dict:
+    """Mem0 fact extraction ({"facts": [...]}) or memory update ({"memory": [...]})."""
+    prompt = "\n".join(_text(m.get("content")) for m in messages)
+    if "new retrieved facts" in prompt.lower():
+        blocks = re.findall(r"```\s*(.*?)\s*```", prompt, re.DOTALL)
+        try:
+            facts = json.loads(blocks[-1]) if blocks else []
+        except json.JSONDecodeError:
+            facts = []
+        memory = [{"id": str(i), "text": fact, "event": "ADD"} for i, fact in enumerate(facts)]
+        return {"role": "assistant", "content": json.dumps({"memory": memory})}
+
+    user = _text(messages[-1].get("content"))
+    facts = [
+        line.split(":", 1)[1].strip()
+        for line in user.splitlines()
+        if line.lower().startswith("user:") and line.split(":", 1)[1].strip()
+    ]
+    return {"role": "assistant", "content": json.dumps({"facts": facts or [user.removeprefix("Input:").strip()]})}
+
+
+def _token_count(message: dict) -> int:
+    return len((message.get("content") or "").split()) + 10 * len(message.get("tool_calls") or [])
+
+
+async def _delay(tokens: int = 0):
+    await asyncio.sleep(max(LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS), 0) / 1000 + tokens * TOKEN_MS / 1000)
+
+
+# ============================================================================
+# OpenAI-compatible endpoints
+# ============================================================================
+def _completion(body: dict, message: dict) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": _token_count(message), "total_tokens": _token_count(message)},
+    }
+
+
+async def _stream(body: dict, message: dict, kind: str, started: float):
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": body.get("model", "stub")}
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        return f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]})}\n\n"
+
+    await _delay()
+    yield chunk({"role": "assistant", "content": ""})
+    if message.get("tool_calls"):
+        for i, call in enumerate(message["tool_calls"]):
+            yield chunk({"tool_calls": [{"index": i, **call}]})
+        finish_reason = "tool_calls"
+    else:
+        for word in message["content"].split(" "):
+            await asyncio.sleep(TOKEN_MS / 1000)
+            yield chunk({"content": word + " "})
+        finish_reason = "stop"
+    yield chunk({}, finish_reason)
+    yield "data: [DONE]\n\n"
+    _record(kind, (time.perf_counter() - started) * 1000)
+
+
+@app.post("/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    started = time.perf_counter()
+    body = await request.json()
+    messages = body.get("messages", [])
+    if body.get("tools"):
+        kind, message = "agent", agent_reply(messages, body["tools"])
+    elif body.get("response_format", {}).get("type") == "json_object":
+        kind, message = "memory", memory_reply(messages)
+    else:
+        kind, message = "summary", {"role": "assistant", "content": "The user and the assistant had a friendly chat."}
+
+    if body.get("stream"):
+        return StreamingResponse(_stream(body, message, kind, started), media_type="text/event-stream")
+    await _delay(_token_count(message))
+    _record(kind, (time.perf_counter() - started) * 1000)
+    return _completion(body, message)
+
+
+@app.get("/health/readiness")
+async def readiness():
+    return {"status": "healthy"}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    stats.clear()
+    return {"status": "reset"}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=PORT, log_level="warning")
@@ -0,0 +1,75 @@
+"""
+Stub MCP server
+
+Same tools as code/mcp (get_fruit_price, web_search) with fixed, configurable
+latencies and no external calls, so benchmark numbers don't depend on DuckDuckGo.
+GET /stats returns call counts and time spent per tool; POST /stats/reset clears them.
+
+Run:  python stub_mcp.py   (SSE on port 8000 like the real server;
+                            STUB_MCP_TRANSPORT=streamable-http serves stateless /mcp instead)
+"""
+import asyncio
+import os
+import time
+
+from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+TRANSPORT = os.getenv("STUB_MCP_TRANSPORT", "sse")
+TOOL_LATENCY_MS = float(os.getenv("STUB_TOOL_LATENCY_MS", "20"))
+SEARCH_LATENCY_MS = float(os.getenv("STUB_SEARCH_LATENCY_MS", "800"))
+
+STATELESS = TRANSPORT == "streamable-http"
+mcp = FastMCP(
+    "Fruit_Prices",
+    host="0.0.0.0",
+    port=int(os.getenv("STUB_MCP_PORT", "8000")),
+    stateless_http=STATELESS,
+    json_response=STATELESS,
+)
+stats: dict[str, dict] = {}
+
+
+async def _timed(tool: str, latency_ms: float, result: str) -> str:
+    started = time.perf_counter()
+    await asyncio.sleep(latency_ms / 1000)
+    entry = stats.setdefault(tool, {"calls": 0, "total_ms": 0.0})
+    entry["calls"] += 1
+    entry["total_ms"] += (time.perf_counter() - started) * 1000
+    return result
+
+
+@mcp.tool()
+async def get_fruit_price(fruit_name: str) -> str:
+    """Get price with the fruit_name passed in as parameter."""
+    return await _timed("get_fruit_price", TOOL_LATENCY_MS, f"Price for {fruit_name} is $2.99 per kg")
+
+
+@mcp.tool()
+async def web_search(query: str) -> str:
+    """Search the web for information based on a query and return top 20 results."""
+    results = "\n".join(
+        f"{i}. Result {i} for {query}\nURL: https://example.com/{i}\nSnippet: Stub snippet {i}.\n" for i in range(1, 21)
+    )
+    return await _timed("web_search", SEARCH_LATENCY_MS, results)
+
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok", "transport": TRANSPORT})
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def get_stats(request: Request) -> JSONResponse:
+    return JSONResponse(stats)
+
+
+@mcp.custom_route("/stats/reset", methods=["POST"])
+async def reset_stats(request: Request) -> JSONResponse:
+    stats.clear()
+    return JSONResponse({"status": "reset"})
+
+
+if __name__ == "__main__":
+    mcp.run(transport=TRANSPORT)
@@ -9,6 +9,9 @@ AGENT_URL = "http://localhost:8000"
 JAEGER_API_URL = "http://localhost:16686/api/traces"
 SERVICE_NAME = "agentic-app"
 
+# One keep-alive session for every call to the agent and Jaeger
+session = requests.Session()
+
 def print_result(name, passed, details=""):
     status = "✅ PASS" if passed else "❌ FAIL"
     print(f"{status} - {name}")
@@ -17,7 +20,7 @@ def print_result(name, passed, details=""):
 
 def test_health():
     try:
-        resp = requests.get(f"{AGENT_URL}/health")
+        resp = session.get(f"{AGENT_URL}/health")
         if resp.status_code == 200:
             print_result("Agent Health Check", True)
             return True
@@ -31,7 +34,7 @@ def test_health():
 def chat(message, thread_id="test-eval"):
     try:
         payload = {"message": message, "thread_id": thread_id}
-        resp = requests.post(f"{AGENT_URL}/chat", json=payload)
+        resp = session.post(f"{AGENT_URL}/chat", json=payload)
         resp.raise_for_status()
         return resp.json()
     except Exception as e:
@@ -69,7 +72,7 @@ def test_happy_path_memory_and_tools():
     
     
     # 2. Recall Memory
-    time.sleep(5)  # Wait for Milvus to index the new vector
+    # No wait needed: the agent merges a user's just-saved memories into recall
     recall_prompt = "What is my name?"
     print(f"\nUser: {recall_prompt}")
     resp = chat(recall_prompt, thread_id=f"store-{unique_id}")
@@ -104,7 +107,7 @@ def verify_traces_exist():
             "limit": 5,
             "lookback": "1h"
         }
-        resp = requests.get(JAEGER_API_URL, params=agent_params)
+        resp = session.get(JAEGER_API_URL, params=agent_params)
         data = resp.json()
         
         if data.get('data') and len(data['data']) > 0:
@@ -120,7 +123,7 @@ def verify_traces_exist():
             "limit": 5,
             "lookback": "1h"
         }
-        mcp_resp = requests.get(JAEGER_API_URL, params=mcp_params)
+        mcp_resp = session.get(JAEGER_API_URL, params=mcp_params)
         mcp_data = mcp_resp.json()
 
         if mcp_data.get('data') and len(mcp_data['data']) > 0:
@@ -160,7 +163,7 @@ def verify_traces_exist_old():
             "limit": 5,
             "lookback": "1h"
         }
-        resp = requests.get(JAEGER_API_URL, params=params)
+        resp = session.get(JAEGER_API_URL, params=params)
         data = resp.json()
         
         # data['data'] contains list of traces
@@ -1,6 +1,11 @@
+import asyncio
 import os
 import logging
+from contextlib import asynccontextmanager
+
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
@@ -12,9 +17,28 @@ from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
 from ddgs import DDGS
 
+from search_cache import SearchCache
+from search_pool import SearchPool, SearchPoolSaturated
+
 
 OTEL_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://otel-collector:4318/v1/traces")
 
+# "sse" pins each client session to one process. "streamable-http" runs stateless:
+# every request is self-contained, so it can use several workers and replicas.
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse").replace("_", "-")
+MCP_STATELESS = MCP_TRANSPORT == "streamable-http"
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", "1")) if MCP_STATELESS else 1
+# On SIGTERM, stop accepting connections and give in-flight calls this long to finish
+MCP_GRACEFUL_SHUTDOWN_S = float(os.getenv("MCP_GRACEFUL_SHUTDOWN_S", "20"))
+
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "20"))
+# Identical queries within the TTL are served from memory (0 disables the cache)
+WEB_SEARCH_CACHE_TTL_S = float(os.getenv("WEB_SEARCH_CACHE_TTL_S", "300"))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "1024"))
+# Searches run on a bounded worker pool so they never block the server's event loop
+WEB_SEARCH_MAX_IN_FLIGHT = int(os.getenv("WEB_SEARCH_MAX_IN_FLIGHT", "8"))
+WEB_SEARCH_TIMEOUT_S = float(os.getenv("WEB_SEARCH_TIMEOUT_S", "15"))
+
 # --- Telemetry setup ---
 resource = Resource(attributes={"service.name": "mcp-server"})
 trace.set_tracer_provider(TracerProvider(resource=resource))
@@ -23,7 +47,23 @@ trace.get_tracer_provider().add_span_processor(
 )
 tracer = trace.get_tracer(__name__)
 
-mcp = FastMCP("Fruit_Prices", host="0.0.0.0", port=8000)
+# json_response: each POST gets one JSON reply instead of an SSE stream, so any
+# worker behind the load balancer can answer it
+mcp = FastMCP(
+    "Fruit_Prices",
+    host="0.0.0.0",
+    port=8000,
+    stateless_http=MCP_STATELESS,
+    json_response=MCP_STATELESS,
+)
+
+search_cache = SearchCache(ttl=WEB_SEARCH_CACHE_TTL_S, max_entries=WEB_SEARCH_CACHE_MAX_ENTRIES)
+# One DDGS client per worker thread, reused across searches
+search_pool = SearchPool(
+    lambda: DDGS(timeout=max(1, int(WEB_SEARCH_TIMEOUT_S))),
+    max_in_flight=WEB_SEARCH_MAX_IN_FLIGHT,
+    timeout=WEB_SEARCH_TIMEOUT_S,
+)
 
 
 @mcp.tool()
@@ -33,13 +73,27 @@ async def get_fruit_price(fruit_name: str) -> str:
         logging.log(logging.INFO, f"Received request to generate price of {fruit_name}")
         return f"Price for {fruit_name} is $2.99 per kg"
 
+async def _search(query: str, max_results: int) -> list:
+    return await search_pool.run("text", query, max_results=max_results)
+
+
 @mcp.tool()
 async def web_search(query: str) -> str:
     """Search the web for information based on a query and return top 20 results."""
-    with tracer.start_as_current_span("web_search", attributes={"query": query}):
+    with tracer.start_as_current_span("web_search", attributes={"query": query}) as span:
         logging.log(logging.INFO, f"Searching web for: {query}")
         try:
-            results = DDGS().text(query, max_results=20)
+            results, outcome = await search_cache.get_or_fetch(
+                search_cache.key(query, WEB_SEARCH_MAX_RESULTS),
+                lambda: _search(query, WEB_SEARCH_MAX_RESULTS),
+            )
+            stats = search_cache.stats()
+            span.set_attributes({
+                "cache.outcome": outcome,
+                "cache.hit": outcome != "miss",
+                "cache.hit_rate": stats["hit_rate"],
+                "cache.size": stats["size"],
+            })
             if not results:
                 return "No results found."
             
@@ -49,9 +103,49 @@ async def web_search(query: str) -> str:
                 formatted_results.append(f"{i}. {r.get('title', 'No Title')}\nURL: {r.get('href', 'No URL')}\nSnippet: {r.get('body', 'No Snippet')}\n")
             
             return "\n".join(formatted_results)
+        except SearchPoolSaturated:
+            span.set_attribute("search.rejected", True)
+            logging.warning(f"Web search rejected, {WEB_SEARCH_MAX_IN_FLIGHT} searches already in flight")
+            return "Error performing web search: too many searches in progress, try again shortly."
+        except asyncio.TimeoutError:
+            span.set_attribute("search.timed_out", True)
+            logging.warning(f"Web search timed out after {WEB_SEARCH_TIMEOUT_S}s: {query}")
+            return f"Error performing web search: timed out after {WEB_SEARCH_TIMEOUT_S:g}s."
         except Exception as e:
             logging.error(f"Web search failed: {e}")
             return f"Error performing web search: {str(e)}"
-        
+
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok", "transport": MCP_TRANSPORT, "pid": os.getpid()})
+
+
+def _with_graceful_shutdown(app):
+    """Release this worker's resources once uvicorn has drained its requests."""
+    inner = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with inner(app):
+            yield
+        search_pool.shutdown()
+        trace.get_tracer_provider().shutdown()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+# ASGI app, built in every uvicorn worker process
+app = _with_graceful_shutdown(mcp.streamable_http_app() if MCP_STATELESS else mcp.sse_app())
+
 if __name__ == "__main__":
-    mcp.run(transport="sse")
+    import uvicorn
+    # Several workers need an import string; each worker process imports this module itself
+    uvicorn.run(
+        "main:app" if MCP_WORKERS > 1 else app,
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        workers=MCP_WORKERS,
+        timeout_graceful_shutdown=MCP_GRACEFUL_SHUTDOWN_S,
+    )
@@ -0,0 +1,113 @@
+import asyncio
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query: NFC, case-folded, whitespace collapsed."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", query)).strip().casefold()
+
+
+class _InFlight:
+    """A running fetch and the number of lookups waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+# ============================================================================
+# Search result cache
+# ============================================================================
+class SearchCache:
+    """TTL + LRU cache for search results with request coalescing.
+
+    Concurrent lookups for the same key while a fetch is running await that
+    fetch instead of starting their own, so a burst of identical queries costs
+    one upstream call. Failed fetches are not cached.
+
+    The fetch runs as its own task, so cancelling any one waiter (including the
+    lookup that started it) leaves it running for the others. It is cancelled
+    only when no lookup is waiting for it any more.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[tuple, _InFlight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(query: str, max_results: int) -> tuple:
+        return normalize_query(query), max_results
+
+    def _get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: tuple, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key: tuple, fetch: Callable[[], Awaitable[Any]]) -> tuple[Any, str]:
+        """Return `(value, outcome)` where outcome is "hit", "coalesced" or "miss"."""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            self.misses += 1
+            return await fetch(), "miss"
+
+        entry = self._get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1], "hit"
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            outcome = "coalesced"
+        else:
+            self.misses += 1
+            outcome = "miss"
+            flight = _InFlight(asyncio.create_task(self._fill(key, fetch)))
+            self._inflight[key] = flight
+
+        flight.waiters += 1
+        try:
+            # shield: one cancelled waiter must not cancel the shared fetch
+            return await asyncio.shield(flight.task), outcome
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def _fill(self, key: tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            self._put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
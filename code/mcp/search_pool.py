@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class SearchPoolSaturated(RuntimeError):
+    """Raised when `max_in_flight` searches are already running."""
+
+
+# ============================================================================
+# Bounded worker pool for blocking search calls
+# ============================================================================
+class SearchPool:
+    """Run blocking search-client calls off the event loop.
+
+    Each worker thread lazily builds one client with `client_factory` and reuses
+    it for every call it serves, so connections are not re-established per
+    search. At most `max_in_flight` searches run at once; further calls fail
+    immediately with `SearchPoolSaturated` instead of queueing behind slow ones.
+    A call that exceeds `timeout` raises `asyncio.TimeoutError` to the caller;
+    its worker stays counted as in flight until the client call returns. A call
+    timed out or cancelled before a worker picked it up never runs and frees
+    its slot straight away.
+    """
+
+    def __init__(self, client_factory, max_in_flight: int = 8, timeout: float = 15.0):
+        self.client_factory = client_factory
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="search")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._timeouts = 0
+        self._rejected = 0
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.client_factory()
+        return client
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+            }
+
+    async def run(self, method: str, *args, **kwargs):
+        """Call `client.<method>(*args, **kwargs)` on a worker and await the result."""
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self._rejected += 1
+                raise SearchPoolSaturated(f"Search pool saturated ({self._in_flight} searches in flight)")
+            self._in_flight += 1
+
+        started = False
+        abandoned = False
+
+        def _call():
+            nonlocal started
+            with self._lock:
+                if abandoned:
+                    return None
+                started = True
+            try:
+                return getattr(self._client(), method)(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        # Carry the current OTel span into the worker thread
+        ctx = contextvars.copy_context()
+        future = asyncio.get_running_loop().run_in_executor(self._pool, functools.partial(ctx.run, _call))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Either way asyncio cancels `future`, so a queued `_call` may never run
+            with self._lock:
+                if not started:
+                    abandoned = True
+                    self._in_flight -= 1
+                if isinstance(e, asyncio.TimeoutError):
+                    self._timeouts += 1
+            if isinstance(e, asyncio.TimeoutError):
+                logger.warning(f"Search '{method}' timed out after {self.timeout}s")
+            raise
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -425,6 +425,7 @@ resource "aws_ecs_task_definition" "agent" {
       { name = "MODEL_NAME", value = "llama-distributed" },
       { name = "MCP_HOST", value = "mcp.internal" },
       { name = "MCP_PORT", value = "8000" },
+      { name = "MCP_TRANSPORT", value = "streamable_http" },
       { name = "OTEL_EXPORTER_OTLP_ENDPOINT", value = "http://otel.internal:4318/v1/traces" },
       { name = "OTEL_EXPORTER_OTLP_PROTOCOL", value = "http/protobuf" },
       { name = "HOME", value = "/tmp" }
@@ -497,16 +498,22 @@ resource "aws_ecs_task_definition" "mcp" {
       protocol      = "tcp"
     }]
     healthCheck = {
-      command     = ["CMD-SHELL", "curl -f http://localhost:8000/sse || exit 1"]
+      command     = ["CMD-SHELL", "curl -f http://localhost:8000/health || exit 1"]
       interval    = 30
       timeout     = 5
       retries     = 3
       startPeriod = 30
     }
+    # SIGTERM drains in-flight tool calls (MCP_GRACEFUL_SHUTDOWN_S) before SIGKILL
+    stopTimeout = 30
     environment = [
       { name = "HOME", value = "/tmp" },
       { name = "OTEL_EXPORTER_OTLP_ENDPOINT", value = "http://otel.internal:4318/v1/traces" },
       { name = "OTEL_EXPORTER_OTLP_PROTOCOL", value = "http/protobuf" },
+      # Stateless streamable HTTP: one worker per vCPU, and tasks scale out freely
+      { name = "MCP_TRANSPORT", value = "streamable-http" },
+      { name = "MCP_WORKERS", value = "2" },
+      { name = "MCP_GRACEFUL_SHUTDOWN_S", value = "20" },
     ]
     logConfiguration = {
       logDriver = "awslogs"